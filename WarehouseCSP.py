@@ -1,52 +1,529 @@
-from csp import CSP, min_conflicts, backtracking_search
-import time
-#from heuristic import custom_heuristic
-#função que não sera mais necessaria
+from csp import CSP, UniversalDict
 
-def total_units_in_wave(assignment, orders, variables):
-    """Calcula o total de unidades em uma wave."""
-    return sum(
-        sum(orders[o][i] for i in orders[o])
-        for o in variables if assignment.get(o, False)  # Use get com valor padrão
-    )
+import numpy as np
+
+from heuristic import ValueScorer
+from warehouse_bitset import n_words, popcount, toggle
+from warehouse_cache import WaveCache, WaveEvaluation
+from warehouse_cover import CorridorCover
+from warehouse_instance import WarehouseInstance, csr_gather
+from warehouse_stats import DEBUG, QUIET, SolverStats
+from warehouse_summary import OrderSummary
+
+
+class WaveState:
+    """
+    Estado incremental de uma wave (conjunto de pedidos incluídos).
+
+    Trabalha sobre os índices internos de uma WarehouseInstance e mantém, a
+    cada inclusão ou remoção de pedido:
+        selected[o]         se o pedido o está na wave
+        assigned[o]         se o pedido o já tem valor na atribuição acompanhada
+        demand[item]        unidades do item demandadas pela wave
+        corridor_refs[c]    quantos itens demandados referenciam o corredor c
+        corridor_bits       bitset (warehouse_bitset) dos corredores abertos (refs > 0)
+        capacity[item]      estoque do item nos corredores abertos (refs > 0)
+        violated[item]      se a demanda do item excede a capacidade
+        total_units         total de unidades da wave
+        version             contador de mudanças, para caches que dependem do estado
+        hash                XOR das chaves (instance.order_keys) dos pedidos da wave
+
+    Com mais de uma zona (instance.zones, componentes conexos item x corredor),
+    mantém também, por zona z:
+        zone_orders[z]      quantos pedidos da wave tocam a zona
+        zone_hash[z]        XOR das chaves desses pedidos, que identifica a demanda da zona
+        zone_violated[z]    quantos itens da zona estão sem capacidade
+
+    Para propagar LB/UB, guarda também quais valores seguem nos domínios
+    (allowed_in/allowed_out, mantidos por WarehouseCSP.prune/restore) e:
+        free_units          unidades dos pedidos não atribuídos que ainda podem entrar
+        forced_units        unidades dos pedidos não atribuídos que não podem ficar de fora
+
+    `add` e `remove` custam O(itens do pedido), mais os itens dos corredores
+    que abrem ou fecham, de modo que checar a wave não exige reprocessar
+    todos os pedidos.
+    """
+
+    def __init__(self, instance):
+        self.instance = instance
+        self.assignment = None
+        self.allowed_in = np.ones(instance.n_orders, dtype=bool)
+        self.allowed_out = np.ones(instance.n_orders, dtype=bool)
+        self.version = 0
+        self.reset()
+
+    def reset(self):
+        """Esvazia a wave."""
+        inst = self.instance
+        self.version += 1
+        self.selected = np.zeros(inst.n_orders, dtype=bool)
+        self.assigned = np.zeros(inst.n_orders, dtype=bool)
+        self.demand = np.zeros(inst.n_items, dtype=np.int64)
+        self.capacity = np.zeros(inst.n_items, dtype=np.int64)
+        self.violated = np.zeros(inst.n_items, dtype=bool)
+        self.corridor_refs = np.zeros(inst.n_corridors, dtype=np.int64)
+        self.corridor_bits = np.zeros(n_words(inst.n_corridors), dtype=np.uint64)
+        self.num_selected = 0
+        self.hash = 0
+        self.num_corridors = 0
+        self.num_violated = 0
+        self.total_units = 0
+        n_zones = inst.zones.n_zones
+        self.zoned = n_zones > 1
+        self.zone_orders = np.zeros(n_zones, dtype=np.int64)
+        self.zone_hash = np.zeros(n_zones, dtype=np.int64)
+        self.zone_violated = np.zeros(n_zones, dtype=np.int64)
+        units = self.instance.order_units
+        self.free = self.allowed_in.copy()
+        self.forced = self.allowed_in & ~self.allowed_out
+        self.free_units = int(units[self.free].sum())
+        self.forced_units = int(units[self.forced].sum())
+
+    def track(self, assignment):
+        """Sincroniza o estado com a atribuição dada (chaveada pelos ids originais)."""
+        if assignment is not self.assignment:
+            self.reset()
+            index = self.instance.order_index
+            for order, include in assignment.items():
+                self.mark(index[order], True)
+                if include:
+                    self.add(index[order])
+            self.assignment = assignment
+
+    def add(self, order):
+        """Inclui na wave o pedido de índice order; retorna os itens que mudaram de violação."""
+        if self.selected[order]:
+            return self.instance.order_item[:0]
+        items, quantities = self.instance.order(order)
+        new_items = items[self.demand[items] == 0]
+        self.version += 1
+        self.selected[order] = True
+        self.num_selected += 1
+        self.hash ^= int(self.instance.order_keys[order])
+        self.total_units += int(self.instance.order_units[order])
+        self.demand[items] += quantities
+        if self.zoned:
+            self._zone(order, +1)
+        return self._check(np.concatenate((items, self._ref(new_items, +1))))
+
+    def remove(self, order):
+        """Retira da wave o pedido de índice order; retorna os itens que mudaram de violação."""
+        if not self.selected[order]:
+            return self.instance.order_item[:0]
+        items, quantities = self.instance.order(order)
+        self.version += 1
+        self.selected[order] = False
+        self.num_selected -= 1
+        self.hash ^= int(self.instance.order_keys[order])
+        self.total_units -= int(self.instance.order_units[order])
+        self.demand[items] -= quantities
+        if self.zoned:
+            self._zone(order, -1)
+        gone = items[self.demand[items] == 0]
+        return self._check(np.concatenate((items, self._ref(gone, -1))))
+
+    def set(self, order, include):
+        """Inclui ou retira o pedido; retorna True se o estado mudou."""
+        if bool(include) == self.selected[order]:
+            return False
+        if include:
+            self.add(order)
+        else:
+            self.remove(order)
+        return True
+
+    def delta(self, out=None, into=None):
+        """
+        (total_units, num_corridors, num_violated) que a wave teria retirando o pedido
+        `out` e incluindo `into` (qualquer um pode ser None), sem alterar o estado.
+
+        Custa O(itens dos dois pedidos + corredores dos itens que entram ou saem da
+        demanda). Como a associação de cada item contém todos os corredores que o
+        estocam (WarehouseInstance), os corredores de um item demandado estão todos
+        abertos e a sua capacidade é o estoque total (instance.item_stock), o mesmo
+        que add/remove calculam.
+        """
+        inst = self.instance
+        units = self.total_units
+        items, change = [], []
+        for order, sign in ((out, -1), (into, 1)):
+            if order is not None:
+                order_items, quantities = inst.order(order)
+                units += sign * int(inst.order_units[order])
+                items.append(order_items)
+                change.append(sign * quantities.astype(np.int64))
+        if not items:
+            return units, self.num_corridors, self.num_violated
+        swap = len(items) > 1
+        items, change = np.concatenate(items), np.concatenate(change)
+        if swap:
+            # Uma troca pode sair e entrar com o mesmo item
+            items, inverse = np.unique(items, return_inverse=True)
+            change = np.bincount(inverse, weights=change).astype(np.int64)
+        before = self.demand[items]
+        after = before + change
+        violated = (self.num_violated + int((after > inst.item_stock[items]).sum())
+                    - int(self.violated[items].sum()))
+        opened = items[(before == 0) & (after > 0)]
+        closed = items[(before > 0) & (after == 0)]
+        corridors = self.num_corridors
+        if len(opened) or len(closed):
+            touched = np.concatenate((opened, closed))
+            refs = inst.item_corridor[csr_gather(inst.item_ptr, touched)]
+            sign = np.repeat(np.where(np.arange(len(touched)) < len(opened), 1, -1),
+                             np.diff(inst.item_ptr)[touched])
+            # Só abre um corredor sem referências e só fecha um com no máximo
+            # len(closed) delas; os demais nem passam pelo np.unique
+            keep = self.corridor_refs[refs] <= len(closed)
+            refs, inverse = np.unique(refs[keep], return_inverse=True)
+            net = np.bincount(inverse, weights=sign[keep]).astype(np.int64)
+            count = self.corridor_refs[refs]
+            corridors += int(((count == 0) & (net > 0)).sum())
+            corridors -= int(((count > 0) & (count + net == 0)).sum())
+        return units, corridors, violated
+
+    def mark(self, order, assigned):
+        """Marca o pedido como atribuído ou não, atualizando as unidades livres e forçadas."""
+        self.assigned[order] = assigned
+        self._refresh(order)
+
+    def allow(self, order, value, allowed):
+        """Registra que o valor (True/False) entrou ou saiu do domínio do pedido."""
+        if value:
+            self.allowed_in[order] = allowed
+        else:
+            self.allowed_out[order] = allowed
+        self._refresh(order)
+
+    def _refresh(self, order):
+        self.version += 1
+        units = int(self.instance.order_units[order])
+        free = not self.assigned[order] and self.allowed_in[order]
+        forced = free and not self.allowed_out[order]
+        if free != self.free[order]:
+            self.free[order] = free
+            self.free_units += units if free else -units
+        if forced != self.forced[order]:
+            self.forced[order] = forced
+            self.forced_units += units if forced else -units
+
+    def _ref(self, items, delta):
+        """
+        Atualiza as referências dos corredores associados aos itens, abrindo ou
+        fechando corredores; retorna os itens cuja capacidade mudou.
+        """
+        inst = self.instance
+        if not len(items):
+            return items
+        corridors, counts = np.unique(inst.item_corridor[csr_gather(inst.item_ptr, items)],
+                                      return_counts=True)
+        before = self.corridor_refs[corridors]
+        self.corridor_refs[corridors] += delta * counts
+        if delta > 0:
+            changed = corridors[before == 0]
+        else:
+            changed = corridors[self.corridor_refs[corridors] == 0]
+        self.num_corridors += delta * len(changed)
+        toggle(self.corridor_bits, changed)
+        stock = csr_gather(inst.corridor_ptr, changed)
+        np.add.at(self.capacity, inst.corridor_item[stock], delta * inst.corridor_qty[stock])
+        return inst.corridor_item[stock]
+
+    def _zone(self, order, delta):
+        zones = self.instance.zones.zones_of(order)
+        self.zone_orders[zones] += delta
+        self.zone_hash[zones] ^= self.instance.order_keys[order]
+
+    def _check(self, items):
+        """
+        Reavalia se a demanda dos itens cabe na capacidade dos corredores abertos;
+        retorna os itens que mudaram de estado.
+        """
+        items = np.unique(items)
+        violated = self.demand[items] > self.capacity[items]
+        flipped = violated != self.violated[items]
+        changed = items[flipped]
+        self.num_violated += int(violated.sum()) - int(self.violated[items].sum())
+        self.violated[items] = violated
+        if self.zoned and len(changed):
+            np.add.at(self.zone_violated, self.instance.zones.item_zone[changed],
+                      np.where(violated[flipped], 1, -1))
+        return changed
+
+    @property
+    def feasible(self):
+        return self.num_violated == 0
+
+    def zone_key(self, zone):
+        """Chave da demanda da wave na zona: (zona, XOR das chaves, número de pedidos)."""
+        return zone, int(self.zone_hash[zone]), int(self.zone_orders[zone])
+
+    def key(self):
+        """Chave canônica do conjunto de pedidos da wave, mantida em O(1) por add/remove."""
+        return self.hash, self.num_selected, self.total_units
+
+    def orders(self):
+        """Índices dos pedidos na wave."""
+        return np.flatnonzero(self.selected)
+
+    def corridors(self):
+        """Índices dos corredores abertos pela wave (todos os que atendem algum item)."""
+        return np.flatnonzero(self.corridor_refs)
+
+    def objective(self):
+        """
+        Unidades por corredor aberto. Como a cobertura mínima usa no máximo os
+        corredores abertos, é um limitante inferior de WarehouseCSP.wave_objective.
+        """
+        if self.num_corridors:
+            return self.total_units / self.num_corridors
+        return 0
+
+
+def wave_forward_checking(csp, var, value, assignment, removals):
+    """
+    Forward checking para a restrição global da wave: depois de var=value, retira
+    True do domínio dos pedidos ainda não atribuídos cuja inclusão passaria de UB
+    ou excederia a capacidade dos corredores, e em seguida propaga LB/UB com
+    wave_bounds_propagation. Usa a mesma assinatura de csp.forward_checking, para
+    ser passada como `inference` a backtracking_search.
+    """
+    csp.support_pruning()
+    wave = csp.wave
+    wave.track(assignment)
+    slack = csp.UB - wave.total_units
+    units, fits = csp.summary.units, csp.summary.fits
+    for order in np.flatnonzero(wave.free).tolist():
+        B = csp.variables[order]
+        csp.stats.constraint_checks += 1
+        if units[order] > slack or not fits[order]:
+            csp.prune(B, True, removals)
+            if not csp.curr_domains[B]:
+                return False
+            continue
+        wave.add(order)
+        violated = not wave.feasible
+        wave.remove(order)
+        if violated:
+            csp.prune(B, True, removals)
+        if not csp.curr_domains[B]:
+            return False
+    return wave_bounds_propagation(csp, var, value, assignment, removals)
+
+
+def wave_bounds_propagation(csp, var, value, assignment, removals):
+    """
+    Propagação dos limites LB/UB do tamanho da wave durante backtracking_search.
+
+    Com as unidades já comprometidas (pedidos na wave), as forçadas (pedidos
+    que não podem mais ficar de fora) e as alcançáveis (pedidos que ainda
+    podem entrar), falha assim que o mínimo possível passa de UB ou o máximo
+    possível não chega a LB. Até o ponto fixo, tira da wave os pedidos que não
+    cabem na folga de UB e força a entrada dos pedidos sem os quais LB fica
+    inalcançável. Mesma assinatura de csp.forward_checking.
+    """
+    csp.support_pruning()
+    wave, units = csp.wave, csp.summary.units
+    wave.track(assignment)
+    changed = True
+    while changed:
+        changed = False
+        for order in csp.by_units:
+            low = wave.total_units + wave.forced_units
+            high = wave.total_units + wave.free_units
+            if low > csp.UB or high < csp.LB:
+                return False
+            if units[order] <= min(csp.UB - low, high - csp.LB):
+                break
+            if not wave.free[order] or wave.forced[order]:
+                continue
+            # Não cabe na folga de UB: fica de fora; senão, sem ele LB fica inalcançável
+            csp.prune(csp.variables[order], bool(units[order] > csp.UB - low), removals)
+            changed = True
+    low = wave.total_units + wave.forced_units
+    return low <= csp.UB and wave.total_units + wave.free_units >= csp.LB
 
 
 class WarehouseCSP(CSP):
     """
     Modelagem do problema de seleção de pedidos em waves como um CSP.
+
+    A wave corrente é mantida em `self.wave` (um WaveState), atualizada por
+    `assign`/`unassign`; as restrições e a função objetivo leem desse estado.
     """
 
-    def __init__(self, orders, items, corridor_items, LB, UB):
+    def __init__(self, orders, items=None, corridor_items=None, LB=None, UB=None,
+                 verbose=QUIET, stats=None, cache_bytes=32 << 20):
         """
         Construtor do CSP.
 
         Args:
-            orders (dict): Dicionário de pedidos (order_id: items).
+            orders (dict | WarehouseInstance): Dicionário de pedidos (order_id: items) ou
+                uma instância já em forma compacta; neste caso os demais argumentos são
+                opcionais e, se dados, sobrescrevem LB e UB da instância.
             items (dict): Dicionário de itens (item_id: corridors).
             corridor_items (dict): Dicionário de corredores (corridor_id: {item_id: quantity}).
             LB (int): Limite inferior para o tamanho da wave.
             UB (int): Limite superior para o tamanho da wave.
+            verbose (int): QUIET, SUMMARY ou DEBUG (imprime cada wave consistente).
+            stats (SolverStats, optional): Onde acumular os contadores; um novo por padrão.
+            cache_bytes (int): Memória máxima do cache de avaliações de waves.
         """
-        self.orders = orders
-        self.items = items
-        self.corridor_items = corridor_items
+        self.verbose = verbose
+        self.stats = stats if stats is not None else SolverStats()
+        if isinstance(orders, WarehouseInstance):
+            instance = orders
+            LB = instance.LB if LB is None else LB
+            UB = instance.UB if UB is None else UB
+        else:
+            instance = WarehouseInstance.from_dicts(orders, items, corridor_items, LB, UB)
+        self.instance = instance
+        self.index = instance.order_index
         self.LB = LB
         self.UB = UB
 
         # Variáveis: Cada pedido é uma variável (incluir ou não na wave)
-        variables = list(orders.keys())
+        variables = instance.order_ids.tolist()
 
         # Domínios: Cada variável pode ser True (incluir ou não incluir)
         domains = {order_id: [True, False] for order_id in variables}
 
-        # Vizinhos: Todos os pedidos são vizinhos entre si (restrições podem envolver qualquer combinação de pedidos)
-        neighbors = {order_id: [v for v in variables if v != order_id] for order_id in variables}
+        # Vizinhos: não há restrições binárias. Capacidade e LB/UB formam uma restrição
+        # global sobre a wave, avaliada uma vez por mudança de atribuição (nconflicts)
+        neighbors = UniversalDict([])
 
         super().__init__(variables, domains, neighbors, self.constraints)
 
+        # Estado incremental da wave, sincronizado por assign/unassign
+        self.wave = WaveState(instance)
+        # Pedidos em ordem decrescente de unidades, para a propagação de LB/UB
+        self.by_units = np.argsort(-instance.order_units, kind='stable').tolist()
+        # Menor conjunto de corredores que atende a demanda da wave (com cache)
+        self.cover = CorridorCover(instance)
+        # Resumos por pedido (unidades, bitsets, contribuição máxima), calculados uma vez
+        self.summary = OrderSummary(instance, UB)
+        # Avaliações de waves já vistas (viabilidade, corredores e objetivo)
+        self.wave_cache = WaveCache(cache_bytes, self.stats)
+        # Pontuação dos valores para a heurística customizada (heuristic.py)
+        self.scorer = ValueScorer(self)
+
+    def restock(self, pending=None):
+        """
+        Atualiza o CSP depois de o estoque da instância mudar (p.ex. consumido por
+        uma wave já planejada), sem reconstruir os índices: refaz a cobertura de
+        corredores e os resumos que dependem do estoque e esvazia o cache de waves.
+
+        Args:
+            pending (np.ndarray, optional): Máscara dos pedidos que ainda podem
+                entrar numa wave (summary.fits passa a excluir os demais).
+        """
+        self.cover.restock()
+        self.summary.restock(self.instance, self.UB, pending)
+        self.wave_cache.clear()
+
+    @property
+    def bitsets(self):
+        """BitsetIndex da instância (o de self.summary)."""
+        return self.summary.bitsets
+
+    def opened_corridors(self, orders=None):
+        """
+        Quantos corredores cada pedido abriria se entrasse na wave corrente: popcount
+        de (corredores do pedido) & ~(corredores abertos), para todos os pedidos
+        (ou os índices dados) de uma vez.
+        """
+        masks = self.summary.corridors
+        if orders is not None:
+            masks = masks[orders]
+        return popcount(masks & ~self.wave.corridor_bits)
+
+    def assign(self, var, val, assignment):
+        """Atribui var=val e atualiza o estado incremental da wave."""
+        self.wave.track(assignment)
+        order = self.index[var]
+        self.wave.set(order, val)
+        self.wave.mark(order, True)
+        self.stats.assignments += 1
+        self.stats.tick()
+        super().assign(var, val, assignment)
+
+    def unassign(self, var, assignment):
+        """Remove var da atribuição e do estado incremental da wave."""
+        self.wave.track(assignment)
+        order = self.index[var]
+        if var in assignment:
+            self.stats.backtracks += 1
+        self.wave.remove(order)
+        self.wave.mark(order, False)
+        super().unassign(var, assignment)
+
+    def suppose(self, var, value):
+        """Supõe var=value, registrando no estado da wave os valores retirados do domínio."""
+        removals = super().suppose(var, value)
+        for B, b in removals:
+            self.wave.allow(self.index[B], b, False)
+        return removals
+
+    def prune(self, var, value, removals):
+        """Retira var=value do domínio corrente e das unidades livres/forçadas da wave."""
+        super().prune(var, value, removals)
+        self.wave.allow(self.index[var], value, False)
+
+    def restore(self, removals):
+        """Desfaz uma suposição e suas inferências, também no estado da wave."""
+        super().restore(removals)
+        for B, b in removals:
+            self.wave.allow(self.index[B], b, True)
+
+    def wave_conflicts(self, wave, complete=False):
+        """
+        Violações da restrição global sobre a wave: uma por item sem capacidade nos
+        corredores, uma se o total de unidades passar de UB e, se a atribuição
+        estiver completa, uma se o total ficar abaixo de LB.
+        """
+        return (wave.num_violated + (wave.total_units > self.UB)
+                + (complete and wave.total_units < self.LB))
+
+    def nconflicts(self, var, val, assignment):
+        """Avalia a restrição global uma única vez para var=val sobre a wave corrente."""
+        self.stats.constraint_checks += 1
+        self.stats.tick()
+        self.wave.track(assignment)
+        order = self.index[var]
+        changed = self.wave.set(order, val)
+        complete = len(assignment) + (var not in assignment) == len(self.variables)
+        try:
+            conflicts = int(self.wave_conflicts(self.wave, complete))
+            if not conflicts and self.verbose >= DEBUG:
+                self._report(self.wave)
+            return conflicts
+        finally:
+            if changed:
+                self.wave.set(order, not val)
+
+    def conflicted_vars(self, current):
+        """
+        Pedidos cuja troca de valor pode reduzir as violações da restrição global:
+        os da wave que demandam itens sem capacidade, os da wave se UB foi excedido
+        e os de fora se a wave completa não atinge LB.
+        """
+        self.wave.track(current)
+        wave, inst = self.wave, self.instance
+        conflicted = np.zeros(inst.n_orders, dtype=bool)
+        if wave.num_violated:
+            conflicted[inst.order_row[wave.violated[inst.order_item]]] = True
+            conflicted &= wave.selected
+        if wave.total_units > self.UB:
+            conflicted |= wave.selected
+        if len(current) == len(self.variables) and wave.total_units < self.LB:
+            conflicted |= ~wave.selected
+        return inst.order_ids[conflicted].tolist()
+
     def constraints(self, order1, include1, order2, include2, assignment=None):
         """
-        Define as restrições do CSP.
+        Restrição binária de compatibilidade: verifica a capacidade e o limite UB
+        da wave corrente com os dois valores dados. A busca usa a forma global,
+        via nconflicts; este método fica para quem consulta pares de pedidos.
 
         Args:
             order1 (int): ID do primeiro pedido.
@@ -58,86 +535,101 @@ class WarehouseCSP(CSP):
         Returns:
             bool: True se a atribuição for consistente, False caso contrário.
         """
-
-        # Cria uma atribuição completa combinando a atribuição parcial com os valores atuais sendo testados
-        complete_assignment = {order1: include1, order2: include2}  # Começa com os dois pedidos que estamos avaliando
-        if assignment:
-            complete_assignment.update(assignment)  # Adiciona a atribuição parcial existente
-#wave_orders = [order for order, include in complete_assignment.items() if include]
-        # 1. Calcula o total de unidades na wave
-        total_units = total_units_in_wave(complete_assignment, self.orders, self.variables)
-
-        # 2. Verifica se os limites da wave são respeitados
-        #if total_units < self.LB or total_units > self.UB:
-        #    #print(f"Restrição de tamanho da wave falhou: total_units={total_units}, LB={self.LB}, UB={self.UB}")
-        #    return False
-        
-        #wave_orders = [order for order, include in complete_assignment.items() if include]
-
-        # 3. Calcula o conjunto de corredores utilizados pela wave
-        wave_items = {}
-        for order in self.variables:
-            if complete_assignment.get(order, False) == True:  # Usar get para evitar KeyError
-                for item, quantity in self.orders[order].items():
-                    if item in wave_items:
-                        wave_items[item] += quantity
-                    else:
-                        wave_items[item] = quantity
-        #print ("wave_items: ", wave_items)
-
-        corridors = set()
-        for item in wave_items:
-            corridors.update(self.items[item])
-        #print ("corredores: ",corridors)
-
+        self.stats.constraint_checks += 1
+
+        if assignment is not None:
+            # Atribuição explícita: avalia sobre um estado próprio, numa única passada
+            wave = WaveState(self.instance)
+            wave.track({**assignment, order1: include1, order2: include2})
+            return self._consistent(wave)
+
+        # Aplica temporariamente os dois valores sobre a wave corrente e desfaz em seguida
+        wave = self.wave
+        changed = [(order, include) for order, include in
+                   ((self.index[order1], include1), (self.index[order2], include2))
+                   if wave.set(order, include)]
+        try:
+            return self._consistent(wave)
+        finally:
+            for order, include in reversed(changed):
+                wave.set(order, not include)
+
+    def _consistent(self, wave):
+        """Verifica a capacidade e o limite UB da wave."""
         # 4. Verifica se há capacidade suficiente nos corredores selecionados
-        for item, quantity in wave_items.items():
-            total_capacity = sum(self.corridor_items[corridor].get(item, 0) for corridor in corridors)
-            if quantity > total_capacity:
-                #print(f"Restrição de capacidade falhou: item={item}, quantity={quantity}, total_capacity={total_capacity}")
-                return False  # Se não tem capacidade retorna falso
-
-        # 5 Imprimir resultados intermediários
-        wave_orders = [order for order, include in complete_assignment.items() if include]
-        print("Pedidos selecionados:", wave_orders)
-        print("Total de unidades:", total_units)
-        print("Número de corredores:", len(corridors))
-        print("Valor Objetivo:", self.objective_function(complete_assignment))
+        if not wave.feasible or wave.total_units > self.UB:
+            return False  # Se não tem capacidade retorna falso
+        if self.verbose >= DEBUG:
+            self._report(wave)
+        return True
+
+    def _report(self, wave):
+        """Imprime os resultados intermediários de uma wave consistente."""
+        print("Pedidos selecionados:", self.instance.order_ids[wave.orders()].tolist())
+        print("Total de unidades:", wave.total_units)
+        print("Número de corredores:", self.corridor_count(wave))
+        print("Valor Objetivo:", self.wave_objective(wave))
         print("-------------------")
 
-        return True
-#método is_wave_valid não é necessário pois o console já apresenta o que se busca e já é usado no objecitve_function
-#        return True, corridors #Retorna os corredores se a wave for válida
-
-    def objective_function(self, assignment):
-      """
-      Calcula o valor da função objetivo para uma dada atribuição.
-      """
-      # Calcula o total de unidades na wave
-      total_units = sum(
-          sum(self.orders[o][i] for i in self.orders[o])
-          for o in self.variables if assignment.get(o) == True
-      )
-      
-      # Calcula o conjunto de corredores utilizados pela wave
-      wave_items = {}
-      for order in self.variables:
-          if assignment.get(order) == True:
-              for item, quantity in self.orders[order].items():
-                  if item in wave_items:
-                      wave_items[item] += quantity
-                  else:
-                      wave_items[item] = quantity
-
-      corridors = set()
-      for item in wave_items:
-          corridors.update(self.items[item])
-
-      # Calcula o valor objetivo
-      if len(corridors) > 0:
-          return total_units / len(corridors)
-      else:
-          return 0  # Retorna 0 se não houver corredores selecionados
+    def objective_function(self, assignment=None):
+        """
+        Calcula o valor da função objetivo para uma dada atribuição.
+
+        Se a atribuição for a acompanhada por `self.wave` (ou não for dada), o valor
+        é lido diretamente do estado incremental; caso contrário a wave é montada
+        numa única passada sobre a atribuição.
+        """
+        self.stats.objective_evals += 1
+        if assignment is None:
+            return self.wave_objective(self.wave)
+        return self.wave_objective(self.wave_of(assignment))
+
+    def evaluate(self, wave):
+        """
+        WaveEvaluation (viabilidade, corredores e objetivo) da wave, consultando antes
+        o cache LRU chaveado por wave.key() e pelos limites LB e UB, dos quais a
+        viabilidade depende; numa falta, calcula e guarda.
+        """
+        key = (wave.key(), self.LB, self.UB)
+        found = self.wave_cache.get(key)
+        if found is None:
+            cover = self.cover.wave_cover(wave)
+            corridors = wave.corridors() if cover is None else cover[0]
+            units = wave.total_units
+            found = WaveEvaluation(wave.feasible and self.LB <= units <= self.UB, corridors,
+                                   units / len(corridors) if len(corridors) else 0)
+            self.wave_cache.put(key, found, corridors.nbytes)
+        return found
+
+    def wave_corridors(self, wave):
+        """
+        Corredores (índices internos) que a wave realmente precisa visitar: a cobertura
+        mínima da sua demanda, ou todos os abertos se o estoque não a atende.
+        """
+        return self.evaluate(wave).corridors
+
+    def corridor_count(self, wave):
+        """Tamanho de wave_corridors(wave)."""
+        return len(self.evaluate(wave).corridors)
+
+    def wave_objective(self, wave):
+        """Unidades por corredor da wave, contando só os corredores da cobertura mínima."""
+        return self.evaluate(wave).objective
+
+    def wave_of(self, assignment):
+        """Retorna o WaveState correspondente à atribuição dada."""
+        if assignment is self.wave.assignment:
+            return self.wave
+        wave = WaveState(self.instance)
+        wave.track(assignment)
+        return wave
+
+    def wave_selection(self, assignment):
+        """Retorna (pedidos, corredores) da wave com ids originais, como espera write_solution."""
+        wave = self.wave_of(assignment)
+        inst = self.instance
+        return (inst.order_ids[wave.orders()].tolist(),
+                inst.corridor_ids[self.wave_corridors(wave)].tolist())
 
     def display(self, assignment):
         """Exibe a solução de forma mais legível."""
@@ -146,58 +638,13 @@ class WarehouseCSP(CSP):
             return
 
         selected_orders = [order for order, include in assignment.items() if include]
-        wave_items = {}
-        for order in selected_orders:
-            for item, quantity in self.orders[order].items():
-                if item in wave_items:
-                    wave_items[item] += quantity
-                else:
-                    wave_items[item] = quantity
-
-        corridors = set()
-        for item in wave_items:
-            corridors.update(self.items[item])
+        wave = self.wave_of(assignment)
+        inst = self.instance
+        wave_items = {i: q for i, q in zip(inst.item_ids[wave.demand > 0].tolist(),
+                                           wave.demand[wave.demand > 0].tolist())}
+        corridors = set(inst.corridor_ids[self.wave_corridors(wave)].tolist())
 
         print("Pedidos selecionados:", selected_orders)
         print("Itens na wave:", wave_items)
         print("Corredores utilizados:", corridors)
         print("Valor Objetivo:", self.objective_function(assignment))
-# heuristic.py
-def custom_heuristic(var, value, assignment, csp):
-    """
-    Heurística customizada para o problema do armazém.
-    Prioriza waves que utilizem menos corredores e maximiza a quantidade de itens.
-
-    Args:
-        csp: O CSP do armazém.
-        var: Variável sendo avaliada (um pedido).
-        value: Valor sendo atribuído à variável (True ou False).
-        assignment: Atribuição parcial atual.
-
-    Returns:
-        Um valor numérico que representa a qualidade da atribuição.
-    """
-
-    # 1. Criar uma wave temporária com a nova atribuição
-    temp_assignment = assignment.copy()
-    temp_assignment[var] = value
-    wave_orders = [order for order, include in temp_assignment.items() if include]
-
-    # 2. Verificar se a wave é válida, utilizando o método is_wave_valid
-    is_valid, selected_corridors = csp.is_wave_valid(wave_orders)
-    #is_valid, selected_corridors = csp.is_wave_valid(wave_orders)
-
-    if value and not is_valid:
-        return float('inf')  # Penalizar atribuições inválidas
-
-    # 3. Calcular a função objetivo
-    objective = csp.objective_function(temp_assignment)
-
-    # 4. Penalizar o uso de mais corredores
-    num_corridors = len(selected_corridors)
-    #corridor_penalty = 0.5 * num_corridors  # Aumentei a penalidade!
-
-    # 5. Combinação da função objetivo e da penalidade (minimizar a combinação)
-    heuristic_value = objective  # -objective + corridor_penalty  # Maximiza o objetivo, minimiza corredores
-    print ( 'heuristic_value: ',heuristic_value, 'objective',objective, 'wave_orders', wave_orders)
-    return heuristic_value
\ No newline at end of file
@@ -1,8 +1,20 @@
-from WarehouseCSP import WarehouseCSP
-from csp import min_conflicts, backtracking_search
+from WarehouseCSP import WarehouseCSP, wave_forward_checking
+from search import hill_climbing, simulated_annealing
+from csp import backtracking_search, mrv as mrv_heuristic, lcv as lcv_heuristic
 import time
-from heuristic import custom_heuristic
-from utils import first
+from heuristic import custom_order
+from min_conflicts import min_conflicts
+from warehouse_bound import lp_bound
+from warehouse_greedy import greedy_wave
+from warehouse_io import write_solution
+from warehouse_lns import lns
+from warehouse_portfolio import solve_portfolio
+from warehouse_problem import local_search
+from warehouse_search import branch_and_bound, dinkelbach
+from warehouse_stats import QUIET, SUMMARY, SolverStats
+
+# Até quantos pedidos na wave o branch_and_bound poda pelo LP de cada nó (com bound)
+LP_DEPTH = 2
 
 # Definição do problema (Exemplo)
 orders = {
@@ -32,41 +44,120 @@ corridor_items = {
 LB = 5
 UB = 12
 
-def run_csp(search_method="backtracking", custom = False, mrv = False, lcv = False, mac = False):
+def run_csp(search_method="backtracking", custom = False, mrv = False, lcv = False, mac = False,
+            instance=None, output=None, verbose=SUMMARY, progress=None, time_limit=None,
+            workers=None, on_wave=None, bound=False):
     """
     Função para executar o CSP com diferentes métodos de busca e exibir os resultados.
-    """
-    warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, UB)
-
-    start_time = time.time()
-
-    if search_method == "backtracking":
-      if custom:
-        def order_domain_function(var, assignment, csp):
-            return sorted(csp.domains[var], key=lambda val: custom_heuristic(var, val, assignment,csp))
-
-        solution = backtracking_search(warehouse_csp, order_domain_values=order_domain_function)
 
-      elif (mrv and lcv and mac):
-        solution = backtracking_search(warehouse_csp,order_domain_values=lcv, select_unassigned_variable=mrv, inference=mac)
-      elif (mrv and lcv):
-          solution = backtracking_search(warehouse_csp,order_domain_values=lcv, select_unassigned_variable=mrv)
-      else:
-        solution = backtracking_search(warehouse_csp)
-
-    elif search_method == "min_conflicts":
-        def min_conflicts_value(csp, var, current):
-            """
-            Retorna o valor que dará a var o menor número de conflitos, usando a heurística customizada.
-            """
-            return min(csp.domains[var], key=lambda val: custom_heuristic(var, val, current,csp))
+    Se `instance` (uma WarehouseInstance, p.ex. de warehouse_io.load_instance) for dada,
+    ela substitui o exemplo acima; se `output` for dado, a solução é gravada nesse arquivo.
+    `verbose` segue os níveis de warehouse_stats (QUIET não imprime nada) e `progress`
+    é chamado periodicamente com as estatísticas durante a busca. Os métodos "dinkelbach"
+    e "branch_and_bound" otimizam unidades por corredor, parando em `time_limit`
+    segundos se dado; no segundo, `on_wave` é chamado com cada nova melhor wave
+    (um WaveSolution) assim que encontrada. O método "portfolio" roda várias
+    estratégias em paralelo, em `workers` processos (por padrão um por núcleo),
+    até `time_limit` (60 s se omitido). O método "lns" melhora uma wave gulosa por
+    busca em vizinhança grande durante `time_limit` segundos (10 s se omitido). O método
+    "greedy" só constrói a wave gulosa de warehouse_greedy, que também é a wave inicial
+    do "branch_and_bound" e dos métodos "hill_climbing" e "simulated_annealing" (as
+    buscas locais do search.py sobre um WaveProblem).
+
+    Com `bound`, o limitante superior da relaxação linear (warehouse_bound.lp_bound)
+    é calculado na raiz, antes da busca; no "branch_and_bound" ele limita o gap
+    informado e o LP com as fixações de cada nó poda os nós rasos (até LP_DEPTH
+    pedidos na wave, em até um quarto do prazo), e em qualquer método é impresso
+    com o gap da wave encontrada.
+
+    Retorna a solução (ou None) e as estatísticas da execução.
+    """
+    stats = SolverStats(progress=progress)
+    with stats.phase("construção"):
+        if instance is not None:
+            warehouse_csp = WarehouseCSP(instance, verbose=verbose, stats=stats)
+        else:
+            warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, UB,
+                                         verbose=verbose, stats=stats)
 
-        solution = min_conflicts(warehouse_csp)
+    upper_bound = lp_bound(warehouse_csp) if bound else None
 
+    start_time = time.time()
+    with stats.phase("busca"):
+        if search_method == "backtracking":
+          if custom:
+            solution = backtracking_search(warehouse_csp, order_domain_values=custom_order)
+
+          elif (mrv and lcv and mac):
+            # Com uma única restrição global, a consistência de arco equivale
+            # ao forward checking dela
+            solution = backtracking_search(warehouse_csp, order_domain_values=lcv_heuristic,
+                                           select_unassigned_variable=mrv_heuristic,
+                                           inference=wave_forward_checking)
+          elif (mrv and lcv):
+              solution = backtracking_search(warehouse_csp, order_domain_values=lcv_heuristic,
+                                             select_unassigned_variable=mrv_heuristic)
+          else:
+            solution = backtracking_search(warehouse_csp)
+
+        elif search_method == "min_conflicts":
+            solution = min_conflicts(warehouse_csp, max_steps=100000)
+
+        elif search_method == "dinkelbach":
+            best = dinkelbach(warehouse_csp, time_limit=time_limit)
+            solution = best.assignment(warehouse_csp) if best else None
+
+        elif search_method == "branch_and_bound":
+            best = branch_and_bound(warehouse_csp, time_limit=time_limit, on_improvement=on_wave,
+                                    initial=greedy_wave(warehouse_csp), upper_bound=upper_bound,
+                                    lp_depth=LP_DEPTH if bound else None,
+                                    lp_time=None if time_limit is None else time_limit / 4)
+            solution = best.assignment(warehouse_csp) if best else None
+            if best and verbose > QUIET:
+                print(f"Limitante superior: {best.info['upper_bound']:.4f} "
+                      f"(gap {best.info['gap']:.4f})")
+
+        elif search_method == "lns":
+            best = lns(warehouse_csp, time_limit=10.0 if time_limit is None else time_limit,
+                       on_improvement=on_wave)
+            solution = best.assignment(warehouse_csp) if best else None
+
+        elif search_method == "greedy":
+            best = greedy_wave(warehouse_csp)
+            solution = best.assignment(warehouse_csp) if best else None
+
+        elif search_method in ("hill_climbing", "simulated_annealing"):
+            search = hill_climbing if search_method == "hill_climbing" else simulated_annealing
+            start = greedy_wave(warehouse_csp)
+            best = local_search(warehouse_csp, search, initial=start.orders if start else ())
+            solution = best.assignment(warehouse_csp) if best else None
+
+        elif search_method == "portfolio":
+            best = solve_portfolio(warehouse_csp.instance, workers=workers,
+                                   time_limit=60.0 if time_limit is None else time_limit)
+            solution = best.assignment(warehouse_csp) if best else None
+            if best and verbose > QUIET:
+                for run in best.info['portfolio']:
+                    if run['elapsed'] is None:
+                        print(f"  {run['strategy']} (semente {run['seed']}): "
+                              f"{run['error'] or 'não terminou no prazo'}")
+                        continue
+                    print(f"  {run['strategy']} (semente {run['seed']}): "
+                          f"objetivo {run['objective']}, {run['elapsed']:.2f} s")
+                print("Melhor estratégia:", best.info['strategy'])
 
     end_time = time.time()
     execution_time = end_time - start_time
 
+    if bound and solution and verbose > QUIET:
+        print(f"Limitante LP: {upper_bound:.4f} "
+              f"(gap {upper_bound - warehouse_csp.objective_function(solution):.4f})")
+
+    if output and solution:
+      write_solution(output, *warehouse_csp.wave_selection(solution))
+    if verbose == QUIET:
+      return solution, stats
+
     print("\n--- Resultados ---")
     print("Método de busca:", search_method)
     if (mrv and lcv and mac):
@@ -81,19 +172,21 @@ def run_csp(search_method="backtracking", custom = False, mrv = False, lcv = Fal
     print("Tempo de execução:", execution_time, "segundos")
     if solution:
       warehouse_csp.display(solution)
-      print("Número de atribuições:", warehouse_csp.nassigns)
     else:
       print("Nenhuma solução encontrada")
+    stats.report()
+    return solution, stats
 
 
-# Execução com backtracking
-print("Executando com Backtracking Search:")
-#run_csp("backtracking")
+if __name__ == "__main__":
+    # Execução com backtracking
+    print("Executando com Backtracking Search:")
+    #run_csp("backtracking")
 
-# Execução com backtracking e heurística customizada
-print("\nExecutando com Backtracking Search e heurística customizada:")
-run_csp("backtracking", custom=True)
+    # Execução com backtracking e heurística customizada
+    print("\nExecutando com Backtracking Search e heurística customizada:")
+    run_csp("backtracking", custom=True)
 
-# Execução com min_conflicts
-#print("\nExecutando com Min-Conflicts:")
-#run_csp("min_conflicts")
\ No newline at end of file
+    # Execução com min_conflicts
+    #print("\nExecutando com Min-Conflicts:")
+    #run_csp("min_conflicts")
\ No newline at end of file
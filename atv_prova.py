@@ -1,55 +1,166 @@
+"""
+Modelo n-ário (NaryCSP) do problema de waves, resolvido por consistência de arco.
+
+Cada pedido e cada corredor é uma variável 0/1 e todas as restrições são
+lineares, compiladas em RestricaoLinear (escopo, coeficientes inteiros e
+limites):
+
+    itens        para cada item, demanda dos pedidos - estoque dos corredores <= 0
+    total        lb <= unidades dos pedidos selecionados <= ub
+    corredores   número de corredores selecionados igual a k
+
+ACSolverLinear especializa o ACSolver do csp.py para essas restrições: em vez
+de enumerar as combinações de valores das demais variáveis (any_holds), cada
+revisão calcula por produto escalar o mínimo e o máximo da soma e retira os
+valores que a levariam para fora dos limites. Com isso ACSolver.domain_splitting
+e a busca de ac_search_solver (aqui resolver_ac) resolvem instâncias de
+verdade, e otimizar_waves maximiza unidades / corredores por uma sequência
+dessas buscas: uma segunda formulação, por propagação, para comparar com o
+WarehouseCSP.
+"""
+
 import itertools
-from csp import NaryCSP, Constraint
+import time
+from collections import deque
 
-def solve_warehouse_problem(pedidos, itens, corredores, u_oi, u_ai, lb, ub):
+import numpy as np
+
+from csp import NaryCSP, Constraint, ACSolver, ACSearchSolver, sat_up
+import search
+from search import depth_first_tree_search
+from utils import first
+from warehouse_instance import csr_transpose
+from warehouse_search import publish, wave_solution
+from warehouse_stats import SearchTimeout
+
+
+class RestricaoLinear(Constraint):
     """
-    Força a solução desejada:
-      - Pedidos 0, 1, 2 e 4 são selecionados (valor 1) e o pedido 3 é descartado (valor 0).
-      - Apenas os corredores 1 e 3 são selecionados (valor 1) e os demais são descartados (valor 0).
-    """
-    # Lista de variáveis (pedidos e corredores)
-    variaveis = [f'pedido_{p}' for p in pedidos] + [f'corredor_{c}' for c in corredores]
-    
-    # Definição dos domínios: forçamos os valores para que só seja possível obter a solução desejada.
-    dominios = {}
-    for p in pedidos:
-        var = f'pedido_{p}'
-        # Pedidos 0, 1, 2 e 4 devem ser selecionados (valor 1); pedido 3 deve ser 0.
-        dominios[var] = {1} if p in [0, 1, 2, 4] else {0}
-    for c in corredores:
-        var = f'corredor_{c}'
-        # Apenas corredores 1 e 3 devem ser selecionados.
-        dominios[var] = {1} if c in [1, 3] else {0}
-    
-    # Mesmo com a solução forçada, mantemos as restrições para simular o problema original.
-    restricoes = []
-    restricoes.extend(criar_restricoes_itens(pedidos, itens, corredores, u_oi, u_ai))
-    restricoes.append(criar_restricao_total_itens(pedidos, itens, u_oi, lb, ub))
-    restricoes.append(criar_restricao_corridor(corredores))
-    
-    csp = NaryCSP(dominios, restricoes)
-    # Como cada variável tem apenas um valor possível, podemos obter a solução diretamente:
-    solucao = {var: list(dominios[var])[0] for var in variaveis}
-    
-    # Extração dos pedidos e corredores selecionados
-    pedidos_selecionados = sorted([int(var.split('_')[1]) for var in solucao 
-                                   if var.startswith('pedido_') and solucao[var] == 1])
-    corredores_selecionados = sorted([int(var.split('_')[1]) for var in solucao 
-                                      if var.startswith('corredor_') and solucao[var] == 1])
-    
-    # Cálculo do total de unidades e do objetivo
-    total_itens = sum(u_oi.get((p, i), 0) for p in pedidos_selecionados for i in itens)
-    num_corredores = len(corredores_selecionados)
-    objetivo = total_itens / num_corredores if num_corredores > 0 else 0
-    
-    print(f"Pedidos: {pedidos_selecionados}, Corredores: {corredores_selecionados}, Total de unidades: {total_itens}, Número de corredores: {num_corredores}, Valor objetivo: {objetivo}")
-    
-    return solucao, objetivo
+    Restrição inferior <= sum(coeficientes[k] * escopo[k]) <= superior.
+
+    A condição é um produto escalar sobre os valores, na ordem do escopo; o
+    ACSolverLinear usa os coeficientes e limites diretamente.
+    """
+
+    def __init__(self, escopo, coeficientes, inferior=-np.inf, superior=np.inf, nome='linear'):
+        self.coeficientes = np.asarray(coeficientes, dtype=np.int64)
+        self.inferior = inferior
+        self.superior = superior
+
+        def condicao(*valores):
+            total = int(np.dot(self.coeficientes, valores))
+            return inferior <= total <= superior
+
+        condicao.__name__ = nome
+        super().__init__(tuple(escopo), condicao)
+
+
+class ACSolverLinear(ACSolver):
+    """
+    ACSolver para NaryCSPs de restrições lineares (RestricaoLinear).
+
+    Os escopos são compilados uma vez para arrays de índices inteiros. GAC mantém
+    o menor e o maior valor de cada domínio em arrays e revisa uma restrição
+    inteira por vez: com os limites [mínimo, máximo] da soma, um valor v de uma
+    variável de coeficiente c só fica se
+        mínimo dos demais + c * v <= superior  e  máximo dos demais + c * v >= inferior.
+    É a consistência de limites, que para domínios 0/1 e restrições de um só
+    lado (como as de itens) coincide com a consistência de arco generalizada; em
+    domínios unitários a verificação é exata.
+    """
+
+    def __init__(self, csp, stats=None):
+        """
+        Args:
+            csp (NaryCSP): CSP só com restrições RestricaoLinear.
+            stats (SolverStats, optional): Acumula em constraint_checks os termos
+                avaliados e chama tick() a cada revisão (prazo e progresso).
+        """
+        super().__init__(csp)
+        self.stats = stats
+        self.variaveis = list(csp.domains)
+        self.indice = {var: k for k, var in enumerate(self.variaveis)}
+        self.escopos = {con: np.fromiter((self.indice[v] for v in con.scope), dtype=np.int64,
+                                         count=len(con.scope))
+                        for con in csp.constraints}
+
+    def GAC(self, orig_domains=None, to_do=None, arc_heuristic=sat_up):
+        """
+        Mesma interface de ACSolver.GAC; as restrições de to_do são revisadas em
+        ordem de chegada (arc_heuristic é aceito só por compatibilidade).
+        """
+        if orig_domains is None:
+            orig_domains = self.csp.domains
+        if to_do is None:
+            fila = deque(self.csp.constraints)
+        else:
+            fila = deque(dict.fromkeys(con for _, con in to_do if con is not None))
+        domains = orig_domains.copy()
+        menor = np.array([min(domains[var], default=0) for var in self.variaveis], dtype=np.int64)
+        maior = np.array([max(domains[var], default=0) for var in self.variaveis], dtype=np.int64)
+        if any(not domains[var] for var in self.variaveis):
+            return False, domains, 0
+        na_fila = set(fila)
+        checks = 0
+        while fila:
+            con = fila.popleft()
+            na_fila.discard(con)
+            idx, coef = self.escopos[con], con.coeficientes
+            a, b = coef * menor[idx], coef * maior[idx]
+            baixo, alto = np.minimum(a, b), np.maximum(a, b)
+            soma_baixo, soma_alto = int(baixo.sum()), int(alto.sum())
+            checks += len(idx)
+            if self.stats is not None:
+                self.stats.constraint_checks += len(idx)
+                self.stats.tick()
+            if soma_baixo > con.superior or soma_alto < con.inferior:
+                return False, domains, checks
+            # Demais termos de cada variável e, dentre elas, as com algum extremo sem suporte
+            outros_baixo, outros_alto = soma_baixo - baixo, soma_alto - alto
+            sem_suporte = ((outros_baixo + alto > con.superior)
+                           | (outros_alto + baixo < con.inferior))
+            for k in np.flatnonzero(sem_suporte).tolist():
+                var, c = self.variaveis[idx[k]], int(coef[k])
+                lo, hi = int(outros_baixo[k]), int(outros_alto[k])
+                novo = {v for v in domains[var] if lo + c * v <= con.superior
+                        and hi + c * v >= con.inferior}
+                if not novo:
+                    return False, domains, checks
+                domains[var] = novo
+                menor[idx[k]], maior[idx[k]] = min(novo), max(novo)
+                for vizinha in self.csp.var_to_const[var]:
+                    if vizinha not in na_fila:
+                        na_fila.add(vizinha)
+                        fila.append(vizinha)
+        return True, domains, checks
+
+
+class ACSearchSolverLinear(ACSearchSolver):
+    """ACSearchSolver sobre o ACSolverLinear; `consistente` é False se a raiz já falha."""
+
+    def __init__(self, csp, stats=None):
+        self.cons = ACSolverLinear(csp, stats)
+        self.consistente, self.domains, _ = self.cons.GAC()
+        self.heuristic = sat_up
+        search.Problem.__init__(self, self.domains)
+
+
+def resolver_ac(csp, stats=None):
+    """
+    Equivalente de csp.ac_search_solver com o ACSolverLinear: busca em profundidade
+    com divisão de domínios, na ordem das variáveis em csp.domains.
+
+    Returns:
+        dict ou None: Uma solução {variável: valor}, ou None se não há.
+    """
+    problema = ACSearchSolverLinear(csp, stats)
+    if not problema.consistente:
+        return None
+    no = depth_first_tree_search(problema)
+    if no is None:
+        return None
+    return {var: first(no.state[var]) for var in no.state}
 
-def gerar_todas_solucoes(csp, variaveis):
-    """Gera todas as combinações possíveis para as variáveis (neste caso, haverá apenas uma)."""
-    dominios = csp.domains
-    return (dict(zip(variaveis, valores)) for valores in itertools.product(*[dominios[var] for var in variaveis]))
 
 def criar_restricoes_itens(pedidos, itens, corredores, u_oi, u_ai):
     """
@@ -59,57 +170,176 @@ def criar_restricoes_itens(pedidos, itens, corredores, u_oi, u_ai):
     restricoes_itens = []
     for i in itens:
         pedidos_com_item = [p for p in pedidos if (p, i) in u_oi]
-        corredores_com_item = [c for c in corredores if (c, i) in u_ai]
-        variaveis_pedido = [f'pedido_{p}' for p in pedidos_com_item]
-        variaveis_corredor = [f'corredor_{c}' for c in corredores_com_item]
-        
-        if not variaveis_pedido or not variaveis_corredor:
+        corredores_com_item = [c for c in corredores if u_ai.get((c, i), 0)]
+        if not pedidos_com_item:
             continue
-
-        # Congela o valor de i usando um parâmetro default (item=i)
-        def condicao_item(*valores, item=i):
-            total_demanda = sum(u_oi.get((int(var.split('_')[1]), item), 0) 
-                                for idx, var in enumerate(variaveis_pedido) if valores[idx] == 1)
-            total_oferta = sum(u_ai.get((int(var.split('_')[1]), item), 0) 
-                               for idx, var in enumerate(variaveis_corredor)
-                               if valores[idx + len(variaveis_pedido)] == 1)
-            return total_demanda <= total_oferta
-        
-        escopo = variaveis_pedido + variaveis_corredor
-        restricoes_itens.append(Constraint(escopo, condicao_item))
+        escopo = ([f'pedido_{p}' for p in pedidos_com_item]
+                  + [f'corredor_{c}' for c in corredores_com_item])
+        coeficientes = ([u_oi[p, i] for p in pedidos_com_item]
+                        + [-u_ai[c, i] for c in corredores_com_item])
+        restricoes_itens.append(RestricaoLinear(escopo, coeficientes, superior=0,
+                                                nome=f'item_{i}'))
     return restricoes_itens
 
+
 def criar_restricao_total_itens(pedidos, itens, u_oi, lb, ub):
     """
     Garante que o total de unidades dos pedidos selecionados esteja entre lb e ub.
     """
+    unidades = {p: 0 for p in pedidos}
+    for (p, _), quantidade in u_oi.items():
+        if p in unidades:
+            unidades[p] += quantidade
+    return RestricaoLinear([f'pedido_{p}' for p in pedidos], list(unidades.values()), lb, ub,
+                           nome='total_itens')
+
+
+def compilar_instancia(instance):
+    """
+    Monta o modelo direto dos arrays CSR de uma WarehouseInstance, sem passar por
+    dicionários: uma restrição de item por item demandado.
+
+    Returns:
+        tuple: (variáveis dos pedidos, variáveis dos corredores, restrições de
+        itens, unidades de cada pedido), com as variáveis na ordem dos índices
+        internos e nomeadas pelos ids originais.
+    """
+    pedidos = [f'pedido_{o}' for o in instance.order_ids.tolist()]
+    corredores = [f'corredor_{c}' for c in instance.corridor_ids.tolist()]
+    item_ptr, item_pedido, item_qtd = csr_transpose(instance.order_ptr, instance.order_item,
+                                                    instance.n_items, instance.order_qty)
+    est_ptr, est_corredor, est_qtd = csr_transpose(instance.corridor_ptr, instance.corridor_item,
+                                                   instance.n_items, instance.corridor_qty)
+    restricoes = []
+    for i in np.flatnonzero(np.diff(item_ptr)).tolist():
+        ps, pe, cs, ce = item_ptr[i], item_ptr[i + 1], est_ptr[i], est_ptr[i + 1]
+        escopo = ([pedidos[o] for o in item_pedido[ps:pe].tolist()]
+                  + [corredores[c] for c in est_corredor[cs:ce].tolist()])
+        coeficientes = np.concatenate((item_qtd[ps:pe], -est_qtd[cs:ce]))
+        restricoes.append(RestricaoLinear(escopo, coeficientes, superior=0,
+                                          nome=f'item_{instance.item_ids[i]}'))
+    return pedidos, corredores, restricoes, instance.order_units
+
+
+def otimizar_waves(pedidos, corredores, restricoes_itens, unidades, lb, ub, stats=None,
+                   ao_melhorar=None):
+    """
+    Maximiza unidades / corredores resolvendo uma sequência de NaryCSPs.
+
+    Para cada número k de corredores, enquanto ub / k supera a melhor razão,
+    exige exatamente k corredores e um total acima de k vezes a melhor razão;
+    cada solução encontrada eleva a exigência, até o CSP ficar inconsistente.
+    Os corredores vêm primeiro na ordem das variáveis: escolhidos eles, as
+    restrições de itens já excluem os pedidos sem estoque.
+
+    Args:
+        pedidos, corredores (list): Nomes das variáveis.
+        restricoes_itens (list): Restrições de itens (RestricaoLinear).
+        unidades (sequence): Unidades de cada pedido, na ordem de `pedidos`.
+        lb, ub (int): Limites do total de unidades.
+        stats (SolverStats, optional): Contadores e prazo (SearchTimeout).
+        ao_melhorar (callable, optional): Chamado com (solução, razão) a cada melhora.
+
+    Returns:
+        tuple: (solução {variável: 0/1} ou None, melhor razão).
+    """
+    unidades = [int(u) for u in unidades]
+    dominios = {var: {0, 1} for var in corredores + pedidos}
+    melhor, melhor_razao = None, 0.0
+    for k in range(1, len(corredores) + 1):
+        if ub / k <= melhor_razao:
+            break
+        minimo = max(lb, int(melhor_razao * k) + 1)
+        while minimo <= ub:
+            restricoes = restricoes_itens + [
+                RestricaoLinear(pedidos, unidades, minimo, ub, nome='total_itens'),
+                RestricaoLinear(corredores, [1] * len(corredores), k, k, nome='corridor')]
+            solucao = resolver_ac(NaryCSP(dominios, restricoes), stats)
+            if solucao is None:
+                break
+            total = sum(u for var, u in zip(pedidos, unidades) if solucao[var])
+            melhor, melhor_razao = solucao, total / k
+            if ao_melhorar is not None:
+                ao_melhorar(melhor, melhor_razao)
+            minimo = total + 1
+    return melhor, melhor_razao
+
+
+def resolver_wave(csp, time_limit=None, shared=None, seed=None):
+    """
+    Roda otimizar_waves sobre a instância de um WarehouseCSP, com a assinatura das
+    estratégias do portfólio (warehouse_portfolio.STRATEGIES), para comparar as
+    duas formulações no warehouse_benchmark. O prazo vale por csp.stats.tick;
+    se ele acabar depois de alguma wave encontrada, devolve a melhor delas.
+
+    Returns:
+        WaveSolution ou None: A melhor wave, avaliada pelo WarehouseCSP.
+
+    Raises:
+        SearchTimeout: Se o prazo acabar antes da primeira wave.
+    """
+    if time_limit is not None:
+        csp.stats.deadline = time.perf_counter() + time_limit
+    pedidos, corredores, restricoes, unidades = compilar_instancia(csp.instance)
+    melhor = []
+
+    def ao_melhorar(solucao, razao):
+        csp.wave.track({var: bool(solucao[nome]) for var, nome in zip(csp.variables, pedidos)})
+        melhor[:] = [wave_solution(csp)]
+        publish(shared, melhor[0].objective)
+
+    try:
+        otimizar_waves(pedidos, corredores, restricoes, unidades, csp.LB, csp.UB, csp.stats,
+                       ao_melhorar)
+    except SearchTimeout:
+        if not melhor:
+            raise
+    return melhor[0] if melhor else None
+
+
+def solve_warehouse_problem(pedidos, itens, corredores, u_oi, u_ai, lb, ub):
+    """
+    Busca a wave de maior unidades / corredores com o modelo n-ário (otimizar_waves).
+
+    Returns:
+        tuple: (solução {variável: 0/1} ou None, valor objetivo).
+    """
     variaveis_pedido = [f'pedido_{p}' for p in pedidos]
-    total_itens_por_pedido = {p: sum(u_oi.get((p, item), 0) for item in itens) for p in pedidos}
-    
-    def condicao_total_itens(*valores_pedido):
-        total_itens = sum(total_itens_por_pedido[int(variaveis_pedido[idx].split('_')[1])] 
-                          for idx, val in enumerate(valores_pedido) if val == 1)
-        return lb <= total_itens <= ub
-    
-    return Constraint(variaveis_pedido, condicao_total_itens)
-
-def criar_restricao_corridor(corredores):
-    """
-    Garante que exatamente 2 corredores sejam selecionados.
-    """
-    variaveis_corridor = [f'corredor_{c}' for c in corredores]
-    
-    def condicao_corridor(*valores):
-        return sum(valores) == 2
-    
-    return Constraint(variaveis_corridor, condicao_corridor)
+    variaveis_corredor = [f'corredor_{c}' for c in corredores]
+    restricoes = criar_restricoes_itens(pedidos, itens, corredores, u_oi, u_ai)
+    unidades = criar_restricao_total_itens(pedidos, itens, u_oi, lb, ub).coeficientes
+    solucao, objetivo = otimizar_waves(variaveis_pedido, variaveis_corredor, restricoes,
+                                       unidades, lb, ub)
+    if solucao is None:
+        print("Nenhuma solução encontrada.")
+        return None, 0
+
+    # Extração dos pedidos e corredores selecionados
+    pedidos_selecionados = [p for p, var in zip(pedidos, variaveis_pedido) if solucao[var]]
+    corredores_selecionados = [c for c, var in zip(corredores, variaveis_corredor) if solucao[var]]
+    total_itens = sum(u for u, var in zip(unidades.tolist(), variaveis_pedido) if solucao[var])
+    num_corredores = len(corredores_selecionados)
+
+    print(f"Pedidos: {pedidos_selecionados}, Corredores: {corredores_selecionados}, "
+          f"Total de unidades: {total_itens}, Número de corredores: {num_corredores}, "
+          f"Valor objetivo: {objetivo}")
+
+    return solucao, objetivo
+
+
+def gerar_todas_solucoes(csp, variaveis):
+    """Gera todas as combinações possíveis para as variáveis (força bruta, para conferência)."""
+    dominios = csp.domains
+    return (dict(zip(variaveis, valores))
+            for valores in itertools.product(*[dominios[var] for var in variaveis]))
+
 
 # Exemplo de uso
 if __name__ == '__main__':
     pedidos = [0, 1, 2, 3, 4]
     itens = [0, 1, 2, 3, 4]
     corredores = [0, 1, 2, 3, 4]
-    
+
     u_oi = {
         (0, 0): 3, (0, 2): 1,
         (1, 1): 1, (1, 3): 1,
@@ -124,8 +354,6 @@ if __name__ == '__main__':
         (3, 0): 2, (3, 1): 1, (3, 2): 0, (3, 3): 1, (3, 4): 1,
         (4, 0): 0, (4, 1): 1, (4, 2): 2, (4, 3): 1, (4, 4): 2,
     }
-    
-    # Mantemos lb e ub de modo que a soma dos itens (10) esteja entre eles.
+
     lb, ub = 5, 12
     solucao, objetivo = solve_warehouse_problem(pedidos, itens, corredores, u_oi, u_ai, lb, ub)
-
@@ -1,3 +1,71 @@
+from warehouse_stats import DEBUG
+
+
+class ValueScorer:
+    """
+    Pontuação incremental dos valores de um pedido, para a ordenação de valores.
+
+    A variação de unidades, corredores abertos e viabilidade de incluir ou
+    excluir um pedido vem da wave corrente do CSP (bitsets de corredores para
+    inclusões, WaveState.delta para remoções), sem copiar a atribuição nem
+    recalcular o objetivo. As pontuações ficam em cache até a wave mudar
+    (WaveState.version), de modo que reordenar os valores de um pedido sobre a
+    mesma wave não custa nada.
+    """
+
+    def __init__(self, csp):
+        self.csp = csp
+        self.cache = {}
+        self.version = None
+
+    def delta(self, order, value):
+        """
+        Efeito de atribuir value ao pedido de índice order na wave corrente.
+
+        Returns:
+            tuple: (unidades, corredores abertos, viável) da wave resultante; viável
+            exige capacidade, UB e que LB ainda seja alcançável com os pedidos livres.
+            A capacidade de um item demandado é o seu estoque total, como em
+            WaveState.delta.
+        """
+        wave, csp = self.csp.wave, self.csp
+        inst, summary = csp.instance, csp.summary
+        if bool(value) == wave.selected[order]:
+            units, corridors, violated = wave.total_units, wave.num_corridors, wave.num_violated
+        elif value:
+            # Inclusão: os corredores novos saem direto do bitset do pedido
+            items, quantities = inst.order(order)
+            units = wave.total_units + int(summary.units[order])
+            corridors = wave.num_corridors + int(csp.opened_corridors(order))
+            violated = (wave.num_violated - int(wave.violated[items].sum())
+                        + int((wave.demand[items] + quantities > inst.item_stock[items]).sum()))
+        else:
+            units, corridors, violated = wave.delta(out=order)
+        # Atribuído, o pedido deixa de contar entre os livres
+        free = wave.free_units - (int(summary.units[order]) if wave.free[order] else 0)
+        feasible = not violated and units <= csp.UB and units + free >= csp.LB
+        return units, corridors, feasible
+
+    def score(self, var, value, assignment):
+        """
+        Pontuação de var=value (menor é melhor): menos a razão unidades / corredores
+        abertos da wave resultante, ou infinito se ela fica inviável.
+        """
+        wave = self.csp.wave
+        wave.track(assignment)
+        if wave.version != self.version:
+            self.cache.clear()
+            self.version = wave.version
+        key = (var, bool(value))
+        if key not in self.cache:
+            units, corridors, feasible = self.delta(self.csp.index[var], value)
+            if not feasible:
+                self.cache[key] = float('inf')
+            else:
+                self.cache[key] = -(units / corridors if corridors else 0.0)
+        return self.cache[key]
+
+
 def custom_heuristic(var, value, assignment, csp):
     """
     Heurística customizada para o problema do armazém.
@@ -10,30 +78,16 @@ def custom_heuristic(var, value, assignment, csp):
         csp: O CSP do armazém (instância de WarehouseCSP).
 
     Returns:
-        Um valor numérico que representa a qualidade da atribuição.
+        Um valor numérico que representa a qualidade da atribuição (menor é melhor):
+        menos a razão unidades / corredores abertos da wave resultante, ou infinito
+        se ela viola a capacidade, UB ou não pode mais atingir LB.
     """
+    heuristic_value = csp.scorer.score(var, value, assignment)
+    if getattr(csp, 'verbose', DEBUG) >= DEBUG:
+        print('heuristic_value: ', heuristic_value, 'var', var, 'value', value)
+    return heuristic_value
 
-    # 1. Criar uma wave temporária com a nova atribuição
-    temp_assignment = assignment.copy()
-    temp_assignment[var] = value
-    wave_orders = [order for order, include in temp_assignment.items() if include]
-
-    # 2. Verificar se a wave é válida
-    is_valid, selected_corridors = csp.is_wave_valid(wave_orders)
-
-    # Penalizar atribuições inválidas
-    if value and not is_valid:
-        return float('inf')
-
-    # Calcular a função objetivo
-    objective = csp.objective_function(temp_assignment)
-
-    # Penalizar o uso de mais corredores
-    num_corridors = len(selected_corridors)
-    corridor_penalty = 0.5 * num_corridors
-
-    # Combinar a função objetivo e a penalidade (minimizar a combinação)
-    heuristic_value = objective #-objective + corridor_penalty  # Maximize objective, minimize corridors
 
-    print('heuristic_value: ', heuristic_value, 'objective', objective, 'corridor_penalty', corridor_penalty, 'wave_orders', wave_orders)
-    return heuristic_value
\ No newline at end of file
+def custom_order(var, assignment, csp):
+    """Ordena os valores de var pela heurística customizada (order_domain_values)."""
+    return sorted(csp.choices(var), key=lambda val: custom_heuristic(var, val, assignment, csp))
@@ -1,81 +1,288 @@
 # min_conflicts.py
+"""
+Min-Conflicts com contagem incremental de conflitos.
+
+Em vez de reavaliar todas as restrições a cada passo, um rastreador mantém o
+número de conflitos de cada variável e o conjunto das variáveis em conflito, e
+depois de cada troca de valor atualiza só o que a troca afeta:
+
+    BinaryConflicts     CSPs de restrições binárias (vizinhos + constraints): uma
+                        tabela de conflitos por (variável, valor), atualizada nos
+                        vizinhos da variável trocada, em O(grau * domínio).
+    WaveConflicts       WarehouseCSP (restrição global sobre a wave): pedidos com
+                        itens sem capacidade, mantidos pelo índice item -> pedidos,
+                        e os grupos de dentro/fora da wave quando UB ou LB falham;
+                        os valores são avaliados por WaveState.delta, em O(delta).
+
+Os conflitos podem ser números ou tuplas (comparadas em ordem lexicográfica).
+conflicted_vars, num_conflicts e choose_min_conflict_value consultam um
+rastreador novo sobre uma atribuição avulsa.
+"""
+
 import random
 
+import numpy as np
+
+from WarehouseCSP import WarehouseCSP
+from warehouse_instance import csr_gather
+
+
+class IndexedSet:
+    """Conjunto com inclusão, remoção e sorteio em O(1)."""
+
+    def __init__(self, items=()):
+        self.items = []
+        self.position = {}
+        for item in items:
+            self.add(item)
+
+    def __len__(self):
+        return len(self.items)
+
+    def __contains__(self, item):
+        return item in self.position
+
+    def __getitem__(self, k):
+        return self.items[k]
+
+    def add(self, item):
+        if item not in self.position:
+            self.position[item] = len(self.items)
+            self.items.append(item)
+
+    def discard(self, item):
+        k = self.position.pop(item, None)
+        if k is not None:
+            last = self.items.pop()
+            if k < len(self.items):
+                self.items[k] = last
+                self.position[last] = k
+
+
+class BinaryConflicts:
+    """
+    Conflitos de um CSP binário: table[var][value] é quantos vizinhos de var
+    violam uma restrição se var = value, dada a atribuição corrente.
+    """
+
+    def __init__(self, csp, current):
+        self.csp = csp
+        self.current = current
+        self.table = {var: {value: self._count(var, value) for value in csp.domains[var]}
+                      for var in csp.variables}
+        self.conflicted = IndexedSet(var for var in csp.variables if self.conflicts(var))
+
+    def _count(self, var, value):
+        current, constraints = self.current, self.csp.constraints
+        return sum(not constraints(var, value, n, current[n])
+                   for n in self.csp.neighbors[var] if n in current)
+
+    def conflicts(self, var):
+        """Conflitos do valor corrente de var (0 se var não tem valor)."""
+        return self.table[var][self.current[var]] if var in self.current else 0
+
+    def choose_var(self):
+        return random.choice(self.conflicted) if len(self.conflicted) else None
+
+    def value_conflicts(self, var):
+        """Conflitos de cada valor de var, já em cache na tabela."""
+        return self.table[var]
+
+    def flip(self, var, value):
+        old, current, constraints = self.current[var], self.current, self.csp.constraints
+        if value == old:
+            return
+        current[var] = value
+        self.csp.nassigns += 1
+        for n in self.csp.neighbors[var]:
+            row = self.table[n]
+            for a in row:
+                row[a] += (not constraints(n, a, var, value)) - (not constraints(n, a, var, old))
+            self._refresh(n)
+        self._refresh(var)
+
+    def _refresh(self, var):
+        if self.conflicts(var):
+            self.conflicted.add(var)
+        else:
+            self.conflicted.discard(var)
+
+
+class WaveConflicts:
+    """
+    Conflitos da restrição global do WarehouseCSP sobre uma atribuição completa.
+
+    Um pedido da wave conflita com cada item seu sem capacidade (bad[pedido]) e,
+    se UB foi excedido, com ele; um pedido de fora conflita se a wave não atinge
+    LB. Os pedidos da wave com bad > 0 ficam em `violating`, atualizado só nos
+    pedidos dos itens que mudam de estado a cada troca.
+    """
+
+    def __init__(self, csp, current):
+        self.csp = csp
+        self.current = current
+        inst = csp.instance
+        self.wave = wave = csp.wave
+        wave.track(current)
+        self.item_ptr, self.item_orders, _ = inst.item_orders
+        self.bad = np.bincount(inst.order_row, weights=wave.violated[inst.order_item],
+                               minlength=inst.n_orders).astype(np.int64)
+        orders = np.arange(inst.n_orders)
+        self.inside = IndexedSet(orders[wave.selected].tolist())
+        self.outside = IndexedSet(orders[~wave.selected].tolist())
+        self.violating = IndexedSet(np.flatnonzero(wave.selected & (self.bad > 0)).tolist())
+        self.cache, self.version = {}, None
+
+    def _total(self, units, violated):
+        # Itens sem capacidade primeiro; depois, quanto falta ou sobra para [LB, UB]
+        return violated, max(units - self.csp.UB, self.csp.LB - units, 0)
+
+    def conflicts(self, var):
+        """Conflitos do valor corrente de var, no mesmo critério de choose_var."""
+        order, wave = self.csp.index[var], self.wave
+        if wave.selected[order]:
+            return int(self.bad[order]) + (wave.total_units > self.csp.UB)
+        return int(wave.total_units < self.csp.LB)
+
+    def choose_var(self):
+        wave, variables = self.wave, self.csp.variables
+        if wave.total_units > self.csp.UB:
+            return variables[random.choice(self.inside)]
+        short = len(self.outside) if wave.total_units < self.csp.LB else 0
+        if not len(self.violating) + short:
+            return None
+        k = random.randrange(len(self.violating) + short)
+        if k < len(self.violating):
+            return variables[self.violating[k]]
+        return variables[self.outside[k - len(self.violating)]]
+
+    def value_conflicts(self, var):
+        """
+        Violações da wave inteira com cada valor de var, como (itens sem capacidade,
+        distância de [LB, UB] em unidades), em cache até a wave mudar. Com a
+        distância, cada passo aproxima a wave dos limites em vez de empatar.
+        """
+        wave, stats = self.wave, self.csp.stats
+        if wave.version != self.version:
+            self.cache.clear()
+            self.version = wave.version
+        order = self.csp.index[var]
+        if order not in self.cache:
+            stats.constraint_checks += 1
+            stats.tick()
+            if wave.selected[order]:
+                units, _, violated = wave.delta(out=order)
+            else:
+                units, _, violated = wave.delta(into=order)
+            here = self._total(wave.total_units, wave.num_violated)
+            there = self._total(units, violated)
+            selected = bool(wave.selected[order])
+            self.cache[order] = {selected: here, not selected: there}
+        return self.cache[order]
+
+    def flip(self, var, value):
+        order = self.csp.index[var]
+        wave = self.wave
+        self.current[var] = value
+        if bool(value) == wave.selected[order]:
+            return
+        # Mesmos contadores de WarehouseCSP.assign
+        self.csp.nassigns += 1
+        self.csp.stats.assignments += 1
+        changed = wave.add(order) if value else wave.remove(order)
+        (self.inside if value else self.outside).add(order)
+        (self.outside if value else self.inside).discard(order)
+        if len(changed):
+            sign = np.where(wave.violated[changed], 1, -1)
+            counts = np.diff(self.item_ptr)[changed]
+            orders = self.item_orders[csr_gather(self.item_ptr, changed)]
+            before = self.bad[orders] > 0
+            np.add.at(self.bad, orders, np.repeat(sign, counts))
+            moved = np.unique(orders[before != (self.bad[orders] > 0)])
+            for o in moved[wave.selected[moved]].tolist():
+                if self.bad[o] > 0:
+                    self.violating.add(o)
+                else:
+                    self.violating.discard(o)
+        if value and self.bad[order] > 0:
+            self.violating.add(order)
+        else:
+            self.violating.discard(order)
+
+
+def conflict_tracker(csp, current):
+    """Rastreador de conflitos adequado ao CSP (ver o módulo) sobre a atribuição current."""
+    return (WaveConflicts if isinstance(csp, WarehouseCSP) else BinaryConflicts)(csp, current)
+
+
 def min_conflicts(csp, max_steps=1000):
     """
     Implementação do algoritmo de busca Min-Conflicts.
+
+    Parte de uma atribuição aleatória e, a cada passo, troca o valor de uma
+    variável em conflito sorteada pelo valor de menos conflitos (empates ao
+    acaso). Cada passo custa o proporcional ao que a troca altera.
+
+    Args:
+        csp: Um WarehouseCSP ou um CSP de restrições binárias.
+        max_steps (int): Número máximo de passos.
+
+    Returns:
+        dict ou None: A atribuição sem conflitos, ou None se não a encontrou.
     """
 
     # Atribuição inicial aleatória
     current = {}
     for var in csp.variables:
         current[var] = random.choice(csp.domains[var])
+    tracker = conflict_tracker(csp, current)
 
     for i in range(max_steps):
-        if is_solution(csp, current):
-            return current  # Solução encontrada
-
         # Escolhe uma variável com conflito aleatoriamente
-        conflicted = conflicted_vars(csp, current)
-        if not conflicted:
+        var = tracker.choose_var()
+        if var is None:
             return current  # Solução encontrada (sem conflitos)
 
-        var = random.choice(conflicted)
-
         # Escolhe um valor para a variável que minimize os conflitos
-        value = choose_min_conflict_value(csp, var, current, csp)
-        current[var] = value
+        conflicts = tracker.value_conflicts(var)
+        fewest = min(conflicts.values())
+        value = random.choice([val for val, count in conflicts.items() if count == fewest])
+        tracker.flip(var, value)
 
     return None  # Não encontrou solução dentro do número máximo de passos
 
+
 def is_solution(csp, assignment):
-    """Verifica se a atribuição é uma solução válida para o CSP."""
-    for var1 in csp.variables:
-        for var2 in csp.neighbors[var1]:
-            if var2 in assignment:
-                if not csp.constraints(var1, assignment[var1], var2, assignment[var2]):
-                    return False
-    return True
+    """
+    Verifica se a atribuição é uma solução válida para o CSP: nenhuma variável
+    em conflito no rastreador (o WarehouseCSP não tem vizinhos, só a restrição
+    global).
+    """
+    return conflict_tracker(csp, dict(assignment)).choose_var() is None
+
 
 def conflicted_vars(csp, assignment):
     """
     Retorna uma lista de variáveis que estão em conflito.
     """
-    conflicted = []
-    for var in csp.variables:
-        if num_conflicts(csp, var, assignment, csp) > 0:
-            conflicted.append(var)
-    return conflicted
+    tracker = conflict_tracker(csp, dict(assignment))
+    return [var for var in csp.variables if tracker.conflicts(var)]
 
-def num_conflicts(csp, var, assignment, warehouse_csp):
+
+def num_conflicts(csp, var, assignment, warehouse_csp=None):
     """
     Retorna o número de restrições que a variável viola com a atribuição atual.
+    warehouse_csp, se dado, é o CSP avaliado no lugar de csp.
     """
-    conflicts = 0
-    for neighbor in warehouse_csp.neighbors[var]:
-        if neighbor in assignment:
-            if not warehouse_csp.constraints(var, assignment[var], neighbor, assignment[neighbor]):
-                conflicts += 1
-    return conflicts
-
-def choose_min_conflict_value(csp, var, current, warehouse_csp):
+    csp = csp if warehouse_csp is None else warehouse_csp
+    return conflict_tracker(csp, dict(assignment)).conflicts(var)
+
+
+def choose_min_conflict_value(csp, var, current, warehouse_csp=None):
     """
     Escolhe um valor para a variável que minimize o número de conflitos.
+    warehouse_csp, se dado, é o CSP avaliado no lugar de csp.
     """
-    min_conflicts_value = None
-    min_conflicts_count = float('inf')
-
-    for value in csp.domains[var]:
-        assignment_copy = current.copy()
-        assignment_copy[var] = value
-        conflicts = 0
-        for neighbor in csp.neighbors[var]:
-            if neighbor in assignment_copy:
-                if not warehouse_csp.constraints(var, assignment_copy[var], neighbor, assignment_copy[neighbor]):
-                    conflicts += 1
-
-        if conflicts < min_conflicts_count:
-            min_conflicts_count = conflicts
-            min_conflicts_value = value
-
-    return min_conflicts_value
\ No newline at end of file
+    csp = csp if warehouse_csp is None else warehouse_csp
+    conflicts = conflict_tracker(csp, dict(current)).value_conflicts(var)
+    return min(csp.domains[var], key=conflicts.__getitem__)
@@ -0,0 +1,1211 @@
+import itertools
+import json
+import math
+import os
+import random
+import time
+
+import numpy as np
+import pytest
+
+import aapp
+from atv_prova import ACSolverLinear, RestricaoLinear, resolver_wave, solve_warehouse_problem
+from csp import NaryCSP, backtracking_search, min_conflicts, mrv, lcv
+from heuristic import custom_heuristic, custom_order
+import min_conflicts as incremental
+from WarehouseCSP import *
+from warehouse_bitset import bitwise_count, pack, popcount, to_int, unpack
+from warehouse_bound import LPBound, lp_bound
+from warehouse_cache import WaveCache
+from warehouse_cover import CorridorCover
+from warehouse_instance import WarehouseInstance
+from warehouse_search import (anytime_waves, branch_and_bound, dinkelbach, order_sequence,
+                              parametric_search, wave_solution)
+from warehouse_stats import SearchTimeout, SolverStats
+from warehouse_lns import lns
+from warehouse_plan import plan_waves
+from warehouse_portfolio import solve_portfolio
+from warehouse_reduce import reduce_instance
+from warehouse_problem import WaveProblem, local_search
+from search import hill_climbing, simulated_annealing, exp_schedule
+from warehouse_benchmark import run_benchmark
+from warehouse_generator import generate_instance
+from warehouse_greedy import CoverStock, greedy_fill, greedy_wave
+from warehouse_io import load_instance, read_solution, write_instance, write_solution
+
+random.seed("aima-python")
+
+orders = {
+    0: {0: 3, 2: 1},
+    1: {1: 1, 3: 1},
+    2: {2: 1, 4: 2},
+    3: {0: 1, 2: 2, 3: 1, 4: 1},
+    4: {1: 1}
+}
+
+items = {
+    0: {0, 1, 3},
+    1: {0, 1, 2, 3, 4},
+    2: {0, 1, 4, 3},
+    3: {1, 2, 3, 4},
+    4: {2, 3, 4}
+}
+
+corridor_items = {
+    0: {0: 2, 1: 1, 2: 1, 4: 1},
+    1: {0: 2, 1: 1, 2: 2, 4: 1},
+    2: {1: 2, 3: 1, 4: 2},
+    3: {0: 2, 1: 1, 3: 1, 4: 1},
+    4: {1: 1, 2: 2, 3: 1, 4: 2}
+}
+
+LB = 5
+UB = 12
+
+
+instance = WarehouseInstance.from_dicts(orders, items, corridor_items, LB, UB)
+
+
+def scratch_wave(selected):
+    wave = WaveState(instance)
+    for order in selected:
+        wave.add(order)
+    return wave
+
+
+def demand_of(wave):
+    return {int(instance.item_ids[i]): int(wave.demand[i]) for i in np.flatnonzero(wave.demand)}
+
+
+def test_instance_from_dicts():
+    assert instance.n_orders == 5
+    assert instance.n_items == 5
+    assert instance.n_corridors == 5
+    assert instance.order_units.tolist() == [4, 2, 3, 5, 1]
+    its, qty = instance.order(3)
+    assert dict(zip(its.tolist(), qty.tolist())) == orders[3]
+    its, qty = instance.corridor(2)
+    assert dict(zip(its.tolist(), qty.tolist())) == corridor_items[2]
+    assert set(instance.item_corridors(3).tolist()) == items[3]
+
+
+def test_wave_state_add_remove():
+    wave = WaveState(instance)
+    wave.add(0)
+    assert wave.total_units == 4
+    assert demand_of(wave) == {0: 3, 2: 1}
+    assert set(wave.corridors().tolist()) == {0, 1, 3, 4}
+    assert wave.feasible
+
+    wave.add(3)
+    assert wave.total_units == 9
+    assert demand_of(wave) == {0: 4, 2: 3, 3: 1, 4: 1}
+
+    wave.remove(0)
+    wave.remove(3)
+    assert wave.total_units == 0
+    assert demand_of(wave) == {}
+    assert wave.num_corridors == 0
+    assert not wave.corridor_refs.any()
+    assert wave.objective() == 0
+
+
+def test_wave_state_matches_scratch():
+    wave = WaveState(instance)
+    for _ in range(500):
+        wave.set(random.randrange(instance.n_orders), random.random() < 0.5)
+        reference = scratch_wave(wave.orders())
+        assert (wave.demand == reference.demand).all()
+        assert (wave.corridor_refs == reference.corridor_refs).all()
+        assert (wave.capacity == reference.capacity).all()
+        assert (wave.violated == reference.violated).all()
+        assert wave.num_violated == reference.num_violated
+        assert wave.num_corridors == reference.num_corridors
+        assert wave.total_units == reference.total_units
+
+
+def test_warehouse_csp_objective_reads_wave():
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, UB)
+    solution = backtracking_search(warehouse_csp)
+    assert solution is not None
+    assert set(warehouse_csp.wave.orders().tolist()) == {o for o, include in solution.items() if include}
+    assert warehouse_csp.objective_function(solution) == warehouse_csp.objective_function(dict(solution))
+
+
+def test_warehouse_csp_constraints_do_not_change_wave():
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, UB)
+    assignment = {}
+    warehouse_csp.assign(0, True, assignment)
+    assert warehouse_csp.constraints(3, True, 4, False)
+    assert warehouse_csp.wave.orders().tolist() == [0]
+    assert demand_of(warehouse_csp.wave) == {0: 3, 2: 1}
+
+
+def test_warehouse_csp_accepts_instance():
+    warehouse_csp = WarehouseCSP(instance)
+    assert warehouse_csp.variables == list(orders)
+    assert (warehouse_csp.LB, warehouse_csp.UB) == (LB, UB)
+    assert list(warehouse_csp.neighbors[2]) == []
+    solution = backtracking_search(warehouse_csp)
+    assert solution is not None
+    # O pedido 3 fica de fora: com ele a wave teria 15 unidades, acima de UB
+    assert solution == {0: True, 1: True, 2: True, 3: False, 4: True}
+    # 10 unidades; os corredores 1 e 3 bastam para atender toda a demanda
+    assert warehouse_csp.objective_function(solution) == 5.0
+    assert warehouse_csp.wave_selection(solution)[1] == [1, 3]
+
+
+def test_global_constraint_nconflicts():
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, 8)
+    assignment = {}
+    warehouse_csp.assign(0, True, assignment)
+    warehouse_csp.assign(2, True, assignment)
+    # 4 + 3 + 5 unidades passa de UB = 8
+    assert warehouse_csp.nconflicts(3, True, assignment) == 1
+    assert warehouse_csp.nconflicts(3, False, assignment) == 0
+    assert warehouse_csp.wave.total_units == 7
+
+    for order in (1, 3):
+        warehouse_csp.assign(order, False, assignment)
+    # Atribuição completa com 7 unidades: LB = 5 atendido
+    assert warehouse_csp.nconflicts(4, False, assignment) == 0
+    warehouse_csp.LB = 8
+    assert warehouse_csp.nconflicts(4, False, assignment) == 1
+    assert warehouse_csp.nconflicts(4, True, assignment) == 0
+
+
+def test_global_constraint_searches():
+    for ub in (6, 8, UB):
+        warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, ub)
+        solution = backtracking_search(warehouse_csp, select_unassigned_variable=mrv,
+                                       order_domain_values=lcv, inference=wave_forward_checking)
+        assert solution is not None
+        assert LB <= warehouse_csp.wave_of(dict(solution)).total_units <= ub
+
+        warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, ub)
+        solution = min_conflicts(warehouse_csp, max_steps=1000)
+        assert solution is not None
+        assert LB <= warehouse_csp.wave_of(dict(solution)).total_units <= ub
+
+
+def test_forward_checking_empties_domain():
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, 6)
+    warehouse_csp.support_pruning()
+    assignment, removals = {}, []
+    # O pedido 3 (5 unidades) só pode entrar, mas não cabe na folga de UB deixada pelo 0
+    warehouse_csp.prune(3, False, removals)
+    warehouse_csp.assign(0, True, assignment)
+    assert not wave_forward_checking(warehouse_csp, 0, True, assignment, removals)
+    assert warehouse_csp.curr_domains[3] == []
+
+
+def test_conflicted_vars():
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, 11, 12)
+    current = {o: o in (0, 1) for o in orders}
+    assert sorted(warehouse_csp.conflicted_vars(current)) == [2, 3, 4]
+    warehouse_csp.UB = 5
+    assert sorted(warehouse_csp.conflicted_vars(current)) == [0, 1, 2, 3, 4]
+
+
+def test_solver_stats(capsys):
+    reports = []
+    stats = SolverStats(progress=reports.append, progress_every=0)
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, UB, stats=stats)
+    with stats.phase('search'):
+        solution = backtracking_search(warehouse_csp)
+    warehouse_csp.objective_function(solution)
+
+    assert capsys.readouterr().out == ''
+    assert stats.assignments == warehouse_csp.nassigns == 5
+    assert stats.constraint_checks >= 5
+    assert stats.objective_evals == 1
+    assert reports and reports[0] is stats
+    assert set(stats.as_dict()) >= {'constraint_checks', 'backtracks', 'phases', 'elapsed'}
+    assert stats.phases['search'] > 0
+
+
+def test_bounds_propagation_prunes():
+    unit_orders = {o: {o % 5: 1} for o in range(10)}
+    stock = {c: {i: 1000 for i in range(5)} for c in range(3)}
+    stocked = {i: {0, 1, 2} for i in range(5)}
+
+    # 10 unidades nunca chegam a LB = 11: sem propagação a busca percorre a árvore toda
+    plain = WarehouseCSP(unit_orders, stocked, stock, 11, 20)
+    assert backtracking_search(plain) is None
+    propagated = WarehouseCSP(unit_orders, stocked, stock, 11, 20)
+    assert backtracking_search(propagated, inference=wave_bounds_propagation) is None
+    assert propagated.nassigns < 5 < 1000 < plain.nassigns
+
+    # Com LB = UB = 9, tirar um pedido da wave força todos os restantes a entrar
+    warehouse_csp = WarehouseCSP(unit_orders, stocked, stock, 9, 9)
+    warehouse_csp.support_pruning()
+    assignment = {}
+    warehouse_csp.assign(0, False, assignment)
+    removals = warehouse_csp.suppose(0, False)
+    assert wave_bounds_propagation(warehouse_csp, 0, False, assignment, removals)
+    assert all(warehouse_csp.curr_domains[o] == [True] for o in range(1, 10))
+    assert warehouse_csp.wave.forced_units == 9
+    warehouse_csp.restore(removals)
+    assert warehouse_csp.wave.forced_units == 0
+
+
+def test_bounds_propagation_is_sound():
+    rng = random.Random(7)
+    for _ in range(20):
+        inst = random_instance(rng)
+        expected = best_objective(inst)
+        for inference in (wave_bounds_propagation, wave_forward_checking):
+            warehouse_csp = WarehouseCSP(inst)
+            solution = backtracking_search(warehouse_csp, inference=inference)
+            assert (solution is None) == (expected is None)
+            if solution:
+                wave = warehouse_csp.wave_of(dict(solution))
+                assert wave.feasible and inst.LB <= wave.total_units <= inst.UB
+
+
+# Pedidos do exemplo do aapp em que o item 4 é estocado em corredores fora de items[4]
+ASSOCIATION_ORDERS = {5: {4: 6}, 0: {0: 3, 2: 1}}
+
+
+def random_instance(rng, n_orders=9, n_items=6, n_corridors=5, associated=False):
+    rand_orders = {o: {i: rng.randint(1, 3) for i in rng.sample(range(n_items), rng.randint(1, 3))}
+                   for o in range(n_orders)}
+    stock = {c: {i: rng.randint(1, 4) for i in rng.sample(range(n_items), rng.randint(1, 4))}
+             for c in range(n_corridors)}
+    stocked = {i: {c for c in stock if i in stock[c]} for i in range(n_items)}
+    if associated:
+        # Associação item -> corredores sorteada, diferente da de estoque
+        stocked = {i: set(rng.sample(range(n_corridors), rng.randint(1, 3)))
+                   for i in range(n_items)}
+    return WarehouseInstance.from_dicts(rand_orders, stocked, stock,
+                                        rng.randint(1, 5), rng.randint(5, 14))
+
+
+def best_objective(inst):
+    best = None
+    warehouse_csp = WarehouseCSP(inst)
+    wave = WaveState(inst)
+    for step in range(1 << inst.n_orders):
+        # Código de Gray: cada subconjunto difere do anterior em um só pedido
+        if step:
+            order = (step & -step).bit_length() - 1
+            wave.set(order, not wave.selected[order])
+        if wave.feasible and inst.LB <= wave.total_units <= inst.UB:
+            if best is None or warehouse_csp.wave_objective(wave) > best:
+                best = warehouse_csp.wave_objective(wave)
+    return best
+
+
+def test_corridor_cover_is_minimum():
+    rng = random.Random(9)
+    for _ in range(30):
+        inst = random_instance(rng, n_corridors=7)
+        stock = np.zeros((inst.n_corridors, inst.n_items), dtype=np.int64)
+        for c in range(inst.n_corridors):
+            its, qty = inst.corridor(c)
+            stock[c, its] = qty
+        wave = WaveState(inst)
+        for o in rng.sample(range(inst.n_orders), 3):
+            wave.add(o)
+        items = np.flatnonzero(wave.demand)
+        demand = wave.demand[items]
+        sizes = [len(cs) for k in range(inst.n_corridors + 1)
+                 for cs in itertools.combinations(range(inst.n_corridors), k)
+                 if (stock[list(cs)][:, items].sum(axis=0) >= demand).all()]
+
+        cover = CorridorCover(inst)
+        result = cover.wave_cover(wave)
+        greedy = CorridorCover(inst, exact_limit=0).wave_cover(wave)
+        if not sizes:
+            assert result is None and greedy is None
+            continue
+        corridors, exact = result
+        assert exact and len(corridors) == min(sizes)
+        assert (stock[corridors][:, items].sum(axis=0) >= demand).all()
+        assert len(greedy[0]) >= min(sizes) >= cover.lower_bound(wave)
+        assert cover.wave_cover(wave) is result
+
+
+def test_objective_counts_cover_corridors():
+    # O item 0 está nos corredores 0 e 1, mas o corredor 0 sozinho atende a demanda
+    warehouse_csp = WarehouseCSP({0: {0: 2}}, {0: [0, 1]}, {0: {0: 5}, 1: {0: 1}}, 1, 10)
+    assignment = {0: True}
+    assert warehouse_csp.wave_of(assignment).num_corridors == 2
+    assert warehouse_csp.objective_function(assignment) == 2.0
+    assert warehouse_csp.wave_selection(assignment) == ([0], [0])
+
+
+def test_wave_key_is_canonical():
+    first, second = scratch_wave([0, 2, 3]), scratch_wave([3, 0, 4, 2])
+    second.remove(4)
+    assert first.key() == second.key()
+    assert first.key() != scratch_wave([0, 2]).key()
+
+
+def test_wave_cache_lru():
+    stats = SolverStats()
+    cache = WaveCache(max_bytes=3 * WaveCache.ENTRY_BYTES + 16, stats=stats)
+    for key in 'abc':
+        cache.put(key, key.upper(), 8)
+    assert len(cache) == 2  # a terceira entrada passaria do limite
+    assert cache.get('b') == 'B' and cache.get('a') is None
+    cache.put('d', 'D', 8)
+    # 'b' foi usada por último; sai 'c'
+    assert cache.get('c') is None and cache.get('b') == 'B' and cache.get('d') == 'D'
+    assert (stats.cache_hits, stats.cache_misses) == (3, 2)
+    assert stats.cache_hit_rate == 0.6 and stats.as_dict()['cache_hit_rate'] == 0.6
+
+
+def test_objective_uses_wave_cache():
+    stats = SolverStats()
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, LB, UB, stats=stats)
+    wave = scratch_wave([0, 2, 3])
+    evaluation = warehouse_csp.evaluate(wave)
+    assert evaluation.feasible and evaluation.objective == warehouse_csp.wave_objective(wave)
+    assert list(evaluation.corridors) == list(warehouse_csp.wave_corridors(scratch_wave([3, 2, 0])))
+    assert (stats.cache_misses, stats.cache_hits) == (1, 2)
+    assert not warehouse_csp.evaluate(scratch_wave([1])).feasible  # abaixo de LB
+    # Mudar LB ou UB não reaproveita a avaliação guardada com os limites antigos
+    warehouse_csp.LB = 1
+    assert warehouse_csp.evaluate(scratch_wave([1])).feasible
+    warehouse_csp.UB = 5
+    assert not warehouse_csp.evaluate(wave).feasible
+
+
+def test_bitsets():
+    members = [0, 5, 63, 64, 130]
+    words = pack(members, 131)
+    assert len(words) == 3 and popcount(words) == len(members)
+    assert unpack(words).tolist() == members
+    assert to_int(words) == sum(1 << m for m in members)
+    assert popcount(words & pack([5, 64, 99], 131)) == 2
+    # O popcount por tabela, usado sem np.bitwise_count, conta o mesmo
+    matrix = np.random.default_rng(1).integers(0, 2 ** 63, (4, 3), dtype=np.uint64)
+    counts = [[bin(int(w)).count('1') for w in row] for row in matrix]
+    assert bitwise_count(matrix).tolist() == counts
+    assert bitwise_count(matrix[0, 0]) == counts[0][0]
+
+
+def test_opened_corridors_uses_wave_bitset():
+    rng = random.Random(10)
+    inst = random_instance(rng, n_orders=12, n_corridors=70)
+    warehouse_csp = WarehouseCSP(inst)
+    assignment = {}
+    for order in rng.sample(inst.order_ids.tolist(), 4):
+        warehouse_csp.assign(order, True, assignment)
+    wave = warehouse_csp.wave
+    assert unpack(wave.corridor_bits).tolist() == wave.corridors().tolist()
+
+    opened = set(wave.corridors().tolist())
+    expected = [len({c for i in inst.order(o)[0] for c in inst.item_corridors(i).tolist()} - opened)
+                for o in range(inst.n_orders)]
+    assert warehouse_csp.opened_corridors().tolist() == expected
+    assert warehouse_csp.opened_corridors([3, 1]).tolist() == [expected[3], expected[1]]
+
+
+def test_parametric_search():
+    warehouse_csp = WarehouseCSP(instance)
+    found, value, complete = parametric_search(warehouse_csp, 0.0)
+    assert complete
+    assert found.units == value == UB
+    assert warehouse_csp.wave.num_selected == 0
+
+
+def test_dinkelbach():
+    best = dinkelbach(WarehouseCSP(instance))
+    assert best.optimal
+    assert best.objective == pytest.approx(best_objective(instance))
+    assert best.info['lambdas'][-1] == best.objective
+
+    rng = random.Random(6)
+    for _ in range(10):
+        inst = random_instance(rng)
+        best = dinkelbach(WarehouseCSP(inst))
+        expected = best_objective(inst)
+        if expected is None:
+            assert best is None
+        else:
+            assert best.objective == pytest.approx(expected)
+
+
+def test_dinkelbach_association_differs_from_stock():
+    inst = WarehouseInstance.from_dicts(ASSOCIATION_ORDERS, aapp.items, aapp.corridor_items, 1, 20)
+    best = dinkelbach(WarehouseCSP(inst))
+    assert sorted(best.orders) == [0, 5] and best.objective == pytest.approx(2.5)
+    assert best.optimal
+    found, value, complete = parametric_search(WarehouseCSP(inst), 2.0)
+    assert complete and sorted(found.orders) == [0, 5]
+
+    rng = random.Random(22)
+    for _ in range(10):
+        inst = random_instance(rng, associated=True)
+        best = dinkelbach(WarehouseCSP(inst))
+        expected = best_objective(inst)
+        assert (best is None) == (expected is None)
+        if best is not None:
+            assert best.optimal and best.objective == pytest.approx(expected)
+
+
+def test_branch_and_bound():
+    rng = random.Random(8)
+    for _ in range(10):
+        inst = random_instance(rng)
+        best = branch_and_bound(WarehouseCSP(inst))
+        expected = best_objective(inst)
+        if expected is None:
+            assert best is None
+        else:
+            assert best.optimal and best.info['gap'] == 0
+            assert best.objective == pytest.approx(expected)
+
+
+def test_association_differs_from_stock():
+    inst = WarehouseInstance.from_dicts(ASSOCIATION_ORDERS, aapp.items, aapp.corridor_items, 1, 20)
+    # Todo corredor que estoca o item entra na associação
+    for i in range(inst.n_items):
+        its = [c for c in range(inst.n_corridors) if i in inst.corridor(c)[0]]
+        assert set(its) <= set(inst.item_corridors(i).tolist())
+    best = branch_and_bound(WarehouseCSP(inst))
+    assert sorted(best.orders) == [0, 5] and best.objective == pytest.approx(2.5)
+    assert best.optimal
+
+    rng = random.Random(21)
+    for _ in range(10):
+        inst = random_instance(rng, associated=True)
+        best = branch_and_bound(WarehouseCSP(inst))
+        expected = best_objective(inst)
+        assert (best is None) == (expected is None)
+        if best is not None:
+            assert best.objective == pytest.approx(expected)
+
+
+def test_branch_and_bound_time_limit():
+    inst = random_instance(random.Random(1), n_orders=14)
+    warehouse_csp = WarehouseCSP(inst)
+    best = branch_and_bound(warehouse_csp, time_limit=0.0)
+    expected = best_objective(inst)
+    if best is not None:
+        assert not best.optimal
+        assert best.objective <= expected <= best.info['upper_bound'] + 1e-9
+        assert best.info['gap'] == best.info['upper_bound'] - best.objective
+    assert warehouse_csp.wave.num_selected == 0
+
+
+def test_search_branches_by_corridor():
+    # Um só corredor atende UB unidades: as buscas o encontram e provam o ótimo sem
+    # wave inicial
+    for search in (branch_and_bound, dinkelbach):
+        warehouse_csp = WarehouseCSP(generate_instance(1000, seed=0))
+        best = search(warehouse_csp, time_limit=5.0)
+        assert best.optimal and best.objective == 1327 and len(best.corridors) == 1
+    # A sequência traz todos os pedidos que cabem; o primeiro bloco, os que o
+    # corredor de maior ganho atende sozinho
+    inst = random_instance(random.Random(5), n_orders=20)
+    warehouse_csp = WarehouseCSP(inst)
+    seq = order_sequence(warehouse_csp)
+    assert sorted(seq) == np.flatnonzero(warehouse_csp.summary.fits).tolist()
+    noisy = order_sequence(warehouse_csp, rng=np.random.default_rng(1))
+    assert sorted(noisy) == sorted(seq)
+    stock = CoverStock(warehouse_csp, WaveState(inst), ())
+    corridor = int(np.argmax(stock.gains(np.array(seq), warehouse_csp.summary.units)))
+    stock.open([corridor])
+    first = set(np.flatnonzero(stock.short == 0).tolist()) & set(seq)
+    assert set(seq[:len(first)]) == first
+
+
+def test_lp_bound():
+    rng = random.Random(12)
+    for _ in range(15):
+        inst = random_instance(rng)
+        warehouse_csp = WarehouseCSP(inst)
+        lp = LPBound(warehouse_csp)
+        upper = lp.solve()
+        expected = best_objective(inst)
+        if expected is None:
+            continue
+        assert upper >= expected
+        assert upper == pytest.approx(lp_bound(warehouse_csp))
+        # O teto da raiz não muda o ótimo de branch_and_bound e limita o gap
+        best = branch_and_bound(warehouse_csp, upper_bound=upper)
+        assert best.optimal and best.objective == pytest.approx(expected)
+        assert best.info['upper_bound'] <= upper
+        # Com pedidos fixados, o LP limita as waves que respeitam as fixações
+        inside = [warehouse_csp.index[o] for o in best.orders]
+        assert lp.solve(include=inside[:1], exclude=[0] if 0 not in inside else []) >= expected
+    # Fixar na wave pedidos que somam mais que UB não deixa wave nenhuma
+    inst = random_instance(random.Random(3))
+    assert LPBound(WarehouseCSP(inst, UB=0)).solve(include=[0]) == -math.inf
+
+
+def test_lp_node_bound():
+    plain = pruned = 0
+    for seed in (2, 4, 7, 9, 10):
+        inst = random_instance(random.Random(seed), n_orders=14)
+        counts = []
+        for lp_depth, lp_time in ((None, None), (14, None), (14, 0.0)):
+            warehouse_csp = WarehouseCSP(inst)
+            best = branch_and_bound(warehouse_csp, lp_depth=lp_depth, lp_time=lp_time)
+            assert best.optimal and best.objective == pytest.approx(best_objective(inst))
+            counts.append(warehouse_csp.stats.assignments)
+        # O LP por nó só poda; sem orçamento de tempo, não muda a busca
+        assert counts[1] <= counts[0] == counts[2]
+        plain, pruned = plain + counts[0], pruned + counts[1]
+    assert pruned < 0.8 * plain
+
+
+def test_anytime_waves():
+    inst = random_instance(random.Random(12), n_orders=12)
+    warehouse_csp = WarehouseCSP(inst)
+    waves = list(anytime_waves(warehouse_csp))
+    objectives = [wave.objective for wave in waves]
+    assert objectives == sorted(set(objectives))
+    assert objectives[-1] == pytest.approx(best_objective(inst))
+    assert waves[-1].optimal and not any(wave.optimal for wave in waves[:-1])
+    assert all(wave.info['stats']['constraint_checks'] > 0 for wave in waves)
+    assert [wave.elapsed for wave in waves] == sorted(wave.elapsed for wave in waves)
+
+    # Parar no primeiro resultado deixa a wave do CSP vazia
+    search = anytime_waves(warehouse_csp)
+    first = next(search)
+    search.close()
+    assert first.objective == objectives[0]
+    assert warehouse_csp.wave.num_selected == 0
+
+    seen = []
+    best = branch_and_bound(WarehouseCSP(inst), on_improvement=seen.append)
+    assert [wave.objective for wave in seen] == objectives and best is seen[-1]
+
+
+def test_lns():
+    rng = random.Random(13)
+    optimal = 0
+    for _ in range(6):
+        inst = random_instance(rng, n_orders=12)
+        expected = best_objective(inst)
+        seen = []
+        warehouse_csp = WarehouseCSP(inst)
+        best = lns(warehouse_csp, time_limit=5.0, max_iter=60, seed=1, on_improvement=seen.append)
+        if best is None:
+            continue
+        assert best is seen[-1]
+        assert [s.objective for s in seen] == sorted(set(s.objective for s in seen))
+        wave = warehouse_csp.wave_of({o: True for o in best.orders})
+        assert wave.feasible and inst.LB <= wave.total_units <= inst.UB
+        assert warehouse_csp.wave_objective(wave) == best.objective <= expected + 1e-9
+        optimal += best.objective == pytest.approx(expected)
+    assert optimal >= 4
+
+
+def test_lns_beats_greedy_start():
+    # Instâncias pequenas em que o guloso não é ótimo (seeds 0, 1 e 17)
+    for seed in (0, 1, 17):
+        inst = random_instance(random.Random(seed), n_orders=12)
+        warehouse_csp = WarehouseCSP(inst)
+        start = greedy_wave(warehouse_csp)
+        best = lns(warehouse_csp, initial=start, time_limit=5.0, max_iter=200, seed=1)
+        assert start.objective < best.objective == pytest.approx(best_objective(inst))
+    # Partindo de uma wave com todos os corredores, o LNS fecha corredores
+    warehouse_csp = WarehouseCSP(generate_instance(1000, seed=0))
+    wave = WaveState(warehouse_csp.instance)
+    for order in np.argsort(-warehouse_csp.summary.units, kind='stable').tolist():
+        if wave.total_units >= warehouse_csp.LB:
+            break
+        wave.add(order)
+        if not wave.feasible:
+            wave.remove(order)
+    start = wave_solution(warehouse_csp, wave=wave)
+    best = lns(warehouse_csp, initial=start, time_limit=5.0, max_iter=60, seed=1)
+    assert len(start.corridors) == 5 and len(best.corridors) < 5
+    assert best.objective > 2 * start.objective
+
+
+def test_wave_state_delta():
+    rng = random.Random(23)
+    for k in range(10):
+        inst = random_instance(rng, associated=k % 2 == 1)
+        wave = WaveState(inst)
+        for _ in range(30):
+            selected = wave.orders().tolist()
+            outside = [o for o in range(inst.n_orders) if not wave.selected[o]]
+            out = rng.choice(selected) if selected and rng.random() < 0.6 else None
+            into = rng.choice(outside) if outside and rng.random() < 0.6 else None
+            expected = wave.delta(out, into)
+            version = wave.version
+            if out is not None:
+                wave.remove(out)
+            if into is not None:
+                wave.add(into)
+            assert expected == (wave.total_units, wave.num_corridors, wave.num_violated)
+            assert wave.version > version or (out, into) == (None, None)
+
+
+def test_delta_association_differs_from_stock():
+    inst = WarehouseInstance.from_dicts(ASSOCIATION_ORDERS, aapp.items, aapp.corridor_items, 1, 20)
+    warehouse_csp = WarehouseCSP(inst)
+    wave = warehouse_csp.wave
+    wave.add(inst.order_index[5])
+    into = inst.order_index[0]
+    expected = wave.delta(into=into)
+    units, corridors, feasible = warehouse_csp.scorer.delta(into, True)
+    assert (units, corridors) == expected[:2] and feasible == (expected[2] == 0)
+    wave.add(into)
+    assert expected == (wave.total_units, wave.num_corridors, wave.num_violated) == (10, 5, 0)
+    assert wave.delta(out=into) == (6, 5, 0)
+
+
+def test_order_summary():
+    summary = WarehouseCSP(instance, UB=4).summary
+    assert summary.units.tolist() == [4, 2, 3, 5, 1]
+    assert (summary.items == summary.bitsets.order_items).all()
+    # O pedido 3 (5 unidades) não cabe em UB = 4
+    assert summary.fits.tolist() == [True, True, True, False, True]
+    assert summary.contribution.tolist() == [4, 2, 3, 0, 1]
+    # Um pedido que demanda mais que todo o estoque do item não entra em wave nenhuma
+    short = WarehouseCSP({**orders, 5: {0: 7}}, items, corridor_items, LB, UB)
+    assert not short.summary.fits[5] and short.summary.contribution[5] == 0
+    assert 5 not in order_sequence(short)
+    # Numa sequência que o inclui, ele não soma às unidades restantes do limitante
+    best = branch_and_bound(short, seq=list(range(short.instance.n_orders)))
+    assert best.optimal and best.objective == branch_and_bound(WarehouseCSP(instance)).objective
+
+
+def test_custom_heuristic_scores():
+    warehouse_csp = WarehouseCSP(instance)
+    assignment = {0: True}
+    warehouse_csp.assign(0, True, assignment)
+    # Incluir o pedido 4 (item 1) abre corredores que o pedido 0 ainda não abriu
+    units, corridors, feasible = warehouse_csp.scorer.delta(4, True)
+    assert (units, feasible) == (5, True)
+    masks = warehouse_csp.bitsets.order_corridors
+    assert corridors == popcount(masks[0] | masks[4]) == 5
+    score = custom_heuristic(4, True, assignment, warehouse_csp)
+    assert score == -5 / corridors
+    assert warehouse_csp.scorer.cache
+    # A pontuação fica em cache até a wave mudar
+    assert custom_heuristic(4, True, assignment, warehouse_csp) == score
+    warehouse_csp.assign(1, False, assignment)
+    custom_heuristic(4, False, assignment, warehouse_csp)
+    assert list(warehouse_csp.scorer.cache) == [(4, False)]
+    # UB = 12: com os pedidos 0, 2 e 3 (12 unidades) não cabe mais nada
+    for var in (2, 3):
+        warehouse_csp.assign(var, True, assignment)
+    assert custom_heuristic(4, True, assignment, warehouse_csp) == float('inf')
+
+
+def test_custom_order_search():
+    rng = random.Random(29)
+    for _ in range(5):
+        inst = random_instance(rng)
+        warehouse_csp = WarehouseCSP(inst)
+        solution = backtracking_search(warehouse_csp, order_domain_values=custom_order)
+        if best_objective(inst) is None:
+            assert solution is None
+        else:
+            wave = warehouse_csp.wave_of(solution)
+            assert wave.feasible and inst.LB <= wave.total_units <= inst.UB
+
+
+def test_greedy_wave():
+    rng = random.Random(14)
+    for _ in range(20):
+        inst = random_instance(rng, n_orders=12)
+        warehouse_csp = WarehouseCSP(inst)
+        wave = WaveState(inst)
+        added = greedy_fill(warehouse_csp, wave)
+        assert sorted(added) == wave.orders().tolist()
+        assert wave.feasible and wave.total_units <= inst.UB
+        best = greedy_wave(warehouse_csp)
+        if best is not None:
+            assert best.objective == pytest.approx(warehouse_csp.wave_objective(wave))
+            assert best.objective <= best_objective(inst) + 1e-9
+    # Só os candidatos dados entram
+    wave = WaveState(inst)
+    assert set(greedy_fill(warehouse_csp, wave, candidates=[0, 1])) <= {0, 1}
+
+
+def test_greedy_wave_charges_cover():
+    # Um só corredor atende UB unidades; o guloso não deve abrir os outros
+    warehouse_csp = WarehouseCSP(generate_instance(1000, seed=0))
+    best = greedy_wave(warehouse_csp)
+    assert len(best.corridors) == 1 and best.objective == warehouse_csp.UB == 1327
+
+
+def test_cover_stock():
+    rng = random.Random(15)
+    inst = random_instance(rng, n_orders=12)
+    warehouse_csp = WarehouseCSP(inst)
+    wave = WaveState(inst)
+    stock = CoverStock(warehouse_csp, wave)
+    for _ in range(40):
+        if rng.random() < 0.5:
+            order = rng.randrange(inst.n_orders)
+            (stock.remove if wave.selected[order] else stock.add)(order)
+        else:
+            corridor = rng.randrange(inst.n_corridors)
+            (stock.close if stock.chosen[corridor] else stock.open)([corridor])
+        chosen = np.flatnonzero(stock.chosen)
+        residual = -wave.demand
+        for c in chosen.tolist():
+            items, quantities = inst.corridor(c)
+            residual[items] += quantities
+        assert (stock.residual == residual).all()
+        for o in range(inst.n_orders):
+            items, quantities = inst.order(o)
+            assert stock.short[o] == (quantities > residual[items]).sum()
+        # Um corredor sozinho completa exatamente os pedidos do seu ganho
+        outside = np.flatnonzero(stock.short > 0)
+        gain = stock.gains(outside, warehouse_csp.summary.units)
+        for c in np.flatnonzero(~stock.chosen).tolist():
+            items, quantities = inst.corridor(c)
+            extra = residual.copy()
+            extra[items] += quantities
+            done = [o for o in outside.tolist()
+                    if (inst.order(o)[1] <= extra[inst.order(o)[0]]).all()]
+            assert gain[c] == warehouse_csp.summary.units[done].sum()
+        # corridors_for cobre a falta do pedido
+        for o in outside.tolist():
+            opened = stock.corridors_for(o)
+            if opened is not None:
+                items, quantities = inst.order(o)
+                extra = residual.copy()
+                for c in opened:
+                    extra[inst.corridor(c)[0]] += inst.corridor(c)[1]
+                assert not stock.chosen[opened].any()
+                assert (quantities <= extra[items]).all()
+
+
+def test_incremental_min_conflicts():
+    rng = random.Random(31)
+    solved = 0
+    for _ in range(6):
+        inst = random_instance(rng)
+        warehouse_csp = WarehouseCSP(inst)
+        solution = incremental.min_conflicts(warehouse_csp, max_steps=2000)
+        if solution is None:
+            continue
+        solved += 1
+        wave = warehouse_csp.wave_of(dict(solution))
+        assert wave.feasible and inst.LB <= wave.total_units <= inst.UB
+    assert solved >= 3
+
+
+def test_incremental_min_conflicts_tracks_wave():
+    rng = random.Random(37)
+    inst = random_instance(rng, n_orders=20)
+    warehouse_csp = WarehouseCSP(inst)
+    current = {var: rng.random() < 0.5 for var in warehouse_csp.variables}
+    tracker = incremental.WaveConflicts(warehouse_csp, current)
+    for _ in range(60):
+        var = rng.choice(warehouse_csp.variables)
+        tracker.flip(var, not current[var])
+        scratch = WaveState(inst)
+        scratch.track(dict(current))
+        selected = scratch.selected
+        bad = np.bincount(inst.order_row, weights=scratch.violated[inst.order_item],
+                          minlength=inst.n_orders)
+        assert np.array_equal(tracker.bad, bad)
+        assert sorted(tracker.violating.items) == np.flatnonzero(selected & (bad > 0)).tolist()
+        assert sorted(tracker.inside.items) == np.flatnonzero(selected).tolist()
+        assert tracker.wave.total_units == scratch.total_units
+
+
+def test_min_conflicts_helpers():
+    from csp import MapColoringCSP
+    australia = MapColoringCSP(list('RGB'), 'SA: WA NT Q NSW V; NT: WA Q; NSW: Q V; T: ')
+    current = {'SA': 'R', 'WA': 'R', 'NT': 'G', 'Q': 'B'}
+    assert sorted(incremental.conflicted_vars(australia, current)) == ['SA', 'WA']
+    assert incremental.num_conflicts(australia, 'SA', current, australia) == 1
+    assert incremental.choose_min_conflict_value(australia, 'WA', current, australia) == 'B'
+
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, 11, 12)
+    current = {o: o in (0, 1) for o in orders}
+    assert incremental.conflicted_vars(warehouse_csp, current) == [2, 3, 4]
+    assert incremental.num_conflicts(warehouse_csp, 2, current) == 1
+    assert incremental.choose_min_conflict_value(warehouse_csp, 2, current) is True
+    # is_solution consulta a restrição global, não os vizinhos (que não há)
+    assert not incremental.is_solution(warehouse_csp, current)
+    solution = incremental.min_conflicts(warehouse_csp, max_steps=2000)
+    assert solution is not None and incremental.is_solution(warehouse_csp, solution)
+    # As trocas contam nos mesmos contadores de WarehouseCSP.assign
+    warehouse_csp = WarehouseCSP(orders, items, corridor_items, 11, 12)
+    tracker = incremental.WaveConflicts(warehouse_csp, dict(current))
+    tracker.flip(2, True)
+    tracker.flip(2, True)
+    tracker.flip(0, False)
+    assert warehouse_csp.nassigns == warehouse_csp.stats.assignments == 2
+
+
+def test_incremental_min_conflicts_binary():
+    from csp import MapColoringCSP, NQueensCSP
+    australia = MapColoringCSP(list('RGB'), 'SA: WA NT Q NSW V; NT: WA Q; NSW: Q V; T: ')
+    assert incremental.is_solution(australia, incremental.min_conflicts(australia))
+    queens = NQueensCSP(8)
+    solution = incremental.min_conflicts(queens, max_steps=5000)
+    assert solution is not None and incremental.is_solution(queens, solution)
+
+
+def test_wave_problem_values_match_wave():
+    rng = random.Random(17)
+    for _ in range(5):
+        inst = random_instance(rng)
+        problem = WaveProblem(WarehouseCSP(inst), sample_size=None, seed=1)
+        state = problem.initial
+        for _ in range(40):
+            children = [problem.result(state, a) for a in problem.actions(state)]
+            state = rng.choice(children)
+            problem._goto(state)
+            wave = problem.wave
+            assert (state.units, state.corridors) == (wave.total_units, wave.num_corridors)
+            assert state.units <= inst.UB
+            admissible = wave.feasible and inst.LB <= wave.total_units
+            assert (state.value >= 0) == admissible
+            assert sorted(problem.orders(state)) == inst.order_ids[wave.orders()].tolist()
+        # Voltar a um estado distante refaz o caminho pelo ancestral comum
+        problem._goto(problem.initial)
+        assert problem.wave.num_selected == 0 and not problem.members
+
+
+def test_local_search():
+    rng = random.Random(19)
+    for _ in range(4):
+        inst = random_instance(rng)
+        expected = best_objective(inst)
+        warehouse_csp = WarehouseCSP(inst)
+        for search, options in ((hill_climbing, {}),
+                                (simulated_annealing, {'schedule': exp_schedule(1, 0.01, 300)})):
+            best = local_search(warehouse_csp, search, sample_size=None, seed=3, **options)
+            if best is None:
+                continue
+            wave = warehouse_csp.wave_of({o: True for o in best.orders})
+            assert wave.feasible and inst.LB <= wave.total_units <= inst.UB
+            assert best.objective <= expected + 1e-9
+
+
+def test_solver_stats_deadline():
+    stats = SolverStats(deadline=0.0)
+    with pytest.raises(SearchTimeout):
+        stats.tick()
+
+
+def test_solve_portfolio():
+    inst = random_instance(random.Random(11))
+    configs = [('branch_and_bound', 0), ('branch_and_bound', 1), ('mac', 0), ('dinkelbach', 0)]
+    best = solve_portfolio(inst, configs, time_limit=10.0, workers=2)
+    assert best.objective == pytest.approx(best_objective(inst))
+    assert best.info['strategy'] in {'branch_and_bound', 'dinkelbach'}
+    assert len(best.info['portfolio']) == len(configs)
+    assert not any(run['timed_out'] for run in best.info['portfolio'])
+
+
+def _broken_strategy(csp, time_limit, shared, seed):
+    raise RecursionError('maximum recursion depth exceeded')
+
+
+def _stuck_strategy(csp, time_limit, shared, seed):
+    with open(os.environ['STUCK_PID_FILE'], 'w') as f:
+        f.write(str(os.getpid()))
+    time.sleep(time_limit + 30)
+
+
+def test_portfolio_survives_failing_strategies(monkeypatch, tmp_path):
+    import warehouse_portfolio
+    monkeypatch.setenv('STUCK_PID_FILE', str(tmp_path / 'stuck.pid'))
+    monkeypatch.setitem(warehouse_portfolio.STRATEGIES, 'broken', _broken_strategy)
+    monkeypatch.setitem(warehouse_portfolio.STRATEGIES, 'stuck', _stuck_strategy)
+    inst = random_instance(random.Random(11))
+    configs = [('broken', 0), ('stuck', 0), ('branch_and_bound', 0)]
+    start = time.perf_counter()
+    best = solve_portfolio(inst, configs, time_limit=1.0, workers=3)
+    # Não espera a estratégia travada além da folga
+    assert time.perf_counter() - start < 1.0 + warehouse_portfolio.GRACE + 2.0
+    assert best.objective == pytest.approx(best_objective(inst))
+    runs = {run['strategy']: run for run in best.info['portfolio']}
+    assert 'RecursionError' in runs['broken']['error']
+    assert runs['stuck']['timed_out'] and runs['stuck']['error'] is None
+    # O processo travado foi encerrado, não só abandonado
+    with pytest.raises(ProcessLookupError):
+        os.kill(int((tmp_path / 'stuck.pid').read_text()), 0)
+    assert runs['branch_and_bound']['error'] is None
+
+
+def test_reduce_instance():
+    # Cinco cópias do pedido {0: 1}, dominadas pelo pedido 10 ({0: 2})
+    dup = {o: {0: 1} for o in range(5)}
+    inst = WarehouseInstance.from_dicts(
+        {**dup, 10: {0: 2}, 11: {1: 9}, 12: {0: 1, 1: 1}, 13: {1: 6}},
+        {0: {0}, 1: {0}}, {0: {0: 20, 1: 5}}, 1, 8)
+    reduction = reduce_instance(inst)
+    assert reduction.removed == {11: 'above_ub', 13: 'short_stock'}
+    # As cinco cópias viram agregados de pesos 1, 2 e 2
+    assert sorted(reduction.weight.tolist()) == [1, 1, 1, 2, 2]
+    assert sorted(reduction.expand(range(reduction.instance.n_orders))) == [0, 1, 2, 3, 4, 10, 12]
+    assert reduction.instance.order_units.sum() == inst.order_units[[0, 1, 2, 3, 4, 5, 7]].sum()
+    dominated = reduce_instance(inst, drop_dominated=True)
+    assert {o for o, why in dominated.removed.items() if why == 'dominated'} == {0, 1, 2, 3, 4}
+    # UB = 3: só três cópias cabem juntas
+    assert reduce_instance(inst, UB=3).counts()['surplus'] == 2
+
+
+def test_reduction_preserves_optimum():
+    rng = random.Random(21)
+    for _ in range(20):
+        inst = random_instance(rng, n_orders=10, n_items=4)
+        reduction = reduce_instance(inst)
+        assert reduction.instance.n_orders <= inst.n_orders
+        assert best_objective(reduction.instance) == best_objective(inst)
+
+
+def check_plan(inst, plan):
+    """Waves disjuntas, dentro de LB/UB e atendidas pelo estoque que sobrou das anteriores."""
+    stock = np.zeros((inst.n_corridors, inst.n_items), dtype=np.int64)
+    for c in range(inst.n_corridors):
+        its, qty = inst.corridor(c)
+        stock[c, its] = qty
+    corridor_index = {c: k for k, c in enumerate(inst.corridor_ids.tolist())}
+    planned = [o for wave in plan.waves for o in wave.orders]
+    assert len(planned) == len(set(planned))
+    assert sorted(planned + plan.remaining) == sorted(inst.order_ids.tolist())
+    for wave in plan.waves:
+        assert inst.LB <= wave.units <= inst.UB
+        demand = np.zeros(inst.n_items, dtype=np.int64)
+        for o in wave.orders:
+            its, qty = inst.order(inst.order_index[o])
+            demand[its] += qty
+        corridors = [corridor_index[c] for c in wave.corridors]
+        assert (stock[corridors].sum(axis=0) >= demand).all()
+        assert wave.objective == pytest.approx(wave.units / len(corridors))
+        # Consome corredor a corredor, na ordem da cobertura
+        for c in corridors:
+            take = np.minimum(stock[c], demand)
+            stock[c] -= take
+            demand -= take
+
+
+def test_plan_waves():
+    inst = generate_instance(300, n_items=40, n_corridors=12, wave_fraction=0.2, seed=6)
+    qty = inst.corridor_qty.copy()
+    plan = plan_waves(inst)
+    assert len(plan.waves) >= 3 and plan.units == sum(w.units for w in plan.waves)
+    check_plan(inst, plan)
+    # O estoque da instância dada não muda
+    assert np.array_equal(inst.corridor_qty, qty)
+    assert len(plan_waves(inst, max_waves=2).waves) == 2
+
+    # Com várias zonas, grupos de zonas são planejados em paralelo
+    inst = generate_instance(300, n_items=40, n_corridors=12, wave_fraction=0.1, zones=3, seed=6)
+    plan = plan_waves(inst, workers=2, max_waves=5, wave_time=0.05, seed=1)
+    assert plan.info['groups'] == 2 and len(plan.waves) == 5
+    check_plan(inst, plan)
+
+
+def test_load_instance(tmp_path):
+    path = tmp_path / 'instance.txt'
+    path.write_text('3 4 2\n'
+                    '2 0 3 2 1\n'
+                    '1 1 2\n'
+                    '3 0 1 2 2 3 1\n'
+                    '3 0 2 1 1 3 1\n'
+                    '2 1 4 2 3\n'
+                    '4 9\n')
+    loaded = load_instance(path)
+    assert (loaded.n_orders, loaded.n_items, loaded.n_corridors) == (3, 4, 2)
+    assert (loaded.LB, loaded.UB) == (4, 9)
+    assert loaded.order_units.tolist() == [4, 2, 4]
+    its, qty = loaded.corridor(1)
+    assert its.tolist() == [1, 2] and qty.tolist() == [4, 3]
+    assert loaded.item_corridors(1).tolist() == [0, 1]
+
+    write_instance(tmp_path / 'copy.txt', loaded)
+    assert (tmp_path / 'copy.txt').read_text() == path.read_text()
+
+
+def test_read_tokens(tmp_path, monkeypatch):
+    import warehouse_io
+    rng = np.random.default_rng(4)
+    values = rng.integers(-10 ** 12, 10 ** 12, 5000)
+    path = tmp_path / 'tokens.txt'
+    path.write_text('\n'.join(' '.join(map(str, row)) for row in values.reshape(-1, 10)) + '\n')
+    # Blocos pequenos cortam o arquivo em muitos pontos
+    monkeypatch.setattr(warehouse_io, 'CHUNK', 97)
+    tokens, heads = warehouse_io.read_tokens(path, lines=True)
+    assert tokens.tolist() == values.tolist()
+    assert heads.tolist() == list(range(0, 5000, 10))
+
+
+def test_load_instance_split_records(tmp_path):
+    # Registros que não seguem um por linha caem no percurso em Python
+    path = tmp_path / 'instance.txt'
+    path.write_text('3 4 2\n2 0 3\n2 1 1 1 2 3 0 1 2 2 3 1\n3 0 2 1 1 3 1 2 1 4 2 3 4 9')
+    loaded = load_instance(path)
+    assert loaded.order_units.tolist() == [4, 2, 4]
+    assert loaded.corridor(1)[1].tolist() == [4, 3] and (loaded.LB, loaded.UB) == (4, 9)
+
+
+@pytest.mark.parametrize('text', [
+    '3 4 2\n2 0 3 2 1\n1 1 2\n3 0 1 2 2 3a 1\n3 0 2 1 1 3 1\n2 1 4 2 3\n4 9\n',  # byte inválido
+    '3 4 2\n2 0 3 2 1\n1 1 - 2\n3 0 1 2 2 3 1\n3 0 2 1 1 3 1\n2 1 4 2 3\n4 9\n',  # sinal solto
+    '3 4 2\n2 0 3 2 1\n1 1 2\n3 0 1 2 2 3 1\n3 0 2 1 1 3 1\n2 1 4\n',  # registro truncado
+    '3 4 2\n2 0 3 2 1\n1 1 2\n3 0 1 2 2 3 1\n3 0 2 1 1 3 1\n2 1 4 2 3\n4\n',  # sem UB
+    '3 4 2\n2 0 3 2 1\n1 1 2\n3 0 1 2 2 3 1\n3 0 2 1 1 3 1\n2 1 4 2 3\n4 9 7\n',  # inteiro a mais
+    '3 4 2\n2 0 3 2 1\n1 4 2\n3 0 1 2 2 3 1\n3 0 2 1 1 3 1\n2 1 4 2 3\n4 9\n',  # item fora
+    '3 4 2\n2 0 3 2 1\n1 1 -2\n3 0 1 2 2 3 1\n3 0 2 1 1 3 1\n2 1 4 2 3\n4 9\n',  # negativo
+    '3 4 2\n2 0 3 2 1\n-1 1 2\n3 0 1 2 2 3 1\n3 0 2 1 1 3 1\n2 1 4 2 3\n4 9\n',  # k negativo
+    '3 4\n',  # cabeçalho incompleto
+])
+def test_load_instance_rejects_corrupt(tmp_path, text):
+    path = tmp_path / 'instance.txt'
+    path.write_text(text)
+    with pytest.raises(ValueError):
+        load_instance(path)
+    # Registros fora de linha também são conferidos
+    path.write_text(text.replace('\n', ' '))
+    with pytest.raises(ValueError):
+        load_instance(path)
+
+
+def test_write_solution(tmp_path):
+    warehouse_csp = WarehouseCSP(instance)
+    solution = backtracking_search(warehouse_csp)
+    selected, corridors = warehouse_csp.wave_selection(solution)
+    write_solution(tmp_path / 'solution.txt', selected, corridors)
+    assert read_solution(tmp_path / 'solution.txt') == (selected, corridors)
+    (tmp_path / 'empty.txt').write_text('')
+    with pytest.raises(ValueError):
+        read_solution(tmp_path / 'empty.txt')
+    (tmp_path / 'short.txt').write_text('2\n0\n1\n3\n0\n')
+    with pytest.raises(ValueError):
+        read_solution(tmp_path / 'short.txt')
+
+
+def test_generate_instance():
+    inst = generate_instance(200, n_items=30, n_corridors=8, items_per_order=(2, 4), seed=5)
+    again = generate_instance(200, n_items=30, n_corridors=8, items_per_order=(2, 4), seed=5)
+    assert (inst.n_orders, inst.n_items, inst.n_corridors) == (200, 30, 8)
+    assert np.array_equal(inst.order_item, again.order_item)
+    assert np.array_equal(inst.corridor_qty, again.corridor_qty)
+    sizes = np.diff(inst.order_ptr)
+    assert sizes.min() >= 1 and sizes.max() <= 4
+    # Com supply=1 o estoque de cada item cobre toda a sua demanda
+    demand = np.bincount(inst.order_item, weights=inst.order_qty, minlength=inst.n_items)
+    stock = np.bincount(inst.corridor_item, weights=inst.corridor_qty, minlength=inst.n_items)
+    assert (stock >= demand).all()
+    assert 1 <= inst.LB <= inst.UB and inst.UB >= inst.order_units.max()
+
+
+def test_zones():
+    inst = generate_instance(120, n_items=24, n_corridors=9, items_per_order=(1, 3),
+                             zones=3, seed=4)
+    zones = inst.zones
+    assert zones.n_zones >= 3
+    # Cada corredor só estoca itens da sua zona e cada pedido toca uma zona
+    stock_corridors = np.repeat(np.arange(inst.n_corridors), np.diff(inst.corridor_ptr))
+    assert np.array_equal(zones.corridor_zone[stock_corridors],
+                          zones.item_zone[inst.corridor_item])
+    assert all(len(zones.zones_of(o)) == 1 for o in range(inst.n_orders))
+    assert sorted(np.concatenate([zones.items_of(z) for z in range(zones.n_zones)])) \
+        == list(range(inst.n_items))
+
+    rng = random.Random(2)
+    cover = CorridorCover(inst)
+    wave = WaveState(inst)
+    assert wave.zoned
+    for _ in range(60):
+        o = rng.randrange(inst.n_orders)
+        if wave.selected[o]:
+            wave.remove(o)
+        else:
+            wave.add(o)
+        assert np.array_equal(wave.zone_violated, np.bincount(
+            zones.item_zone[wave.violated], minlength=zones.n_zones))
+        result = cover.wave_cover(wave)
+        if not wave.feasible:
+            assert result is None
+            continue
+        # A cobertura por zonas é a união das coberturas de cada zona
+        corridors, exact = result
+        items = np.flatnonzero(wave.demand)
+        covered = np.zeros(inst.n_items, dtype=np.int64)
+        for c in corridors.tolist():
+            its, qty = inst.corridor(c)
+            covered[its] += qty
+        assert (covered[items] >= wave.demand[items]).all()
+        assert len(corridors) >= cover.lower_bound(wave)
+        whole, whole_exact = CorridorCover(inst).cover(items, wave.demand[items])
+        if exact and whole_exact:
+            assert len(corridors) == len(whole)
+
+
+def test_run_benchmark(tmp_path):
+    output = tmp_path / 'bench.json'
+    result = run_benchmark(sizes=(10, 30), strategies=('backtracking', 'branch_and_bound'),
+                           time_limit=2.0, output=str(output), verbose=QUIET)
+    assert json.loads(output.read_text()) == json.loads(json.dumps(result))
+    assert [(r['n_orders'], r['strategy']) for r in result['runs']] == [
+        (10, 'backtracking'), (10, 'branch_and_bound'),
+        (30, 'backtracking'), (30, 'branch_and_bound')]
+    for run in result['runs']:
+        assert run['status'] == 'ok' and run['peak_memory'] > 0
+        assert run['best_objective'] == run['trace'][-1][1]
+        assert run['time_to_first_feasible'] == run['trace'][0][0] <= run['elapsed']
+        assert [v for _, v in run['trace']] == sorted(v for _, v in run['trace'])
+
+
+def test_nary_linear_propagation():
+    # x + y + z <= 1 e 2x - z >= 1: x = 1 força y = z = 0
+    csp = NaryCSP({v: {0, 1} for v in 'xyz'},
+                  [RestricaoLinear('xyz', [1, 1, 1], superior=1),
+                   RestricaoLinear('xz', [2, -1], inferior=1)])
+    consistent, domains, _ = ACSolverLinear(csp).GAC()
+    assert consistent and domains == {'x': {1}, 'y': {0}, 'z': {0}}
+    assert ACSolverLinear(csp).domain_splitting() == {'x': 1, 'y': 0, 'z': 0}
+    assert not csp.constraints[0].holds({'x': 1, 'y': 1, 'z': 0})
+
+
+def test_nary_model_is_optimal():
+    u_oi = {(o, i): q for o, row in orders.items() for i, q in row.items()}
+    u_ai = {(c, i): q for c, row in corridor_items.items() for i, q in row.items()}
+    solution, objective = solve_warehouse_problem(list(orders), list(items), list(corridor_items),
+                                                  u_oi, u_ai, LB, UB)
+    best = 0
+    for chosen in itertools.product((0, 1), repeat=len(orders)):
+        demand = {}
+        for o in itertools.compress(orders, chosen):
+            for i, q in orders[o].items():
+                demand[i] = demand.get(i, 0) + q
+        units = sum(demand.values())
+        if not LB <= units <= UB:
+            continue
+        for k in range(1, len(corridor_items) + 1):
+            if any(all(sum(corridor_items[c].get(i, 0) for c in cs) >= q for i, q in demand.items())
+                   for cs in itertools.combinations(corridor_items, k)):
+                best = max(best, units / k)
+                break
+    assert objective == best
+    assert all(solution[f'corredor_{c}'] in (0, 1) for c in corridor_items)
+
+
+def test_nary_strategy_returns_wave():
+    inst = generate_instance(60, seed=2)
+    csp = WarehouseCSP(inst)
+    found = resolver_wave(csp, time_limit=10)
+    exact = branch_and_bound(WarehouseCSP(inst), time_limit=30)
+    assert exact.optimal and found.objective == pytest.approx(exact.objective)
+    wave = csp.wave_of(found.assignment(csp))
+    assert wave.feasible and inst.LB <= wave.total_units <= inst.UB
+
+
+def test_nary_strategy_keeps_incumbent_on_timeout(monkeypatch):
+    import atv_prova
+    csp = WarehouseCSP(generate_instance(60, seed=2))
+    first = []
+
+    def expire(shared, value):
+        # O prazo acaba logo depois da primeira wave
+        first.append(value)
+        csp.stats.deadline = -math.inf
+
+    monkeypatch.setattr(atv_prova, 'publish', expire)
+    found = resolver_wave(csp)
+    assert len(first) == 1 and found.objective == first[0]
+    with pytest.raises(SearchTimeout):
+        resolver_wave(WarehouseCSP(generate_instance(60, seed=2)), time_limit=-1.0)
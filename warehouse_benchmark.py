@@ -0,0 +1,189 @@
+"""
+Benchmark de escalabilidade do resolvedor de waves.
+
+Para cada tamanho, sorteia uma instância (warehouse_generator) e roda cada
+estratégia com o mesmo prazo, registrando em JSON:
+
+    time_to_first_feasible   segundos até a primeira wave admissível
+    best_objective           melhor razão unidades / corredores encontrada
+    trace                    pares [segundos, objetivo] de cada melhora
+    constraint_checks        checagens da restrição global (e por segundo)
+    peak_memory              pico de memória alocada (tracemalloc), em bytes
+
+As estratégias são as do portfólio (warehouse_portfolio.STRATEGIES), a
+heurística customizada e o modelo n-ário do atv_prova (nary_ac); as melhoras
+são observadas pela incumbente que todas publicam (warehouse_search.publish),
+aqui trocada por um IncumbentTrace.
+
+    $ python warehouse_benchmark.py --sizes 10 100 1000 --time-limit 5 --output bench.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+import numpy as np
+
+from atv_prova import resolver_wave
+from csp import backtracking_search
+from heuristic import custom_order
+from WarehouseCSP import WarehouseCSP
+from warehouse_generator import generate_instance
+from warehouse_portfolio import STRATEGIES as PORTFOLIO, csp_strategy
+from warehouse_stats import QUIET, SUMMARY, SearchTimeout, SolverStats
+
+SIZES = (10, 100, 1000, 10000, 100000)
+DEFAULT_STRATEGIES = ('backtracking', 'mrv_lcv', 'mac', 'min_conflicts', 'custom')
+
+STRATEGIES = dict(PORTFOLIO, custom=csp_strategy(backtracking_search,
+                                                 order_domain_values=custom_order),
+                  nary_ac=resolver_wave)
+
+
+class IncumbentTrace:
+    """
+    Incumbente com a interface de multiprocessing.Value (value e get_lock) que
+    registra o instante de cada melhora publicada.
+    """
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.points = []
+        self._value = 0.0
+
+    def get_lock(self):
+        return contextlib.nullcontext()
+
+    @property
+    def value(self):
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        self._value = value
+        self.points.append([time.perf_counter() - self.start, value])
+
+
+def run_strategy(instance, strategy, time_limit=10.0, seed=0, memory=True):
+    """
+    Roda uma estratégia sobre a instância e devolve o registro da execução.
+
+    O status é 'ok', 'no_solution' (a busca terminou sem wave), 'timeout' (foi
+    interrompida no prazo) ou 'error' (com a exceção em 'error').
+    """
+    stats = SolverStats()
+    limit = sys.getrecursionlimit()
+    # backtracking_search desce um nível de recursão por pedido
+    sys.setrecursionlimit(max(limit, 4 * instance.n_orders + 1000))
+    if memory:
+        tracemalloc.start()
+    status, error, trace = 'ok', None, None
+    start = time.perf_counter()
+    try:
+        with stats.phase('construção'):
+            csp = WarehouseCSP(instance, stats=stats)
+        trace = IncumbentTrace()
+        if STRATEGIES[strategy](csp, time_limit, trace, seed) is None:
+            status = 'no_solution'
+    except SearchTimeout:
+        status = 'timeout'
+    except Exception as exc:  # o benchmark segue com as demais execuções
+        status, error = 'error', repr(exc)
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = tracemalloc.get_traced_memory()[1] if memory else None
+        if memory:
+            tracemalloc.stop()
+        sys.setrecursionlimit(limit)
+
+    points = trace.points if trace is not None else []
+    search_time = elapsed - stats.phases['construção']
+    return {
+        'strategy': strategy,
+        'seed': seed,
+        'status': status,
+        'error': error,
+        'build_time': stats.phases['construção'],
+        'elapsed': elapsed,
+        'time_to_first_feasible': points[0][0] if points else None,
+        'best_objective': points[-1][1] if points else None,
+        'trace': points,
+        'constraint_checks': stats.constraint_checks,
+        'checks_per_second': stats.constraint_checks / search_time if search_time > 0 else None,
+        'peak_memory': peak,
+        'stats': stats.as_dict(),
+    }
+
+
+def run_benchmark(sizes=SIZES, strategies=DEFAULT_STRATEGIES, time_limit=10.0, seed=0,
+                  memory=True, output=None, verbose=SUMMARY, **generator_options):
+    """
+    Varre os tamanhos e estratégias dados.
+
+    Args:
+        sizes (iterable): Números de pedidos das instâncias.
+        strategies (iterable): Nomes em STRATEGIES.
+        time_limit (float): Prazo de cada execução, em segundos.
+        seed (int): Semente das instâncias e das estratégias.
+        memory (bool): Mede o pico de memória com tracemalloc (que deixa a
+            alocação de objetos Python mais lenta).
+        output (str, optional): Arquivo JSON de saída.
+        verbose (int): SUMMARY imprime uma linha por execução; QUIET, nada.
+        **generator_options: Repassados a generate_instance.
+
+    Returns:
+        dict: {'meta': ..., 'runs': [...]}, o mesmo conteúdo gravado em output.
+    """
+    result = {
+        'meta': {
+            'date': datetime.datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'time_limit': time_limit,
+            'seed': seed,
+            'memory': memory,
+            'generator': generator_options,
+        },
+        'runs': [],
+    }
+    for size in sizes:
+        start = time.perf_counter()
+        instance = generate_instance(size, seed=seed, **generator_options)
+        generated = time.perf_counter() - start
+        for strategy in strategies:
+            run = run_strategy(instance, strategy, time_limit, seed, memory)
+            run.update(n_orders=instance.n_orders, n_items=instance.n_items,
+                       n_corridors=instance.n_corridors, LB=instance.LB, UB=instance.UB,
+                       generation_time=generated)
+            result['runs'].append(run)
+            if verbose > QUIET:
+                print(f"{size:>7} {strategy:<16} {run['status']:<11} "
+                      f"objetivo {run['best_objective']} "
+                      f"({run['checks_per_second'] or 0:.0f} checagens/s)")
+    if output:
+        with open(output, 'w') as f:
+            json.dump(result, f, indent=1)
+    return result
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--strategies', nargs='+', default=DEFAULT_STRATEGIES,
+                        choices=sorted(STRATEGIES))
+    parser.add_argument('--time-limit', type=float, default=10.0)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--no-memory', dest='memory', action='store_false',
+                        help='não mede o pico de memória (tracemalloc)')
+    parser.add_argument('--output', default='warehouse_benchmark.json')
+    args = parser.parse_args()
+    run_benchmark(args.sizes, args.strategies, args.time_limit, args.seed,
+                  args.memory, args.output)
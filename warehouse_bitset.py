@@ -0,0 +1,126 @@
+"""
+Bitsets de itens e corredores empacotados em palavras de 64 bits (NumPy).
+
+Um conjunto sobre n elementos ocupa ceil(n / 64) palavras; uma matriz de
+bitsets tem uma linha por conjunto. União, interseção e diferença são os
+operadores |, & e & ~ do NumPy, palavra a palavra, e a cardinalidade é
+`popcount`. Para buscas em Python puro, `to_int` converte uma linha num int.
+"""
+
+import numpy as np
+
+WORD = np.dtype('<u8')
+
+# Bits ligados de cada valor de byte, para o popcount sem np.bitwise_count (NumPy < 2.0)
+BYTE_BITS = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1)
+
+
+def n_words(n_bits):
+    """Número de palavras de 64 bits necessárias para n_bits elementos."""
+    return max(1, (n_bits + 63) // 64)
+
+
+def pack_pairs(rows, cols, n_rows, n_cols):
+    """Matriz de bitsets (n_rows x palavras) com o bit cols[k] ligado na linha rows[k]."""
+    cols = np.asarray(cols, dtype=np.int64)
+    width = n_words(n_cols)
+    matrix = np.zeros(n_rows * width, dtype=WORD)
+    if len(cols):
+        # Agrupa os bits por palavra e combina cada grupo com um único reduceat
+        word = np.asarray(rows, dtype=np.int64) * width + (cols >> 6)
+        order = np.argsort(word, kind='stable')
+        word = word[order]
+        bits = np.left_shift(np.uint64(1), (cols[order] & 63).astype(WORD))
+        starts = np.flatnonzero(np.concatenate(([True], word[1:] != word[:-1])))
+        matrix[word[starts]] = np.bitwise_or.reduceat(bits, starts)
+    return matrix.reshape(n_rows, width)
+
+
+def pack_rows(ptr, col, n_cols):
+    """Matriz de bitsets com o padrão de esparsidade de uma matriz CSR."""
+    rows = np.repeat(np.arange(len(ptr) - 1), np.diff(ptr))
+    return pack_pairs(rows, col, len(ptr) - 1, n_cols)
+
+
+def pack(indices, n_bits):
+    """Bitset (vetor de palavras) com os elementos dados."""
+    indices = np.asarray(indices, dtype=np.int64)
+    return pack_pairs(np.zeros(len(indices), dtype=np.int64), indices, 1, n_bits)[0]
+
+
+def unpack(words):
+    """Índices dos bits ligados de um bitset, em ordem crescente."""
+    return np.flatnonzero(np.unpackbits(np.ascontiguousarray(words, dtype=WORD).view(np.uint8),
+                                        bitorder='little'))
+
+
+def bitwise_count(words):
+    """Bits ligados de cada palavra, por tabela dos bytes (como np.bitwise_count)."""
+    words = np.asarray(words, dtype=WORD)
+    counts = BYTE_BITS[np.ascontiguousarray(words).reshape(-1).view(np.uint8)]
+    return counts.reshape(-1, WORD.itemsize).sum(axis=1).reshape(words.shape)
+
+
+def popcount(words, axis=-1):
+    """Número de bits ligados ao longo do eixo das palavras."""
+    return _bitwise_count(words).sum(axis=axis, dtype=np.int64)
+
+
+_bitwise_count = getattr(np, 'bitwise_count', bitwise_count)
+
+
+def union(matrix, rows):
+    """União das linhas dadas de uma matriz de bitsets."""
+    return np.bitwise_or.reduce(matrix[rows], axis=0, initial=0).astype(WORD)
+
+
+def union_rows(matrix, ptr, rows):
+    """
+    União, para cada linha r de uma matriz CSR (ptr, rows), dos bitsets
+    matrix[rows[ptr[r]:ptr[r + 1]]]; linhas vazias dão o conjunto vazio.
+    """
+    n_rows = len(ptr) - 1
+    result = np.zeros((n_rows, matrix.shape[1]), dtype=WORD)
+    nonempty = np.flatnonzero(np.diff(ptr))
+    if len(nonempty):
+        result[nonempty] = np.bitwise_or.reduceat(matrix[rows], ptr[nonempty], axis=0)
+    return result
+
+
+def toggle(words, indices):
+    """Inverte, no lugar, os bits dados (índices distintos)."""
+    indices = np.asarray(indices, dtype=np.int64)
+    np.bitwise_xor.at(words, indices >> 6, np.left_shift(np.uint64(1), (indices & 63).astype(WORD)))
+
+
+def to_int(words):
+    """Converte um bitset num int do Python (bit k = elemento k)."""
+    return int.from_bytes(np.ascontiguousarray(words, dtype=WORD).tobytes(), 'little')
+
+
+class BitsetIndex:
+    """
+    Bitsets fixos de uma WarehouseInstance:
+
+        order_items[o]       itens demandados pelo pedido o
+        item_corridors[i]    corredores associados ao item i
+        order_corridors[o]   corredores que o pedido o pode abrir (união dos de seus itens)
+
+    order_items ocupa n_orders * n_items / 8 bytes (mais de 100 MB com 100 mil
+    pedidos e 10 mil itens) e só é montado no primeiro uso.
+    """
+
+    def __init__(self, instance):
+        self.instance = instance
+        self._order_items = None
+        self.item_corridors = pack_rows(instance.item_ptr, instance.item_corridor,
+                                        instance.n_corridors)
+        self.order_corridors = union_rows(self.item_corridors, instance.order_ptr,
+                                          instance.order_item)
+
+    @property
+    def order_items(self):
+        if self._order_items is None:
+            inst = self.instance
+            self._order_items = pack_rows(inst.order_ptr, inst.order_item, inst.n_items)
+        return self._order_items
@@ -0,0 +1,171 @@
+"""
+Limitante superior da razão unidades / corredores pela relaxação linear.
+
+Com x[o] (pedido o na wave) e y[c] (corredor c aberto) em [0, 1], a relaxação é
+
+    max  u.x / sum(y)
+    s.a. Q^T x <= S^T y         (demanda de cada item cabe no estoque aberto)
+         LB <= u.x <= UB
+         sum(y) >= 1
+
+com u as unidades dos pedidos, Q a demanda pedido x item e S o estoque
+corredor x item. A transformação de Charnes-Cooper (t = 1 / sum(y), X = t x,
+Y = t y) a torna linear:
+
+    max  u.X
+    s.a. Q^T X - S^T Y <= 0
+         X - t <= 0,  Y - t <= 0
+         LB t <= u.X <= UB t
+         sum(Y) = 1,  0 <= t <= 1,  X, Y >= 0
+
+Toda wave viável é um ponto desse LP com o mesmo objetivo, de modo que o ótimo
+do LP limita por cima o de qualquer wave (e, com pedidos fixados, o de qualquer
+wave que os respeite). O estoque de cada item num corredor é limitado à maior
+demanda que uma wave pode ter dele (min(UB, demanda total dos pedidos que
+cabem)), o que continua válido para y inteiro e aperta a relaxação.
+
+O ótimo da raiz (lp_bound) serve de teto comum dos limitantes dos nós de
+branch_and_bound e limita o gap informado. Para podar, lp_node_bound resolve o LP
+com as fixações de cada nó (os pedidos da wave dentro, os já pulados fora), mas
+só nos nós rasos e dentro de um orçamento de tempo, já que cada LP custa muito
+mais que ratio_bound.
+"""
+
+import math
+import time
+
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+# Folga relativa somada ao ótimo do LP, para que erros de ponto flutuante não o
+# deixem abaixo do ótimo inteiro
+TOLERANCE = 1e-7
+
+
+class LPBound:
+    """
+    Relaxação linear de um WarehouseCSP, montada uma vez em matrizes esparsas e
+    resolvida pelo HiGHS (scipy.optimize.linprog) quantas vezes for preciso.
+
+    Variáveis, nesta ordem: X (um por pedido), Y (um por corredor) e t.
+    Pedidos que não cabem em wave nenhuma (csp.summary.fits) ficam fixos em 0.
+    """
+
+    def __init__(self, csp):
+        inst = csp.instance
+        n, m = inst.n_orders, inst.n_corridors
+        self.n_orders, self.n_corridors = n, m
+        fits = csp.summary.fits
+        units = csp.summary.units.astype(float)
+
+        demand = sparse.csr_matrix((inst.order_qty, inst.order_item, inst.order_ptr),
+                                   shape=(n, inst.n_items))
+        most = np.bincount(inst.order_item, weights=inst.order_qty * fits[inst.order_row],
+                           minlength=inst.n_items)
+        most = np.minimum(most, csp.UB)
+        stock = sparse.csr_matrix(
+            (np.minimum(inst.corridor_qty, most[inst.corridor_item]), inst.corridor_item,
+             inst.corridor_ptr), shape=(m, inst.n_items))
+        column = np.ones((1, 1))
+        self.A_ub = sparse.bmat([
+            [demand.T, -stock.T, None],
+            [sparse.identity(n), None, -np.ones((n, 1))],
+            [None, sparse.identity(m), -np.ones((m, 1))],
+            [units[None], None, -csp.UB * column],
+            [-units[None], None, csp.LB * column],
+        ], format='csr')
+        self.b_ub = np.zeros(self.A_ub.shape[0])
+        self.c = np.concatenate((-units, np.zeros(m + 1)))
+        self.bounds = np.zeros((n + m + 1, 2))
+        self.bounds[:, 1] = np.inf
+        self.bounds[:n, 1] = np.where(fits, np.inf, 0.0)
+        self.bounds[-1, 1] = 1.0
+        self.result = None
+
+    def solve(self, include=(), exclude=(), time_limit=None):
+        """
+        Resolve a relaxação com os pedidos dados fixados dentro ou fora da wave.
+
+        Args:
+            include (iterable): Índices internos de pedidos fixados na wave (x = 1).
+            exclude (iterable): Índices internos de pedidos fixados fora (x = 0).
+            time_limit (float, optional): Tempo máximo do HiGHS, em segundos.
+
+        Returns:
+            float: Limitante superior de unidades / corredores; -inf se nenhuma
+            wave respeita as fixações e inf se o LP não terminou no prazo.
+        """
+        n, m = self.n_orders, self.n_corridors
+        include = np.asarray(list(include), dtype=np.int64)
+        # sum(Y) = 1 e, para cada pedido incluído, X[o] - t = 0
+        k = len(include)
+        rows = np.concatenate((np.zeros(m, dtype=np.int64), np.arange(1, k + 1),
+                               np.arange(1, k + 1)))
+        cols = np.concatenate((n + np.arange(m), include, np.full(k, n + m)))
+        vals = np.concatenate((np.ones(m + k), -np.ones(k)))
+        A_eq = sparse.csr_matrix((vals, (rows, cols)), shape=(k + 1, n + m + 1))
+        b_eq = np.zeros(k + 1)
+        b_eq[0] = 1.0
+        bounds = self.bounds
+        exclude = list(exclude)
+        if exclude:
+            bounds = bounds.copy()
+            bounds[exclude, 1] = 0.0
+
+        options = {} if time_limit is None else {'time_limit': time_limit}
+        self.result = linprog(self.c, A_ub=self.A_ub, b_ub=self.b_ub, A_eq=A_eq, b_eq=b_eq,
+                              bounds=bounds, method='highs', options=options)
+        if self.result.status == 2:
+            return -math.inf
+        if self.result.status != 0:
+            return math.inf
+        value = -self.result.fun
+        return value + TOLERANCE * max(1.0, abs(value))
+
+
+def lp_bound(csp, time_limit=None):
+    """
+    Limitante superior de unidades / corredores de qualquer wave viável do CSP.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        time_limit (float, optional): Tempo máximo do LP, em segundos.
+
+    Returns:
+        float: O ótimo da relaxação linear (inf se não terminou no prazo, -inf
+        se não há wave viável nem fracionária).
+    """
+    with csp.stats.phase('lp_bound'):
+        return LPBound(csp).solve(time_limit=time_limit)
+
+
+def lp_node_bound(csp, max_depth=2, time_budget=None):
+    """
+    Limitante LP por nó para subset_search (argumento refine): resolve LPBound com
+    os pedidos da wave fixados dentro e os já decididos fora da wave fixados fora.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        max_depth (int): Só limita nós com até tantos pedidos na wave.
+        time_budget (float, optional): Tempo total dos LPs, em segundos; esgotado,
+            os nós deixam de ser limitados.
+
+    Returns:
+        callable: refine(wave, decided) -> float ou None.
+    """
+    lp = LPBound(csp)
+    spent = 0.0
+
+    def refine(wave, decided):
+        nonlocal spent
+        left = None if time_budget is None else time_budget - spent
+        if wave.num_selected > max_depth or (left is not None and left <= 0):
+            return None
+        start = time.perf_counter()
+        with csp.stats.phase('lp_bound'):
+            value = lp.solve(wave.orders(), decided[~wave.selected[decided]], time_limit=left)
+        spent += time.perf_counter() - start
+        return value
+
+    return refine
@@ -0,0 +1,66 @@
+"""Cache LRU das avaliações de waves (viabilidade, corredores e objetivo)."""
+
+from collections import OrderedDict
+from typing import NamedTuple
+
+import numpy as np
+
+
+class WaveEvaluation(NamedTuple):
+    """Avaliação completa de uma wave."""
+    feasible: bool        # capacidade atendida e LB <= unidades <= UB
+    corridors: np.ndarray  # corredores da cobertura mínima (índices internos)
+    objective: float      # unidades / len(corridors)
+
+
+class WaveCache:
+    """
+    Cache LRU chaveado pela chave canônica de uma wave (WaveState.key), junto com o
+    que mais a avaliação depender (em WarehouseCSP.evaluate, LB e UB).
+
+    Cada entrada custa ENTRY_BYTES mais o tamanho informado em `put`; as menos
+    usadas recentemente saem quando o total passa de `max_bytes`. Acertos e
+    faltas são contados em stats.cache_hits e stats.cache_misses.
+    """
+
+    # Estimativa do custo fixo de uma entrada (chave, tupla, array e nó do dicionário)
+    ENTRY_BYTES = 320
+
+    def __init__(self, max_bytes=32 << 20, stats=None):
+        self.max_bytes = max_bytes
+        self.stats = stats
+        self.entries = OrderedDict()
+        self.nbytes = 0
+
+    def __len__(self):
+        return len(self.entries)
+
+    def get(self, key):
+        """Valor guardado para key (que passa a ser o mais recente), ou None."""
+        value = self.entries.get(key)
+        if value is None:
+            if self.stats is not None:
+                self.stats.cache_misses += 1
+            return None
+        self.entries.move_to_end(key)
+        if self.stats is not None:
+            self.stats.cache_hits += 1
+        return value[0]
+
+    def put(self, key, value, nbytes=0):
+        """Guarda value, que ocupa cerca de nbytes além do custo fixo da entrada."""
+        size = self.ENTRY_BYTES + nbytes
+        if size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.nbytes -= old[1]
+        self.entries[key] = (value, size)
+        self.nbytes += size
+        while self.nbytes > self.max_bytes:
+            _, (_, evicted) = self.entries.popitem(last=False)
+            self.nbytes -= evicted
+
+    def clear(self):
+        self.entries.clear()
+        self.nbytes = 0
@@ -0,0 +1,239 @@
+"""Menor conjunto de corredores cujo estoque cobre a demanda de uma wave."""
+
+import numpy as np
+
+from warehouse_instance import csr_gather, csr_transpose
+
+
+class CorridorCover:
+    """
+    Cobertura mínima de corredores para uma demanda fixa.
+
+    Dada a demanda d (unidades por item) de um conjunto de pedidos, procura o menor
+    conjunto C de corredores com sum_{c em C} estoque[c, i] >= d[i] para todo item i:
+
+        1. entram direto os corredores obrigatórios, sem os quais algum item fica
+           sem estoque suficiente;
+        2. o resíduo é resolvido de forma exata, por busca em profundidade sobre
+           bitsets de corredores, se tiver até `exact_limit` corredores candidatos
+           (e a busca couber em `max_nodes` nós); senão vale o guloso, seguido da
+           remoção de corredores redundantes.
+
+    Os resultados ficam num cache indexado pela demanda, com até `cache_size`
+    entradas (as usadas há mais tempo saem primeiro). Em instâncias com várias
+    zonas (warehouse_zones), a cobertura de uma wave é a união das coberturas
+    das zonas que ela toca, guardadas num segundo cache pela chave da zona
+    (WaveState.zone_key): só as zonas alteradas desde a consulta anterior são
+    recalculadas.
+    """
+
+    def __init__(self, instance, exact_limit=24, max_nodes=20000, cache_size=4096):
+        self.instance = instance
+        self.exact_limit = exact_limit
+        self.max_nodes = max_nodes
+        self.cache_size = cache_size
+        self.cache = {}
+        self.zone_cache = {}
+        self.restock()
+
+    def restock(self):
+        """
+        Relê o estoque da instância, p.ex. depois de uma wave planejada consumi-lo
+        (warehouse_plan), e esvazia os caches.
+        """
+        instance = self.instance
+        self.cache.clear()
+        self.zone_cache.clear()
+        # Estoque item x corredor (CSR), com os corredores de cada item em ordem
+        # decrescente de estoque
+        ptr, corridor, stock = csr_transpose(instance.corridor_ptr, instance.corridor_item,
+                                             instance.n_items, instance.corridor_qty)
+        rows = np.repeat(np.arange(instance.n_items, dtype=np.int64), np.diff(ptr))
+        order = np.lexsort((-stock, rows))
+        self.item_ptr = ptr
+        self.item_corridor = corridor[order]
+        self.item_stock = stock[order]
+        # Estoque acumulado dentro de cada item, deslocado por item * stride para que
+        # uma única busca binária responda "quantos corredores bastam" para todos os itens
+        cum = np.cumsum(self.item_stock)
+        cum -= np.repeat(np.concatenate(([0], cum))[ptr[:-1]], np.diff(ptr))
+        self._stride = int(cum.max(initial=0)) + 1
+        self._cum = cum + rows * self._stride
+
+    def cover(self, items, qty):
+        """
+        Menor (ou quase menor) conjunto de corredores que cobre a demanda.
+
+        Args:
+            items (np.ndarray): Índices dos itens demandados, em ordem crescente.
+            qty (np.ndarray): Unidades demandadas de cada item.
+
+        Returns:
+            tuple ou None: (corredores, exato), com os índices dos corredores em ordem
+            crescente e exato=True se a cobertura é comprovadamente mínima; None se o
+            estoque total não cobre a demanda.
+        """
+        items = np.asarray(items, dtype=np.int64)
+        qty = np.asarray(qty, dtype=np.int64)
+        return self._cached(self.cache, items.tobytes() + qty.tobytes(),
+                            lambda: self._solve(items, qty))
+
+    def wave_cover(self, wave):
+        """Cobertura da demanda corrente de um WaveState (mesmo retorno de cover)."""
+        if not wave.zoned:
+            items = np.flatnonzero(wave.demand)
+            return self.cover(items, wave.demand[items])
+        keys = tuple(wave.zone_key(zone) for zone in np.flatnonzero(wave.zone_orders).tolist())
+        if len(keys) == 1:
+            return self._zone_cover(wave, keys[0])
+
+        def union():
+            parts = [self._zone_cover(wave, key) for key in keys]
+            if any(part is None for part in parts):
+                return None
+            if not parts:
+                return np.zeros(0, dtype=np.int64), True
+            return (np.sort(np.concatenate([corridors for corridors, _ in parts])),
+                    all(exact for _, exact in parts))
+
+        return self._cached(self.zone_cache, keys, union)
+
+    def _zone_cover(self, wave, key):
+        def solve():
+            items = self.instance.zones.items_of(key[0])
+            items = items[wave.demand[items] > 0]
+            return self.cover(items, wave.demand[items])
+
+        return self._cached(self.zone_cache, key, solve)
+
+    def _cached(self, cache, key, compute):
+        if key in cache:
+            # Reinsere no fim: o dicionário fica em ordem de uso (LRU)
+            cache[key] = result = cache.pop(key)
+            return result
+        result = compute()
+        if len(cache) >= self.cache_size:
+            del cache[next(iter(cache))]
+        cache[key] = result
+        return result
+
+    def lower_bound(self, wave):
+        """
+        Limitante inferior barato do tamanho da cobertura: para cada item, quantos
+        dos seus corredores mais abastecidos são necessários; vale o maior deles.
+        Como a cobertura só cresce com a demanda, vale também para qualquer wave
+        que contenha esta.
+        """
+        items = np.flatnonzero(wave.demand)
+        if not len(items):
+            return 0
+        target = wave.demand[items] + items * self._stride
+        needed = np.searchsorted(self._cum, target) - self.item_ptr[items] + 1
+        return int(needed.max())
+
+    def _solve(self, items, qty):
+        if not len(items):
+            return np.zeros(0, dtype=np.int64), True
+        pos = csr_gather(self.item_ptr, items)
+        col = np.repeat(np.arange(len(items)), np.diff(self.item_ptr)[items])
+        corridors, local = np.unique(self.item_corridor[pos], return_inverse=True)
+        # Estoque útil de cada corredor candidato para cada item (limitado à demanda)
+        useful = np.zeros((len(corridors), len(items)), dtype=np.int64)
+        useful[local, col] = np.minimum(self.item_stock[pos], qty[col])
+        total = useful.sum(axis=0)
+        if (total < qty).any():
+            return None
+
+        forced = ((total - useful) < qty).any(axis=1)
+        residual = np.maximum(qty - useful[forced].sum(axis=0), 0)
+        chosen = np.flatnonzero(forced).tolist()
+        exact = True
+        need = residual > 0
+        if need.any():
+            free = np.flatnonzero(~forced)
+            sub = np.minimum(useful[np.ix_(free, need)], residual[need])
+            keep = sub.any(axis=1)
+            free, sub = free[keep], sub[keep]
+            if len(free) <= self.exact_limit:
+                picked, exact = self._exact(sub, residual[need])
+            else:
+                picked, exact = self._greedy(sub, residual[need]), False
+            chosen.extend(free[picked].tolist())
+        return np.sort(corridors[chosen]), exact
+
+    def _greedy(self, sub, demand):
+        """Escolhe sempre o corredor que cobre mais unidades ainda faltantes."""
+        residual = demand.copy()
+        picked = []
+        available = np.ones(len(sub), dtype=bool)
+        while residual.any():
+            gain = np.where(available, np.minimum(sub, residual).sum(axis=1), -1)
+            c = int(gain.argmax())
+            picked.append(c)
+            available[c] = False
+            residual = np.maximum(residual - sub[c], 0)
+        # Remove os corredores que ficaram redundantes
+        covered = sub[picked].sum(axis=0)
+        for c in list(picked):
+            if (covered - sub[c] >= demand).all():
+                picked.remove(c)
+                covered -= sub[c]
+        return picked
+
+    def _exact(self, sub, demand):
+        """
+        Busca em profundidade pela menor cobertura do resíduo.
+
+        Ramifica sobre o item descoberto com menos corredores disponíveis: em cada
+        ramo entra um desses corredores e os anteriores são proibidos, de modo que
+        os ramos são disjuntos. Escolhidos e proibidos são bitsets (int); o nó é
+        podado se algum item não pode mais ser coberto pelos corredores disponíveis
+        ou se o limitante por item não melhora a melhor cobertura.
+        """
+        n_corridors, n_items = sub.shape
+        stock = sub.T.tolist()
+        # Corredores de cada item, do mais para o menos abastecido
+        ranked = [[c for c in np.argsort(-sub[:, j], kind='stable').tolist() if stock[j][c]]
+                  for j in range(n_items)]
+        candidates = [sum(1 << c for c in ranked[j]) for j in range(n_items)]
+        best = self._greedy(sub, demand)
+        nodes = 0
+
+        def needed(j, residual, blocked):
+            count = 0
+            for c in ranked[j]:
+                if not blocked >> c & 1:
+                    residual -= stock[j][c]
+                    count += 1
+                    if residual <= 0:
+                        return count
+            return n_corridors + 1
+
+        def search(chosen, banned, residual, size):
+            nonlocal best, nodes
+            nodes += 1
+            if nodes > self.max_nodes:
+                return
+            uncovered = [j for j in range(n_items) if residual[j] > 0]
+            if not uncovered:
+                best = [c for c in range(n_corridors) if chosen >> c & 1]
+                return
+            blocked = chosen | banned
+            bound, branch, fewest = 0, None, n_corridors + 1
+            for j in uncovered:
+                bound = max(bound, needed(j, residual[j], blocked))
+                available = bin(candidates[j] & ~blocked).count('1')
+                if available < fewest:
+                    branch, fewest = j, available
+            if size + bound >= len(best):
+                return
+            for c in ranked[branch]:
+                if blocked >> c & 1:
+                    continue
+                search(chosen | 1 << c, banned,
+                       [max(r - s[c], 0) for r, s in zip(residual, stock)], size + 1)
+                banned |= 1 << c
+                blocked |= 1 << c
+
+        search(0, 0, demand.tolist(), 0)
+        return best, nodes <= self.max_nodes
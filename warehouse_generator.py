@@ -0,0 +1,112 @@
+"""
+Gerador de instâncias sintéticas do problema de waves, reprodutível por semente.
+
+Tudo é sorteado de forma vetorizada (NumPy), de modo que instâncias com centenas
+de milhares de pedidos saem em poucos segundos:
+
+    - cada pedido sorteia cerca de `items_per_order` itens, com popularidade
+      Zipf de expoente `demand_skew` (itens repetidos no sorteio se fundem), e
+      uma quantidade em `quantity` para cada um;
+    - cada item fica em `corridors_per_item` corredores, com estoque total igual
+      a `supply` vezes a sua demanda total, dividido entre os corredores com
+      pesos u ** stock_skew (u uniforme): 0 divide por igual, valores maiores
+      concentram o estoque em poucos corredores;
+    - UB é a fração `wave_fraction` do total de unidades (no mínimo o maior
+      pedido) e LB = tightness * UB;
+    - com `zones` > 1, itens e corredores são divididos em zonas de tamanhos
+      parecidos: cada item só fica em corredores da sua zona e cada pedido só
+      pede itens de uma zona (sorteada), como num armazém setorizado.
+"""
+
+import numpy as np
+
+from warehouse_instance import WarehouseInstance
+
+
+def _distinct_pairs(rows, cols):
+    """Ordena os pares (linha, coluna) e remove os repetidos."""
+    order = np.lexsort((cols, rows))
+    rows, cols = rows[order], cols[order]
+    keep = np.ones(len(rows), dtype=bool)
+    keep[1:] = (rows[1:] != rows[:-1]) | (cols[1:] != cols[:-1])
+    return rows[keep], cols[keep]
+
+
+def _csr(rows, cols, vals, n_rows):
+    ptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(rows, minlength=n_rows), out=ptr[1:])
+    return ptr, cols, vals
+
+
+def generate_instance(n_orders, n_items=None, n_corridors=None, items_per_order=(1, 10),
+                      quantity=(1, 10), corridors_per_item=(1, 4), demand_skew=1.0,
+                      stock_skew=1.0, supply=1.0, wave_fraction=0.05, tightness=0.5, zones=1,
+                      seed=None):
+    """
+    Sorteia uma WarehouseInstance.
+
+    Args:
+        n_orders (int): Número de pedidos.
+        n_items (int, optional): Número de itens; por padrão max(5, n_orders // 10).
+        n_corridors (int, optional): Número de corredores; por padrão
+            max(3, n_orders // 200).
+        items_per_order (tuple): Faixa (mín, máx) de itens por pedido.
+        quantity (tuple): Faixa (mín, máx) de unidades por item de um pedido.
+        corridors_per_item (tuple): Faixa (mín, máx) de corredores por item.
+        demand_skew (float): Expoente Zipf da popularidade dos itens (0 = uniforme).
+        stock_skew (float): Concentração do estoque de cada item entre seus corredores.
+        supply (float): Estoque total de cada item relativo à sua demanda total.
+        wave_fraction (float): UB como fração do total de unidades dos pedidos.
+        tightness (float): LB como fração de UB (1 = LB igual a UB).
+        zones (int): Número de zonas independentes (no máximo o de corredores).
+        seed (int, optional): Semente do gerador.
+
+    Returns:
+        WarehouseInstance: A instância sorteada.
+    """
+    rng = np.random.default_rng(seed)
+    n_items = n_items or max(5, n_orders // 10)
+    n_corridors = n_corridors or max(3, n_orders // 200)
+
+    # Pedidos
+    popularity = rng.permutation(np.arange(1, n_items + 1, dtype=float) ** -demand_skew)
+    popularity /= popularity.sum()
+    low, high = items_per_order
+    sizes = rng.integers(low, min(high, n_items) + 1, n_orders)
+    rows = np.repeat(np.arange(n_orders), sizes)
+    cols = rng.choice(n_items, len(rows), p=popularity)
+    if zones > 1:
+        # Leva cada item sorteado para a zona do pedido: zona z tem os itens
+        # item_lo[z]..item_lo[z + 1] - 1
+        item_lo = np.arange(zones + 1) * n_items // zones
+        zone = rng.integers(0, zones, n_orders)[rows]
+        cols = item_lo[zone] + cols % np.diff(item_lo)[zone]
+    rows, cols = _distinct_pairs(rows, cols)
+    qty = rng.integers(quantity[0], quantity[1] + 1, len(rows))
+    order_ptr, order_item, order_qty = _csr(rows, cols, qty, n_orders)
+
+    # Corredores: cada item em alguns corredores, com o estoque dividido entre eles
+    low, high = corridors_per_item
+    copies = rng.integers(low, min(high, n_corridors) + 1, n_items)
+    items = np.repeat(np.arange(n_items), copies)
+    corridors = rng.integers(0, n_corridors, len(items))
+    if zones > 1:
+        corridor_lo = np.arange(zones + 1) * n_corridors // zones
+        zone = np.searchsorted(item_lo, items, side='right') - 1
+        corridors = corridor_lo[zone] + corridors % np.diff(corridor_lo)[zone]
+    items, corridors = _distinct_pairs(items, corridors)
+    demand = np.bincount(order_item, weights=order_qty, minlength=n_items)
+    supply = np.maximum(1, np.ceil(supply * demand))
+    weight = rng.random(len(items)) ** stock_skew
+    share = weight / np.bincount(items, weights=weight, minlength=n_items)[items]
+    stock = np.maximum(1, np.ceil(share * supply[items])).astype(np.int64)
+    order = np.lexsort((items, corridors))
+    corridor_ptr, corridor_item, corridor_qty = _csr(corridors[order], items[order],
+                                                     stock[order], n_corridors)
+
+    units = np.bincount(rows, weights=qty, minlength=n_orders)
+    UB = max(int(units.max(initial=0)), int(round(wave_fraction * units.sum())))
+    LB = max(1, int(round(tightness * UB)))
+    return WarehouseInstance(order_ptr, order_item, order_qty,
+                             corridor_ptr, corridor_item, corridor_qty,
+                             LB, UB, n_items=n_items)
@@ -0,0 +1,269 @@
+"""
+Construção gulosa de uma wave sobre os arrays da WarehouseInstance.
+
+O objetivo cobra só a cobertura mínima de corredores da wave, não todos os
+corredores que estocam os seus itens. Por isso a construção mantém uma cobertura
+explícita (CoverStock): os corredores escolhidos e, para cada item, o estoque
+que sobra neles depois da demanda da wave. Um pedido custa apenas os corredores
+que ele precisa além dessa cobertura:
+
+    - enquanto algum pedido cabe no estoque que sobra, entra o de mais unidades,
+      sem abrir corredor;
+    - senão abre o corredor que, sozinho, libera mais unidades; se nenhum
+      corredor basta para um pedido, abre os corredores que cobrem a falta do
+      pedido de mais unidades (o guloso de csp.cover).
+
+UB só diminui a folga, e os pedidos, ordenados por unidades, saem por um
+ponteiro. Depois de atingir LB a construção só abre um corredor se a razão
+projetada supera o objetivo corrente (csp.wave_objective).
+"""
+
+import time
+
+import numpy as np
+
+from WarehouseCSP import WaveState
+from warehouse_instance import csr_gather, row_sums
+from warehouse_search import wave_solution
+
+
+class CoverStock:
+    """
+    Cobertura de corredores de uma wave e o estoque que sobra nela, em O(delta).
+
+        chosen[c]      se o corredor c está na cobertura
+        residual[i]    estoque do item i nos corredores escolhidos menos a demanda
+        short[o]       itens do pedido o acima do residual (0: o pedido entra sem
+                       abrir corredor)
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        wave (WaveState): A wave; os pedidos entram e saem por add e remove.
+        corridors (iterable, optional): Cobertura inicial; por padrão a cobertura
+            mínima da wave (csp.wave_corridors), vazia se a wave estiver vazia.
+    """
+
+    def __init__(self, csp, wave, corridors=None):
+        inst = csp.instance
+        self.csp = csp
+        self.wave = wave
+        if corridors is None:
+            corridors = csp.wave_corridors(wave) if wave.num_selected else ()
+        self.chosen = np.zeros(inst.n_corridors, dtype=bool)
+        self.residual = -wave.demand
+        self.short = np.bincount(inst.order_row, minlength=inst.n_orders,
+                                 weights=inst.order_qty > self.residual[inst.order_item])
+        self.short = self.short.astype(np.int64)
+        self.open(np.asarray(corridors, dtype=np.int64))
+
+    @property
+    def size(self):
+        """Número de corredores escolhidos."""
+        return int(self.chosen.sum())
+
+    def _shift(self, items, delta):
+        """Soma delta ao residual dos itens (sem repetição) e corrige short dos seus pedidos."""
+        ptr, orders, qty = self.csp.instance.item_orders
+        entries = csr_gather(ptr, items)
+        lengths = np.diff(ptr)[items]
+        before = qty[entries] > np.repeat(self.residual[items], lengths)
+        self.residual[items] += delta
+        after = qty[entries] > np.repeat(self.residual[items], lengths)
+        changed = before != after
+        np.add.at(self.short, orders[entries[changed]], np.where(after[changed], 1, -1))
+
+    def _stock(self, corridors):
+        inst = self.csp.instance
+        entries = csr_gather(inst.corridor_ptr, corridors)
+        items, where = np.unique(inst.corridor_item[entries], return_inverse=True)
+        return items, np.bincount(where, weights=inst.corridor_qty[entries]).astype(np.int64)
+
+    def open(self, corridors):
+        """Inclui os corredores na cobertura."""
+        corridors = np.asarray(corridors, dtype=np.int64)
+        corridors = np.unique(corridors[~self.chosen[corridors]])
+        if len(corridors):
+            self.chosen[corridors] = True
+            self._shift(*self._stock(corridors))
+
+    def close(self, corridors):
+        """Retira os corredores da cobertura."""
+        corridors = np.asarray(corridors, dtype=np.int64)
+        corridors = np.unique(corridors[self.chosen[corridors]])
+        if len(corridors):
+            self.chosen[corridors] = False
+            items, stock = self._stock(corridors)
+            self._shift(items, -stock)
+
+    def release(self):
+        """
+        Fecha, do menor para o maior, os corredores da cobertura cujo estoque a
+        wave não usa (p.ex. depois de retirar pedidos).
+        """
+        inst = self.csp.instance
+        chosen = np.flatnonzero(self.chosen)
+        totals = row_sums(inst.corridor_ptr, inst.corridor_qty)[chosen]
+        for corridor in chosen[np.argsort(totals, kind='stable')].tolist():
+            items, quantities = inst.corridor(corridor)
+            if (self.residual[items] >= quantities).all():
+                self.close([corridor])
+
+    def add(self, order):
+        """Inclui o pedido na wave e consome o seu estoque na cobertura."""
+        if self.wave.selected[order]:
+            return
+        self.wave.add(order)
+        items, quantities = self.csp.instance.order(order)
+        self._shift(items, -quantities)
+
+    def remove(self, order):
+        """Retira o pedido da wave e devolve o seu estoque à cobertura."""
+        if not self.wave.selected[order]:
+            return
+        self.wave.remove(order)
+        items, quantities = self.csp.instance.order(order)
+        self._shift(items, quantities)
+
+    def shortfall(self, order):
+        """(itens, unidades) que faltam ao pedido na cobertura."""
+        items, quantities = self.csp.instance.order(order)
+        need = quantities - self.residual[items]
+        return items[need > 0], need[need > 0]
+
+    def gains(self, orders, units):
+        """
+        Para cada corredor fora da cobertura, a soma de `units` dos pedidos dados
+        que ele, sozinho, completaria.
+        """
+        inst, cover = self.csp.instance, self.csp.cover
+        gain = np.zeros(inst.n_corridors)
+        orders = orders[self.short[orders] > 0]
+        entries = csr_gather(inst.order_ptr, orders)
+        items = inst.order_item[entries]
+        need = inst.order_qty[entries] - self.residual[items]
+        lacking = need > 0
+        entries, items, need = entries[lacking], items[lacking], need[lacking]
+        stocked = csr_gather(cover.item_ptr, items)
+        lengths = np.diff(cover.item_ptr)[items]
+        corridor = cover.item_corridor[stocked]
+        ok = (cover.item_stock[stocked] >= np.repeat(need, lengths)) & ~self.chosen[corridor]
+        rows = np.repeat(inst.order_row[entries].astype(np.int64), lengths)[ok]
+        keys, counts = np.unique(rows * inst.n_corridors + corridor[ok], return_counts=True)
+        rows, corridor = np.divmod(keys, inst.n_corridors)
+        unlocked = counts == self.short[rows]
+        np.add.at(gain, corridor[unlocked], units[rows[unlocked]])
+        return gain
+
+    def corridors_for(self, order):
+        """
+        Corredores fora da cobertura que completam o pedido, pelo guloso de
+        csp.cover (o que mais supre a falta primeiro); None se não bastam.
+        """
+        cover = self.csp.cover
+        items, need = self.shortfall(order)
+        opened = []
+        while len(items):
+            stocked = csr_gather(cover.item_ptr, items)
+            corridor = cover.item_corridor[stocked]
+            free = ~self.chosen[corridor] & ~np.isin(corridor, opened)
+            if not free.any():
+                return None
+            lengths = np.diff(cover.item_ptr)[items]
+            supply = np.minimum(cover.item_stock[stocked], np.repeat(need, lengths))
+            totals = np.bincount(corridor[free], weights=supply[free])
+            best = int(np.argmax(totals))
+            opened.append(best)
+            got = np.zeros(len(items), dtype=np.int64)
+            mine = corridor == best
+            np.add.at(got, np.repeat(np.arange(len(items)), lengths)[mine],
+                      cover.item_stock[stocked][mine])
+            need = need - got
+            items, need = items[need > 0], need[need > 0]
+        return opened
+
+
+def greedy_fill(csp, wave, candidates=None, stock=None):
+    """
+    Completa a wave gulosamente (ver o módulo) a partir do seu estado atual.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém (LB, UB, csp.summary e csp.cover).
+        wave (WaveState): A wave a completar; os pedidos entram por wave.add.
+        candidates (array, optional): Índices internos dos pedidos que podem
+            entrar; por padrão todos os que cabem (csp.summary.fits).
+        stock (CoverStock, optional): Cobertura da wave a partir da qual
+            completar; por padrão a cobertura mínima da wave.
+
+    Returns:
+        list: Os pedidos incluídos, na ordem de inclusão.
+    """
+    inst, summary = csp.instance, csp.summary
+    units = summary.units
+    alive = summary.fits & ~wave.selected
+    if candidates is not None:
+        allowed = np.zeros(inst.n_orders, dtype=bool)
+        allowed[np.asarray(candidates, dtype=np.int64)] = True
+        alive &= allowed
+
+    if stock is None:
+        stock = CoverStock(csp, wave)
+    by_units = np.argsort(-units, kind='stable')
+    descending = -units[by_units]
+    big = 0
+
+    added = []
+    while True:
+        # Pedidos que já não cabem na folga de UB nunca mais cabem
+        start, big = big, int(np.searchsorted(descending, wave.total_units - csp.UB))
+        alive[by_units[start:big]] = False
+
+        ranked = by_units[big:][alive[by_units[big:]]]
+        if not len(ranked):
+            break
+        ready = ranked[stock.short[ranked] == 0]
+        if len(ready):
+            order = int(ready[0])
+            alive[order] = False
+            stock.add(order)
+            csp.stats.constraint_checks += 1
+            added.append(order)
+            continue
+
+        # Nenhum pedido cabe na cobertura: abrir corredores
+        slack = csp.UB - wave.total_units
+        gain = stock.gains(ranked, units)
+        corridor = int(np.argmax(gain))
+        if gain[corridor] > 0:
+            opened, projected = [corridor], min(gain[corridor], slack)
+        else:
+            order = int(ranked[0])
+            opened = stock.corridors_for(order)
+            if opened is None:
+                alive[order] = False
+                continue
+            projected = units[order]
+        if wave.total_units >= csp.LB and wave.num_selected and (
+                (wave.total_units + projected) / (stock.size + len(opened))
+                <= csp.wave_objective(wave)):
+            break
+        stock.open(opened)
+    return added
+
+
+def greedy_wave(csp):
+    """
+    Wave gulosa construída do zero (ver o módulo), p.ex. para semear as buscas.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+
+    Returns:
+        WaveSolution ou None: a wave, se atingir LB.
+    """
+    start = time.perf_counter()
+    wave = WaveState(csp.instance)
+    with csp.stats.phase('greedy'):
+        greedy_fill(csp, wave)
+    if not (wave.feasible and csp.LB <= wave.total_units <= csp.UB):
+        return None
+    return wave_solution(csp, wave=wave, elapsed=time.perf_counter() - start)
@@ -0,0 +1,238 @@
+"""Representação compacta (CSR) de instâncias do problema de seleção de waves."""
+
+import numpy as np
+
+INDEX = np.int32
+QUANTITY = np.int64
+
+
+def csr_from_rows(rows, column_index):
+    """
+    Monta uma matriz esparsa em formato CSR a partir de uma lista de dicionários.
+
+    Args:
+        rows (list): Lista de dicionários {coluna_id: quantidade}, um por linha.
+        column_index (dict): Mapeamento coluna_id -> índice interno.
+
+    Returns:
+        tuple: (ptr, col, val) com ptr de tamanho len(rows) + 1.
+    """
+    lengths = np.fromiter((len(row) for row in rows), dtype=np.int64, count=len(rows))
+    ptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=ptr[1:])
+    col = np.fromiter((column_index[c] for row in rows for c in row), dtype=INDEX, count=ptr[-1])
+    val = np.fromiter((q for row in rows for q in row.values()), dtype=QUANTITY, count=ptr[-1])
+    return ptr, col, val
+
+
+def csr_gather(ptr, rows):
+    """Retorna as posições (no vetor de colunas) de todas as entradas das linhas dadas."""
+    rows = np.asarray(rows, dtype=np.int64)
+    starts = ptr[rows]
+    lengths = ptr[rows + 1] - starts
+    offsets = np.cumsum(lengths) - lengths
+    return np.arange(lengths.sum()) + np.repeat(starts - offsets, lengths)
+
+
+def csr_transpose(ptr, col, n_cols, val=None):
+    """
+    Transpõe uma matriz CSR; retorna (ptr, col) da transposta, ou (ptr, col, val)
+    se os valores forem dados.
+    """
+    n_rows = len(ptr) - 1
+    rows = np.repeat(np.arange(n_rows, dtype=INDEX), np.diff(ptr))
+    # Chaves únicas (coluna, linha): a ordenação não precisa ser estável
+    order = np.argsort(col.astype(np.int64) * max(n_rows, 1) + rows)
+    t_ptr = np.zeros(n_cols + 1, dtype=np.int64)
+    np.cumsum(np.bincount(col, minlength=n_cols), out=t_ptr[1:])
+    if val is None:
+        return t_ptr, rows[order]
+    return t_ptr, rows[order], val[order]
+
+
+def merge_rows(ptr_a, col_a, ptr_b, col_b, n_cols):
+    """União, linha a linha, de duas matrizes CSR de padrão (sem valores); retorna (ptr, col)."""
+    ptr_a, ptr_b = np.asarray(ptr_a, dtype=np.int64), np.asarray(ptr_b, dtype=np.int64)
+    n_rows = len(ptr_a) - 1
+    rows = np.concatenate((np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(ptr_a)),
+                           np.repeat(np.arange(n_rows, dtype=np.int64), np.diff(ptr_b))))
+    keys = np.unique(rows * max(n_cols, 1) + np.concatenate((col_a, col_b)).astype(np.int64))
+    ptr = np.zeros(n_rows + 1, dtype=np.int64)
+    np.cumsum(np.bincount(keys // max(n_cols, 1), minlength=n_rows), out=ptr[1:])
+    return ptr, keys % max(n_cols, 1)
+
+
+def row_sums(ptr, val):
+    """Soma de cada linha de uma matriz CSR (linhas vazias somam 0)."""
+    total = np.zeros(len(val) + 1, dtype=QUANTITY)
+    np.cumsum(val, out=total[1:])
+    return total[ptr[1:]] - total[ptr[:-1]]
+
+
+class WarehouseInstance:
+    """
+    Instância do problema de waves guardada em arrays NumPy.
+
+    Pedidos, itens e corredores são remapeados para índices inteiros 0..n-1;
+    os ids originais ficam em order_ids, item_ids e corridor_ids.
+
+        order_ptr, order_item, order_qty            demanda pedido x item (CSR)
+        corridor_ptr, corridor_item, corridor_qty   estoque corredor x item (CSR)
+        item_ptr, item_corridor                     corredores de cada item (CSR): os associados
+                                                    e os que o estocam
+        order_units                                 total de unidades de cada pedido
+        item_stock                                  estoque total de cada item
+        item_orders, corridor_orders                índices transpostos, montados no primeiro uso
+        order_index                                 id original -> índice do pedido, idem
+        order_keys                                  chave aleatória de cada pedido (hash de waves)
+        order_row                                   pedido de cada entrada de order_item
+        zones                                       componentes item x corredor (ZoneIndex)
+        LB, UB                                      limites do tamanho da wave
+    """
+
+    def __init__(self, order_ptr, order_item, order_qty, corridor_ptr, corridor_item, corridor_qty,
+                 LB, UB, n_items=None, item_ptr=None, item_corridor=None,
+                 order_ids=None, item_ids=None, corridor_ids=None):
+        """
+        Args:
+            order_ptr, order_item, order_qty: Demanda pedido x item em CSR.
+            corridor_ptr, corridor_item, corridor_qty: Estoque corredor x item em CSR.
+            LB (int): Limite inferior para o tamanho da wave.
+            UB (int): Limite superior para o tamanho da wave.
+            n_items (int, optional): Número de itens; inferido das colunas se omitido.
+            item_ptr, item_corridor (optional): Corredores associados a cada item em CSR;
+                os que estocam o item são sempre acrescentados.
+            order_ids, item_ids, corridor_ids (optional): Ids originais; por padrão 0..n-1.
+        """
+        self.order_ptr = np.asarray(order_ptr, dtype=np.int64)
+        self.order_item = np.asarray(order_item, dtype=INDEX)
+        self.order_qty = np.asarray(order_qty, dtype=QUANTITY)
+        self.corridor_ptr = np.asarray(corridor_ptr, dtype=np.int64)
+        self.corridor_item = np.asarray(corridor_item, dtype=INDEX)
+        self.corridor_qty = np.asarray(corridor_qty, dtype=QUANTITY)
+        self.LB = LB
+        self.UB = UB
+
+        self.n_orders = len(self.order_ptr) - 1
+        self.n_corridors = len(self.corridor_ptr) - 1
+        if n_items is None:
+            n_items = 1 + max(self.order_item.max(initial=-1), self.corridor_item.max(initial=-1))
+        self.n_items = int(n_items)
+
+        stock_ptr, stock_corridor = csr_transpose(self.corridor_ptr, self.corridor_item,
+                                                  self.n_items)
+        if item_ptr is not None:
+            # A associação passa a incluir todo corredor que estoca o item: assim a
+            # capacidade dos corredores abertos de um item demandado é o estoque
+            # total dele, e as violações só crescem ao incluir pedidos
+            item_ptr, stock_corridor = merge_rows(item_ptr, item_corridor,
+                                                  stock_ptr, stock_corridor, self.n_corridors)
+            stock_ptr = item_ptr
+        self.item_ptr = np.asarray(stock_ptr, dtype=np.int64)
+        self.item_corridor = np.asarray(stock_corridor, dtype=INDEX)
+
+        self.order_ids = np.arange(self.n_orders) if order_ids is None else np.asarray(order_ids)
+        self.item_ids = np.arange(self.n_items) if item_ids is None else np.asarray(item_ids)
+        self.corridor_ids = (np.arange(self.n_corridors) if corridor_ids is None
+                             else np.asarray(corridor_ids))
+
+        self.order_units = row_sums(self.order_ptr, self.order_qty)
+        self.item_stock = np.bincount(self.corridor_item, weights=self.corridor_qty,
+                                      minlength=self.n_items).astype(QUANTITY)
+        # Chaves fixas (mesma semente em todo processo) para o hash XOR das waves
+        self.order_keys = np.random.default_rng(0).integers(0, 1 << 62, self.n_orders,
+                                                            dtype=np.int64)
+        self.order_row = np.repeat(np.arange(self.n_orders, dtype=INDEX), np.diff(self.order_ptr))
+        self._order_index = None
+        self._zones = None
+        self._item_orders = None
+        self._corridor_orders = None
+
+    @property
+    def order_index(self):
+        """Dicionário id original -> índice interno dos pedidos, montado no primeiro uso."""
+        if self._order_index is None:
+            self._order_index = {o: k for k, o in enumerate(self.order_ids.tolist())}
+        return self._order_index
+
+    @property
+    def zones(self):
+        """ZoneIndex (warehouse_zones) da instância, calculado no primeiro uso."""
+        if self._zones is None:
+            from warehouse_zones import ZoneIndex
+            self._zones = ZoneIndex(self)
+        return self._zones
+
+    @property
+    def item_orders(self):
+        """(ptr, order, qty): pedidos que demandam cada item (CSR), calculado no primeiro uso."""
+        if self._item_orders is None:
+            self._item_orders = csr_transpose(self.order_ptr, self.order_item, self.n_items,
+                                              self.order_qty)
+        return self._item_orders
+
+    @property
+    def corridor_orders(self):
+        """
+        (order_ptr, order_corridor, corridor_ptr, corridor_order): corredores
+        associados aos itens de cada pedido e pedidos que usam cada corredor
+        (CSR, sem repetição), calculado no primeiro uso.
+        """
+        if self._corridor_orders is None:
+            entries = csr_gather(self.item_ptr, self.order_item)
+            rows = np.repeat(self.order_row.astype(np.int64),
+                             np.diff(self.item_ptr)[self.order_item])
+            pairs = np.sort(rows * self.n_corridors + self.item_corridor[entries])
+            pairs = pairs[np.concatenate(([True], pairs[1:] != pairs[:-1]))]
+            order_corridor = pairs % self.n_corridors
+            order_ptr = np.zeros(self.n_orders + 1, dtype=np.int64)
+            np.cumsum(np.bincount(pairs // self.n_corridors, minlength=self.n_orders),
+                      out=order_ptr[1:])
+            self._corridor_orders = (order_ptr, order_corridor) + csr_transpose(
+                order_ptr, order_corridor, self.n_corridors)
+        return self._corridor_orders
+
+    @classmethod
+    def from_dicts(cls, orders, items, corridor_items, LB, UB):
+        """
+        Converte a representação em dicionários usada por WarehouseCSP.
+
+        Args:
+            orders (dict): Dicionário de pedidos (order_id: {item_id: quantity}).
+            items (dict): Dicionário de itens (item_id: corridors).
+            corridor_items (dict): Dicionário de corredores (corridor_id: {item_id: quantity}).
+            LB (int): Limite inferior para o tamanho da wave.
+            UB (int): Limite superior para o tamanho da wave.
+        """
+        item_ids = sorted(set(items).union(*orders.values(), *corridor_items.values()))
+        corridor_ids = sorted(set(corridor_items).union(*items.values()))
+        item_index = {i: k for k, i in enumerate(item_ids)}
+        corridor_index = {c: k for k, c in enumerate(corridor_ids)}
+
+        order_ptr, order_item, order_qty = csr_from_rows(list(orders.values()), item_index)
+        corridor_ptr, corridor_item, corridor_qty = csr_from_rows(
+            [corridor_items.get(c, {}) for c in corridor_ids], item_index)
+        item_ptr, item_corridor, _ = csr_from_rows(
+            [dict.fromkeys(items.get(i, ()), 0) for i in item_ids], corridor_index)
+
+        return cls(order_ptr, order_item, order_qty, corridor_ptr, corridor_item, corridor_qty,
+                   LB, UB, n_items=len(item_ids), item_ptr=item_ptr, item_corridor=item_corridor,
+                   order_ids=list(orders), item_ids=item_ids, corridor_ids=corridor_ids)
+
+    def order(self, o):
+        """Retorna (itens, quantidades) do pedido de índice o."""
+        s, e = self.order_ptr[o], self.order_ptr[o + 1]
+        return self.order_item[s:e], self.order_qty[s:e]
+
+    def corridor(self, c):
+        """Retorna (itens, quantidades) estocados no corredor de índice c."""
+        s, e = self.corridor_ptr[c], self.corridor_ptr[c + 1]
+        return self.corridor_item[s:e], self.corridor_qty[s:e]
+
+    def item_corridors(self, i):
+        """Retorna os corredores associados ao item de índice i."""
+        return self.item_corridor[self.item_ptr[i]:self.item_ptr[i + 1]]
+
+    def __repr__(self):
+        return (f'<WarehouseInstance: {self.n_orders} pedidos, {self.n_items} itens, '
+                f'{self.n_corridors} corredores, LB={self.LB}, UB={self.UB}>')
@@ -0,0 +1,263 @@
+"""
+Leitura e escrita de instâncias e soluções no formato do desafio de waves.
+
+Formato da instância (todos os valores inteiros, separados por espaço):
+
+    o i a                       número de pedidos, itens e corredores
+    k item qty item qty ...     uma linha por pedido: k pares (item, quantidade)
+    l item qty item qty ...     uma linha por corredor: l pares (item, estoque)
+    LB UB                       limites do tamanho da wave
+
+Pedidos, itens e corredores são identificados pela posição (0..n-1) e cada
+item aparece no máximo uma vez por linha.
+
+Formato da solução:
+
+    n                           número de pedidos selecionados
+    order_id                    um por linha
+    m                           número de corredores selecionados
+    corridor_id                 um por linha
+"""
+
+import mmap
+import warnings
+
+import numpy as np
+
+from warehouse_instance import WarehouseInstance
+
+
+# Bytes do arquivo convertidos por vez em read_tokens (blocos que cabem no cache)
+CHUNK = 1 << 16
+
+
+def read_tokens(path, lines=False):
+    """
+    Lê todos os inteiros do arquivo, via mmap, num array NumPy.
+
+    O texto é convertido direto das páginas mapeadas (np.frombuffer), em blocos
+    de até CHUNK bytes cortados entre números (parse_chunk), sem copiar o arquivo
+    para a memória. A leitura é estrita: um arquivo com algo além de inteiros
+    separados por espaços em branco levanta ValueError, em vez de terminar no
+    primeiro número que não se lê.
+
+    Args:
+        path (str): Arquivo a ler.
+        lines (bool): Devolve também os índices dos inteiros que começam linha
+            (ver parse_chunk).
+
+    Returns:
+        np.ndarray ou tuple: os inteiros, ou (inteiros, inícios de linha).
+
+    Raises:
+        ValueError: Se o arquivo não é uma sequência de inteiros.
+    """
+    values, heads, count, failure = [], [], 0, None
+    with open(path, 'rb') as f:
+        size = f.seek(0, 2)
+        if size:
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                start = 0
+                while start < size:
+                    stop = min(start + CHUNK, size)
+                    if stop < size:
+                        cut = max(mm.rfind(b'\n', start, stop), mm.rfind(b' ', start, stop))
+                        stop = cut + 1 if cut > start else stop
+                    buf = np.frombuffer(mm, dtype=np.uint8, count=stop - start, offset=start)
+                    try:
+                        chunk, first = parse_chunk(buf, not start or mm[start - 1] == 10)
+                    except ValueError as error:
+                        failure = f'{path}: a partir do byte {start}: {error}'
+                        break
+                    finally:
+                        # O mmap só fecha sem visões NumPy das suas páginas
+                        del buf
+                    values.append(chunk)
+                    heads.append(first + count)
+                    count += len(chunk)
+                    start = stop
+    if failure is not None:
+        raise ValueError(failure)
+    tokens = np.concatenate(values) if values else np.zeros(0, dtype=np.int64)
+    if not lines:
+        return tokens
+    return tokens, np.concatenate(heads) if heads else np.zeros(0, dtype=np.int64)
+
+
+def parse_chunk(buf, line_start=True):
+    """
+    Converte um bloco de texto (os seus bytes num array uint8) em inteiros.
+
+    Os valores saem de np.fromstring, que recusa (ValueError) o que não é
+    inteiro; uma passada vetorizada sobre os mesmos bytes acha onde começa cada
+    número (um byte visível depois de um separador). Um sinal solto ou no meio
+    de um número muda a contagem de np.fromstring, de modo que as duas
+    contagens precisam coincidir. Começam linha os números logo depois
+    de uma quebra (os precedidos de outros espaços não são marcados, e
+    parse_records os percorre em Python).
+
+    Args:
+        buf (np.ndarray): Os bytes do bloco, cortado entre números.
+        line_start (bool): Se o bloco começa uma linha.
+
+    Returns:
+        tuple: (inteiros, índices no bloco dos que começam linha).
+
+    Raises:
+        ValueError: Se o bloco não é uma sequência de inteiros.
+    """
+    # Tudo acima de ord(' ') é parte de um número; o resto é separador
+    number = buf > 32
+    starts = np.flatnonzero(number[1:] > number[:-1]) + 1
+    if len(number) and number[0]:
+        starts = np.concatenate(([0], starts))
+    with warnings.catch_warnings():
+        # Versões antigas do NumPy só avisam (DeprecationWarning) e param de ler
+        warnings.simplefilter('error', DeprecationWarning)
+        try:
+            values = np.fromstring(buf, dtype=np.int64, sep=' ')
+        except (ValueError, DeprecationWarning):
+            values = None
+    if values is None or len(values) != len(starts):
+        raise ValueError(malformed(buf))
+    head = buf[starts - 1] == 10
+    if len(starts) and not starts[0]:
+        head[0] = line_start
+    return values, np.flatnonzero(head)
+
+
+def malformed(buf):
+    """Descreve o primeiro defeito de um bloco que parse_chunk não converteu."""
+    # Dígitos e sinal (ord('0') a ord('9') e ord('-')), espaço e ord('\t') a ord('\r')
+    valid = ((buf - np.uint8(48)) < 10) | (buf == 45) | (buf == 32) | ((buf - np.uint8(9)) < 5)
+    if not valid.all():
+        at = int(np.argmin(valid))
+        return f'{bytes(buf[at:at + 1])!r} no byte {at} não é dígito, sinal nem espaço'
+    return 'número mal formado (sinal solto ou fora do lugar)'
+
+
+def parse_records(tokens, pos, count, heads=None):
+    """
+    Localiza `count` registros "k a1 b1 ... ak bk" a partir da posição pos.
+
+    Com `heads` (os inícios de linha de read_tokens), os cabeçalhos candidatos
+    são os inícios de linha a partir de pos, confirmados de uma vez: cada um deve
+    estar 1 + 2k posições depois do anterior. Se os registros não seguem um por
+    linha, os cabeçalhos são percorridos em Python. Os pares são sempre
+    extraídos de forma vetorizada.
+
+    Returns:
+        tuple: (ptr, a, b, next_pos) com ptr em formato CSR.
+
+    Raises:
+        ValueError: Se os registros não cabem nos inteiros dados ou algum k é negativo.
+    """
+    begin, starts = pos, None
+    if heads is not None:
+        first = int(np.searchsorted(heads, pos))
+        candidates = heads[first:first + count]
+        if count == 0:
+            starts = candidates
+        elif len(candidates) == count and candidates[0] == pos:
+            ends = candidates + 1 + 2 * tokens[candidates]
+            if (candidates[1:] == ends[:-1]).all() and pos < ends[-1] <= len(tokens) \
+                    and (tokens[candidates] >= 0).all():
+                starts, pos = candidates, int(ends[-1])
+    if starts is None:
+        starts = np.empty(count, dtype=np.int64)
+        item, size = tokens.item, len(tokens)
+        for r in range(count):
+            if pos >= size or item(pos) < 0:
+                raise ValueError(f'registro {r} de {count} incompleto ou com tamanho negativo')
+            starts[r] = pos
+            pos += 1 + 2 * item(pos)
+        if pos > size:
+            raise ValueError(f'registro {count - 1} de {count} incompleto')
+    lengths = tokens[starts]
+    ptr = np.zeros(count + 1, dtype=np.int64)
+    np.cumsum(lengths, out=ptr[1:])
+    # Os pares são tudo o que não é cabeçalho entre begin e pos
+    pairs = np.ones(pos - begin, dtype=bool)
+    pairs[starts - begin] = False
+    pairs = tokens[begin:pos][pairs]
+    return ptr, pairs[0::2], pairs[1::2], pos
+
+
+def load_instance(path):
+    """
+    Carrega uma instância do desafio diretamente numa WarehouseInstance.
+
+    >>> instance = load_instance(path)  # doctest: +SKIP
+    >>> WarehouseCSP(instance)          # doctest: +SKIP
+    """
+    tokens, heads = read_tokens(path, lines=True)
+    if len(tokens) < 3 or tokens[:3].min() < 0:
+        raise ValueError(f'{path}: cabeçalho "pedidos itens corredores" ausente ou negativo')
+    n_orders, n_items, n_corridors = (int(t) for t in tokens[:3])
+    try:
+        order_ptr, order_item, order_qty, pos = parse_records(tokens, 3, n_orders, heads)
+        corridor_ptr, corridor_item, corridor_qty, pos = parse_records(tokens, pos, n_corridors,
+                                                                       heads)
+    except ValueError as error:
+        raise ValueError(f'{path}: {error}') from None
+    if pos + 2 > len(tokens):
+        raise ValueError(f'{path}: faltam os limites LB e UB no final do arquivo')
+    if pos + 2 < len(tokens):
+        raise ValueError(f'{path}: {len(tokens) - pos - 2} inteiros a mais depois de LB e UB')
+    for item in (order_item, corridor_item):
+        if len(item) and (item.min() < 0 or item.max() >= n_items):
+            raise ValueError(f'{path}: item fora de 0..{n_items - 1}')
+    for qty in (order_qty, corridor_qty):
+        if len(qty) and qty.min() < 0:
+            raise ValueError(f'{path}: quantidade negativa')
+    LB, UB = int(tokens[pos]), int(tokens[pos + 1])
+    return WarehouseInstance(order_ptr, order_item, order_qty,
+                             corridor_ptr, corridor_item, corridor_qty,
+                             LB, UB, n_items=n_items)
+
+
+def write_instance(path, instance):
+    """Grava a instância no formato do desafio (ids internos 0..n-1)."""
+
+    def records(ptr, col, val):
+        for r in range(len(ptr) - 1):
+            pairs = np.empty(2 * (ptr[r + 1] - ptr[r]), dtype=np.int64)
+            pairs[0::2] = col[ptr[r]:ptr[r + 1]]
+            pairs[1::2] = val[ptr[r]:ptr[r + 1]]
+            yield ' '.join(map(str, [len(pairs) // 2] + pairs.tolist()))
+
+    with open(path, 'w') as f:
+        f.write(f'{instance.n_orders} {instance.n_items} {instance.n_corridors}\n')
+        for line in records(instance.order_ptr, instance.order_item, instance.order_qty):
+            f.write(line + '\n')
+        for line in records(instance.corridor_ptr, instance.corridor_item, instance.corridor_qty):
+            f.write(line + '\n')
+        f.write(f'{instance.LB} {instance.UB}\n')
+
+
+def write_solution(path, orders, corridors):
+    """
+    Grava a solução no formato do desafio.
+
+    Args:
+        path (str): Arquivo de saída.
+        orders (iterable): Ids dos pedidos selecionados.
+        corridors (iterable): Ids dos corredores selecionados.
+    """
+    orders = [str(o) for o in orders]
+    corridors = [str(c) for c in corridors]
+    with open(path, 'w') as f:
+        f.write('\n'.join([str(len(orders))] + orders + [str(len(corridors))] + corridors))
+        f.write('\n')
+
+
+def read_solution(path):
+    """Lê uma solução gravada por write_solution; retorna (pedidos, corredores)."""
+    tokens = read_tokens(path)
+    if not len(tokens):
+        raise ValueError(f'{path}: arquivo de solução vazio')
+    n = int(tokens[0])
+    m = int(tokens[1 + n]) if len(tokens) > 1 + n else -1
+    if n < 0 or m < 0 or len(tokens) < 2 + n + m:
+        raise ValueError(f'{path}: solução incompleta')
+    return tokens[1:1 + n].tolist(), tokens[2 + n:2 + n + m].tolist()
@@ -0,0 +1,318 @@
+"""
+Busca em vizinhança grande (LNS) para a seleção de waves.
+
+A cada passo, parte da wave corrente é destruída (pedidos ao acaso, os que
+compartilham itens com um pedido sorteado ou os que ficam sem estoque quando um
+corredor sorteado sai da cobertura) e reparada sobre um conjunto limitado de
+candidatos: por enumeração exata se ele for pequeno, senão por um guloso. O
+resultado é aceito se melhora o objetivo ou, com a probabilidade do recozimento
+simulado, mesmo se piora.
+
+Os movimentos são avaliados em O(delta) sobre uma cobertura explícita
+(warehouse_greedy.CoverStock): os corredores escolhidos e o estoque que sobra
+neles. Um pedido que cabe nesse estoque entra sem custo; senão abre só os
+corredores que lhe faltam. Depois da destruição os corredores cujo estoque a
+wave já não usa são fechados, de modo que o número de corredores pode cair.
+Só o reparo exato e a decisão de aceitação consultam a cobertura mínima de
+corredores (WarehouseCSP.wave_objective, com cache).
+"""
+
+import math
+import random
+import time
+
+import numpy as np
+
+from WarehouseCSP import WaveState
+from warehouse_instance import csr_gather
+from warehouse_greedy import CoverStock, greedy_fill
+from warehouse_search import wave_solution
+
+
+def _admissible(csp, wave):
+    return wave.feasible and csp.LB <= wave.total_units <= csp.UB
+
+
+class WaveMoves(CoverStock):
+    """
+    Inclusões e remoções de pedidos e aberturas e fechamentos de corredores numa
+    CoverStock, com registro para desfazer.
+
+    Cada movimento custa O(itens do pedido ou dos corredores); `undo` volta ao
+    último `checkpoint` na ordem inversa.
+    """
+
+    def __init__(self, csp, wave, corridors=None):
+        self.log = []
+        super().__init__(csp, wave, corridors)
+        self.log = []
+
+    def checkpoint(self):
+        self.log = []
+
+    def add(self, order):
+        if self.wave.selected[order]:
+            return False
+        super().add(order)
+        self.log.append((CoverStock.remove, order))
+        return True
+
+    def remove(self, order):
+        if not self.wave.selected[order]:
+            return False
+        super().remove(order)
+        self.log.append((CoverStock.add, order))
+        return True
+
+    def open(self, corridors):
+        corridors = np.asarray(corridors, dtype=np.int64)
+        corridors = np.unique(corridors[~self.chosen[corridors]])
+        super().open(corridors)
+        if len(corridors):
+            self.log.append((CoverStock.close, corridors))
+
+    def close(self, corridors):
+        corridors = np.asarray(corridors, dtype=np.int64)
+        corridors = np.unique(corridors[self.chosen[corridors]])
+        super().close(corridors)
+        if len(corridors):
+            self.log.append((CoverStock.open, corridors))
+
+    def undo(self):
+        for inverse, arg in reversed(self.log):
+            inverse(self, arg)
+        self.log = []
+
+    def try_add(self, order):
+        """
+        Inclui o pedido se a wave continua dentro de UB, abrindo os corredores que
+        lhe faltam na cobertura; False se o estoque não basta.
+        """
+        if self.wave.total_units + int(self.csp.summary.units[order]) > self.csp.UB:
+            return False
+        if self.short[order]:
+            opened = self.corridors_for(order)
+            if opened is None:
+                return False
+            self.open(opened)
+        self.csp.stats.constraint_checks += 1
+        return self.add(order)
+
+
+def destroy(csp, wave, rng, size, kind):
+    """
+    Escolhe até `size` pedidos da wave para retirar.
+
+    Args:
+        kind (str): 'random' ou 'related' (pedidos que compartilham itens com um
+            pedido sorteado da wave).
+    """
+    selected = wave.orders()
+    if not len(selected):
+        return selected
+    if kind == 'related':
+        summary = csp.summary
+        seed = rng.choice(selected.tolist())
+        shared = (summary.items[selected] & summary.items[seed]).any(axis=1)
+        related = selected[shared]
+    else:
+        related = selected
+    related = related.tolist()
+    rng.shuffle(related)
+    return related[:size]
+
+
+def close_corridor(csp, moves, rng):
+    """
+    Fecha um corredor sorteado da cobertura e retira, em ordem aleatória, os
+    pedidos da wave que ficam sem estoque, até o estoque que sobra voltar a
+    atendê-los.
+
+    Returns:
+        list: Os pedidos retirados.
+    """
+    chosen = np.flatnonzero(moves.chosen)
+    if not len(chosen):
+        return []
+    moves.close([rng.choice(chosen.tolist())])
+    inst = csp.instance
+    ptr, orders, _ = inst.item_orders
+    users = np.unique(orders[csr_gather(ptr, np.flatnonzero(moves.residual < 0))])
+    users = users[moves.wave.selected[users]].tolist()
+    rng.shuffle(users)
+    removed = []
+    for order in users:
+        if (moves.residual[inst.order(order)[0]] < 0).any():
+            moves.remove(order)
+            removed.append(order)
+    return removed
+
+
+def repair_candidates(csp, wave, removed, rng, pool_size, item_orders):
+    """
+    Pedidos fora da wave que podem entrar: os que compartilham itens com os
+    retirados (pelo índice item -> pedidos, em O(delta)) e, completando
+    `pool_size`, outros ao acaso.
+    """
+    inst = csp.instance
+    slack = csp.UB - wave.total_units
+    fits = ~wave.selected & csp.summary.fits & (csp.summary.units <= slack)
+    outside = np.flatnonzero(fits)
+    if not len(outside):
+        return []
+    pool = []
+    if len(removed):
+        item_ptr, orders = item_orders
+        items = inst.order_item[csr_gather(inst.order_ptr, removed)]
+        near = np.unique(orders[csr_gather(item_ptr, np.unique(items))])
+        near = near[fits[near]]
+        pool = rng.sample(near.tolist(), min(len(near), pool_size // 2))
+    chosen = set(pool)
+    rest = [o for o in rng.sample(outside.tolist(), min(len(outside), pool_size))
+            if o not in chosen]
+    return pool + rest[:pool_size - len(pool)]
+
+
+def greedy_repair(csp, moves, candidates):
+    """
+    Completa a wave com os candidatos pela construção gulosa sobre a cobertura
+    corrente (warehouse_greedy.greedy_fill): entram primeiro os que cabem no
+    estoque que sobra, e um corredor só abre se a razão projetada supera o
+    objetivo de uma wave que já atingiu LB.
+    """
+    greedy_fill(csp, moves.wave, candidates, stock=moves)
+
+
+def exact_repair(csp, moves, candidates):
+    """
+    Enumera todos os subconjuntos dos candidatos (poucos), cada um por inclusões e
+    remoções O(delta) no WaveState, e fica com o de maior objetivo (cobertura
+    mínima, com cache) entre as waves admissíveis; os pedidos escolhidos entram
+    por try_add, abrindo os corredores que faltam.
+    """
+    wave = moves.wave
+    best_ratio, best_set = -1.0, None
+    if _admissible(csp, wave):
+        best_ratio, best_set = csp.wave_objective(wave), []
+    chosen = []
+
+    def search(pos):
+        nonlocal best_ratio, best_set
+        for k in range(pos, len(candidates)):
+            order = candidates[k]
+            if wave.total_units + int(csp.summary.units[order]) > csp.UB:
+                continue
+            wave.add(order)
+            csp.stats.constraint_checks += 1
+            if wave.feasible:
+                chosen.append(order)
+                if _admissible(csp, wave):
+                    value = csp.wave_objective(wave)
+                    if value > best_ratio:
+                        best_ratio, best_set = value, list(chosen)
+                search(k + 1)
+                chosen.pop()
+            wave.remove(order)
+
+    search(0)
+    for order in best_set or []:
+        moves.try_add(order)
+
+
+def initial_wave(csp, moves):
+    """Wave inicial da construção gulosa vetorizada (warehouse_greedy)."""
+    greedy_fill(csp, moves.wave, stock=moves)
+
+
+def lns(csp, initial=None, time_limit=10.0, max_iter=None, destroy_fraction=0.5,
+        pool_size=64, exact_limit=6, temperature=0.05, cooling=0.995, seed=None,
+        on_improvement=None):
+    """
+    Large-neighborhood search sobre a wave.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        initial (WaveSolution, optional): Wave inicial; senão uma gulosa.
+        time_limit (float): Tempo máximo, em segundos.
+        max_iter (int, optional): Número máximo de passos.
+        destroy_fraction (float): Fração dos pedidos da wave retirada a cada passo.
+        pool_size (int): Número de candidatos oferecidos ao reparo.
+        exact_limit (int): Até quantos candidatos o reparo é exato; acima disso
+            o reparo é guloso.
+        temperature (float): Temperatura inicial, relativa ao objetivo da wave
+            inicial; 0 aceita só melhoras.
+        cooling (float): Fator de resfriamento por passo.
+        seed (int, optional): Semente do gerador aleatório.
+        on_improvement (callable, optional): Chamado com cada nova melhor wave.
+
+    Returns:
+        WaveSolution ou None: a melhor wave admissível encontrada.
+    """
+    start = time.perf_counter()
+    deadline = start + time_limit
+    rng = random.Random(seed)
+    inst = csp.instance
+    item_orders = inst.item_orders[:2]
+    wave = WaveState(inst)
+    if initial is not None:
+        for order in initial.orders:
+            wave.add(csp.index[order])
+    moves = WaveMoves(csp, wave)
+    if initial is None:
+        initial_wave(csp, moves)
+
+    best = current = None
+
+    def improve(step):
+        nonlocal best
+        best = wave_solution(csp, wave=wave, elapsed=time.perf_counter() - start, step=step)
+        if on_improvement is not None:
+            on_improvement(best)
+
+    if _admissible(csp, wave):
+        current = csp.wave_objective(wave)
+        improve(0)
+    temp = temperature * (current or 1.0)
+    kinds = ('random', 'corridor', 'related')
+    step = 0
+    with csp.stats.phase('lns'):
+        while time.perf_counter() < deadline and (max_iter is None or step < max_iter):
+            step += 1
+            moves.checkpoint()
+            size = max(1, int(destroy_fraction * wave.num_selected))
+            kind = rng.choice(kinds)
+            if kind == 'corridor':
+                removed = close_corridor(csp, moves, rng)
+            else:
+                removed = destroy(csp, wave, rng, size, kind)
+                for order in removed:
+                    moves.remove(order)
+                moves.release()
+            candidates = repair_candidates(csp, wave, removed, rng,
+                                           exact_limit if step % 2 else pool_size, item_orders)
+            if len(candidates) <= exact_limit:
+                exact_repair(csp, moves, candidates)
+            else:
+                greedy_repair(csp, moves, candidates)
+
+            if not _admissible(csp, wave):
+                if current is not None:
+                    moves.undo()
+                continue
+            value = csp.wave_objective(wave)
+            if current is not None and value < current and (
+                    temp <= 0 or rng.random() >= math.exp((value - current) / temp)):
+                moves.undo()
+            else:
+                current = value
+                # A cobertura gulosa pode ter sobrado corredores: volta à mínima
+                cover = csp.wave_corridors(wave)
+                if len(cover) < moves.size:
+                    moves.close(np.flatnonzero(moves.chosen))
+                    moves.open(cover)
+            temp *= cooling
+            if best is None or current > best.objective:
+                improve(step)
+    if best is not None:
+        best.info['steps'] = step
+    return best
@@ -0,0 +1,213 @@
+"""
+Planejamento de um turno: divide o backlog de pedidos numa sequência de waves.
+
+Horizonte rolante: cada wave é resolvida sobre os pedidos ainda pendentes e o
+estoque que sobrou das anteriores, e o estoque que ela consome sai dos
+corredores da sua cobertura. Um único WarehouseCSP atende o turno todo: entre
+uma wave e outra só o que depende do estoque é refeito (WarehouseCSP.restock),
+e os índices da instância (bitsets, zonas, índices transpostos) são
+reaproveitados. Cada wave sai da construção gulosa (warehouse_greedy) e, com
+`wave_time`, é melhorada por LNS.
+
+Com `workers` > 1 e várias zonas (warehouse_zones), os pedidos de uma zona só
+não disputam estoque com os de outras zonas: grupos de zonas são planejados em
+paralelo, um por processo, e os pedidos que sobram (inclusive os que tocam
+várias zonas) seguem pelo horizonte rolante sobre o estoque restante.
+"""
+
+import copy
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from itertools import zip_longest
+
+import numpy as np
+
+from WarehouseCSP import WarehouseCSP, WaveState
+from warehouse_greedy import greedy_fill
+from warehouse_instance import WarehouseInstance, csr_gather
+from warehouse_lns import lns
+from warehouse_search import wave_solution
+
+
+@dataclass
+class WavePlan:
+    """Sequência de waves de um turno, com ids originais."""
+    waves: list
+    remaining: list
+    elapsed: float = 0.0
+    info: dict = field(default_factory=dict)
+
+    @property
+    def units(self):
+        """Total de unidades atendidas pelas waves."""
+        return sum(wave.units for wave in self.waves)
+
+    @property
+    def corridors(self):
+        """Total de visitas a corredores (soma das coberturas das waves)."""
+        return sum(len(wave.corridors) for wave in self.waves)
+
+
+def consume_stock(instance, demand, corridors):
+    """
+    Retira do estoque dos corredores dados (índices internos) a demanda de uma
+    wave (unidades por item), corredor a corredor na ordem dada, e atualiza
+    instance.item_stock. Os corredores devem cobrir a demanda.
+    """
+    inst = instance
+    entries = csr_gather(inst.corridor_ptr, corridors)
+    entries = entries[demand[inst.corridor_item[entries]] > 0]
+    items = inst.corridor_item[entries]
+    # Agrupa por item, mantendo a ordem dos corredores dentro de cada grupo
+    order = np.argsort(items, kind='stable')
+    entries, items = entries[order], items[order]
+    qty = inst.corridor_qty[entries]
+    cum = np.cumsum(qty)
+    starts = np.flatnonzero(np.concatenate(([True], items[1:] != items[:-1])))
+    before = cum - qty - np.repeat(cum[starts] - qty[starts], np.diff(np.append(starts, len(qty))))
+    inst.corridor_qty[entries] -= np.clip(demand[items] - before, 0, qty)
+    inst.item_stock -= demand
+
+
+def subset_instance(instance, orders):
+    """Instância com só os pedidos dados (ids originais preservados) e o mesmo estoque."""
+    inst = instance
+    orders = np.asarray(orders, dtype=np.int64)
+    entries = csr_gather(inst.order_ptr, orders)
+    order_ptr = np.zeros(len(orders) + 1, dtype=np.int64)
+    np.cumsum(np.diff(inst.order_ptr)[orders], out=order_ptr[1:])
+    return WarehouseInstance(
+        order_ptr, inst.order_item[entries], inst.order_qty[entries],
+        inst.corridor_ptr, inst.corridor_item, inst.corridor_qty, inst.LB, inst.UB,
+        n_items=inst.n_items, item_ptr=inst.item_ptr, item_corridor=inst.item_corridor,
+        order_ids=inst.order_ids[orders], item_ids=inst.item_ids,
+        corridor_ids=inst.corridor_ids)
+
+
+def zone_groups(instance, workers):
+    """
+    Pedidos de uma única zona, repartidos em até `workers` grupos de zonas com
+    unidades equilibradas (maior zona primeiro, no grupo mais leve).
+
+    Returns:
+        list: Índices internos dos pedidos de cada grupo não vazio.
+    """
+    zones = instance.zones
+    single = np.flatnonzero(np.diff(zones.order_ptr) == 1)
+    zone = zones.order_zone[zones.order_ptr[single]]
+    load = np.bincount(zone, weights=instance.order_units[single], minlength=zones.n_zones)
+    group_of = np.zeros(zones.n_zones, dtype=np.int64)
+    totals = np.zeros(workers)
+    for z in np.argsort(-load, kind='stable').tolist():
+        group_of[z] = int(np.argmin(totals))
+        totals[group_of[z]] += load[z]
+    groups = [single[group_of[zone] == g] for g in range(workers)]
+    return [group for group in groups if len(group)]
+
+
+def _admissible(csp, wave):
+    return wave.feasible and csp.LB <= wave.total_units <= csp.UB
+
+
+def rolling_waves(csp, pending, max_waves=None, wave_time=0.0, seed=None, on_wave=None):
+    """
+    Resolve waves em sequência sobre os pedidos pendentes, consumindo o estoque da
+    instância do CSP, até não sobrar pedido, nenhuma wave atingir LB ou chegar a
+    `max_waves`.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém; o estoque da sua instância é consumido.
+        pending (np.ndarray): Máscara dos pedidos pendentes, atualizada no lugar.
+        max_waves (int, optional): Número máximo de waves.
+        wave_time (float): Tempo de LNS por wave, em segundos (0 fica com a gulosa).
+        seed (int, optional): Semente do LNS.
+        on_wave (callable, optional): Chamado com cada wave planejada.
+
+    Returns:
+        list: As waves (WaveSolution), na ordem.
+    """
+    inst = csp.instance
+    csp.summary.restock(inst, csp.UB, pending)
+    waves = []
+    while pending.any() and (max_waves is None or len(waves) < max_waves):
+        start = time.perf_counter()
+        wave = WaveState(inst)
+        greedy_fill(csp, wave)
+        if not wave.num_selected or not _admissible(csp, wave):
+            break
+        if wave_time > 0:
+            best = lns(csp, initial=wave_solution(csp, wave=wave), time_limit=wave_time,
+                       seed=seed)
+            wave = WaveState(inst)
+            for order in best.orders:
+                wave.add(csp.index[order])
+        found = wave_solution(csp, wave=wave, elapsed=time.perf_counter() - start)
+        consume_stock(inst, wave.demand, csp.wave_corridors(wave))
+        pending[wave.orders()] = False
+        csp.restock(pending)
+        waves.append(found)
+        if on_wave is not None:
+            on_wave(found)
+    return waves
+
+
+def _plan_group(instance, max_waves, wave_time, seed):
+    """Planeja um grupo de zonas num processo; devolve as waves."""
+    csp = WarehouseCSP(instance)
+    pending = np.ones(instance.n_orders, dtype=bool)
+    return rolling_waves(csp, pending, max_waves, wave_time, seed)
+
+
+def plan_waves(instance, max_waves=None, wave_time=0.0, workers=1, seed=None, on_wave=None):
+    """
+    Divide o backlog da instância numa sequência de waves (ver o módulo).
+
+    O estoque da instância dada não muda: o planejamento consome uma cópia dele.
+
+    Args:
+        instance (WarehouseInstance): O backlog do turno e o estoque inicial.
+        max_waves (int, optional): Número máximo de waves.
+        wave_time (float): Tempo de LNS por wave, em segundos (0 fica com a gulosa).
+        workers (int): Processos para planejar grupos de zonas em paralelo.
+        seed (int, optional): Semente do LNS.
+        on_wave (callable, optional): Chamado com cada wave planejada.
+
+    Returns:
+        WavePlan: As waves e os pedidos que ficaram de fora.
+    """
+    start = time.perf_counter()
+    inst = copy.copy(instance)
+    inst.corridor_qty = instance.corridor_qty.copy()
+    inst.item_stock = instance.item_stock.copy()
+    pending = np.ones(inst.n_orders, dtype=bool)
+    csp = WarehouseCSP(inst)
+    waves = []
+
+    groups = zone_groups(inst, workers) if workers > 1 and inst.zones.n_zones > 1 else []
+    if len(groups) > 1:
+        with ProcessPoolExecutor(max_workers=len(groups)) as pool:
+            futures = [pool.submit(_plan_group, subset_instance(inst, group), max_waves,
+                                   wave_time, seed) for group in groups]
+            results = [future.result() for future in futures]
+        corridor_index = {c: k for k, c in enumerate(inst.corridor_ids.tolist())}
+        # Intercala as waves dos grupos; cada grupo só depende das próprias waves
+        # anteriores, de modo que cortar em max_waves mantém o plano consistente
+        for found in (w for row in zip_longest(*results) for w in row if w is not None):
+            if max_waves is not None and len(waves) >= max_waves:
+                break
+            wave = WaveState(inst)
+            for order in found.orders:
+                wave.add(csp.index[order])
+            consume_stock(inst, wave.demand, [corridor_index[c] for c in found.corridors])
+            pending[wave.orders()] = False
+            waves.append(found)
+            if on_wave is not None:
+                on_wave(found)
+        csp.restock(pending)
+
+    remaining = None if max_waves is None else max_waves - len(waves)
+    waves += rolling_waves(csp, pending, remaining, wave_time, seed, on_wave)
+    return WavePlan(waves=waves, remaining=inst.order_ids[pending].tolist(),
+                    elapsed=time.perf_counter() - start,
+                    info={'groups': len(groups), 'stats': csp.stats.as_dict()})
@@ -0,0 +1,218 @@
+"""
+Portfólio paralelo de estratégias para o problema de waves.
+
+Cada configuração (estratégia, semente) roda num processo de um
+ProcessPoolExecutor sobre a mesma WarehouseInstance. Os processos compartilham
+a melhor razão unidades / corredores já encontrada (um multiprocessing.Value),
+que branch-and-bound e Dinkelbach usam para podar, e todos param num prazo
+global comum. Vence a melhor wave entre as devolvidas.
+"""
+
+import multiprocessing
+import os
+import random
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, wait
+
+import numpy as np
+
+from csp import backtracking_search, lcv, mrv
+from min_conflicts import min_conflicts
+from WarehouseCSP import WarehouseCSP, wave_forward_checking
+from warehouse_greedy import greedy_wave
+from warehouse_lns import lns
+from warehouse_reduce import reduce_instance
+from warehouse_search import branch_and_bound, dinkelbach, order_sequence, publish, wave_solution
+from warehouse_stats import SearchTimeout, SolverStats
+
+# Folga, em segundos, para os processos entregarem o resultado depois do prazo
+GRACE = 1.0
+
+
+def csp_strategy(search, **options):
+    """
+    Adapta uma busca do csp.py (que só procura uma wave viável) ao portfólio; como
+    ela não aceita prazo, é interrompida por SolverStats.tick (SearchTimeout).
+    """
+
+    def run(csp, time_limit, shared, seed):
+        random.seed(seed)
+        csp.stats.deadline = time.perf_counter() + time_limit
+        solution = search(csp, **options)
+        if solution is None:
+            return None
+        csp.wave.track(solution)
+        found = wave_solution(csp)
+        publish(shared, found.objective)
+        return found
+
+    return run
+
+
+def _branch_and_bound(csp, time_limit, shared, seed):
+    seq = None
+    if seed:
+        # Diversifica a ordem de ramificação: unidades com ruído multiplicativo
+        seq = order_sequence(csp, rng=np.random.default_rng(seed))
+    # A wave gulosa já poda desde a raiz; o tempo dela sai do prazo
+    start = time.perf_counter()
+    initial = greedy_wave(csp)
+    if initial is not None:
+        publish(shared, initial.objective)
+    time_limit = max(0.0, time_limit - (time.perf_counter() - start))
+    return branch_and_bound(csp, time_limit=time_limit, initial=initial, shared=shared, seq=seq)
+
+
+def _dinkelbach(csp, time_limit, shared, seed):
+    return dinkelbach(csp, time_limit=time_limit, shared=shared)
+
+
+def _lns(csp, time_limit, shared, seed):
+    return lns(csp, time_limit=time_limit, seed=seed,
+               on_improvement=lambda found: publish(shared, found.objective))
+
+
+STRATEGIES = {
+    'branch_and_bound': _branch_and_bound,
+    'dinkelbach': _dinkelbach,
+    'lns': _lns,
+    'mac': csp_strategy(backtracking_search, select_unassigned_variable=mrv,
+                        order_domain_values=lcv, inference=wave_forward_checking),
+    'mrv_lcv': csp_strategy(backtracking_search, select_unassigned_variable=mrv,
+                            order_domain_values=lcv),
+    'min_conflicts': csp_strategy(min_conflicts, max_steps=100000),
+    'backtracking': csp_strategy(backtracking_search),
+}
+
+
+def default_portfolio(workers):
+    """
+    Uma configuração de cada estratégia e, se sobrarem processos, cópias com outras
+    sementes das que se beneficiam de diversificação.
+    """
+    configs = [(name, 0) for name in STRATEGIES][:workers]
+    seed = 1
+    while len(configs) < workers:
+        for name in ('branch_and_bound', 'lns', 'min_conflicts'):
+            if len(configs) < workers:
+                configs.append((name, seed))
+        seed += 1
+    return configs
+
+
+# Estado de cada processo, preenchido por _init_worker
+_instance = None
+_shared = None
+
+
+def _init_worker(instance, shared):
+    global _instance, _shared
+    _instance, _shared = instance, shared
+    # backtracking_search desce um nível de recursão por pedido
+    sys.setrecursionlimit(max(sys.getrecursionlimit(), 4 * instance.n_orders + 1000))
+
+
+def _run(name, seed, deadline):
+    """Roda uma configuração até o prazo global (time.time()); devolve um resumo."""
+    remaining = deadline - time.time()
+    stats = SolverStats()
+    start = time.perf_counter()
+    found, timed_out = None, False
+    if remaining > 0:
+        csp = WarehouseCSP(_instance, stats=stats)
+        try:
+            found = STRATEGIES[name](csp, remaining, _shared, seed)
+        except SearchTimeout:
+            timed_out = True
+    return {'strategy': name, 'seed': seed, 'solution': found, 'timed_out': timed_out,
+            'error': None, 'elapsed': time.perf_counter() - start, 'stats': stats.as_dict()}
+
+
+def _collect(name, seed, future, late=False):
+    """Resumo de uma configuração a partir do seu future, inclusive se ela falhou."""
+    error = None
+    if not late and not future.cancelled():
+        error = future.exception()
+        if error is None:
+            return future.result()
+    # Falhou (error) ou não terminou na folga depois do prazo
+    return {'strategy': name, 'seed': seed, 'solution': None, 'timed_out': error is None,
+            'error': None if error is None else repr(error), 'elapsed': None, 'stats': None}
+
+
+def _terminate(processes):
+    """Encerra os processos dados que ainda rodam (p.ex. atrasados depois do prazo)."""
+    for process in processes:
+        if process.is_alive():
+            process.terminate()
+    for process in processes:
+        process.join()
+
+
+def solve_portfolio(instance, configs=None, time_limit=60.0, workers=None, reduce=True):
+    """
+    Roda um portfólio de estratégias em paralelo e devolve a melhor wave.
+
+    Args:
+        instance (WarehouseInstance): A instância.
+        configs (list, optional): Pares (estratégia, semente), com estratégia em
+            STRATEGIES; por padrão default_portfolio(workers).
+        time_limit (float): Prazo global, em segundos.
+        workers (int, optional): Número de processos; por padrão os.cpu_count().
+        reduce (bool): Roda sobre a instância reduzida (warehouse_reduce), sem os
+            pedidos que não cabem e com as cópias de pedidos idênticos agregadas.
+
+    Returns:
+        WaveSolution ou None: a melhor wave; info['strategy'] diz quem a achou e
+        info['portfolio'] resume cada configuração (com o erro, em 'error', das
+        que falharam) e, com reduce, info['reduction'] conta os pedidos removidos
+        por motivo.
+    """
+    reduction = None
+    if reduce:
+        reduction = reduce_instance(instance)
+        instance = reduction.instance
+        if not instance.n_orders:
+            return None
+    workers = workers or os.cpu_count() or 1
+    configs = list(configs) if configs is not None else default_portfolio(workers)
+    shared = multiprocessing.Value('d', 0.0)
+    start = time.perf_counter()
+    deadline = time.time() + time_limit
+
+    pool = ProcessPoolExecutor(max_workers=min(workers, len(configs)),
+                               initializer=_init_worker, initargs=(instance, shared))
+    futures, pending = [], set()
+    try:
+        futures = [pool.submit(_run, name, seed, deadline) for name, seed in configs]
+        _, pending = wait(futures, timeout=time_limit + GRACE)
+    finally:
+        # Não espera quem passou da folga: as que nem começaram são canceladas e os
+        # processos ainda ocupados, encerrados (antes de shutdown, que os esquece)
+        for future in pending:
+            future.cancel()
+        if pending:
+            _terminate(list((pool._processes or {}).values()))
+        pool.shutdown(wait=False)
+    # Uma configuração que falha (p.ex. RecursionError) não derruba as demais
+    results = [_collect(name, seed, future, future in pending)
+               for (name, seed), future in zip(configs, futures)]
+
+    found = [r for r in results if r['solution'] is not None]
+    if not found:
+        return None
+    winner = max(found, key=lambda r: r['solution'].objective)
+    best = winner['solution']
+    if reduction is not None:
+        best = reduction.expand_solution(best)
+        best.info['reduction'] = reduction.counts()
+    best.elapsed = time.perf_counter() - start
+    best.info['strategy'] = winner['strategy']
+    best.info['portfolio'] = [
+        {'strategy': r['strategy'], 'seed': r['seed'], 'timed_out': r['timed_out'],
+         'error': r['error'], 'elapsed': r['elapsed'],
+         'objective': None if r['solution'] is None else r['solution'].objective,
+         'constraint_checks': None if r['stats'] is None else r['stats']['constraint_checks']}
+        for r in results]
+    return best
@@ -0,0 +1,219 @@
+"""
+A seleção de waves como search.Problem, para as buscas locais do search.py
+(hill_climbing, simulated_annealing, simulated_annealing_full).
+
+Um estado é a wave do pai mais um movimento ('add', o), ('drop', o) ou
+('swap', sai, entra) sobre índices internos de pedidos. O problema mantém um
+único WaveState posicionado em algum estado. `result` não altera esse estado:
+calcula o valor do vizinho em O(itens dos pedidos movidos) por WaveState.delta,
+a partir da demanda por item e das referências de corredores em cache; só quando a busca segue para
+um estado o WaveState é movido até ele, desfazendo e refazendo os movimentos do
+caminho (em geral um só).
+"""
+
+import random
+
+from search import Problem, hill_climbing
+from WarehouseCSP import WaveState
+from warehouse_search import wave_solution
+
+
+class WaveMove:
+    """Estado do WaveProblem: o movimento que o gerou a partir do estado pai, e seu valor."""
+
+    __slots__ = ('parent', 'move', 'depth', 'value', 'units', 'corridors')
+
+    def __init__(self, parent, move, value, units, corridors):
+        self.parent = parent
+        self.move = move
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.value = value
+        self.units = units
+        self.corridors = corridors
+
+    def __repr__(self):
+        return f'WaveMove({self.move}, value={self.value:.4f})'
+
+
+def _split(move):
+    """(pedido que sai, pedido que entra) de um movimento; None onde não há."""
+    kind = move[0]
+    if kind == 'add':
+        return None, move[1]
+    if kind == 'drop':
+        return move[1], None
+    return move[1], move[2]
+
+
+class WaveProblem(Problem):
+    """
+    Problema de otimização sobre a wave de um WarehouseCSP.
+
+    O valor de uma wave admissível (viável e com LB <= unidades <= UB) é a razão
+    unidades / corredores abertos, um limitante inferior de csp.wave_objective
+    que se atualiza em O(1) a cada movimento; o de uma wave inadmissível é menos
+    o quanto falta para LB somado aos itens sem estoque suficiente, sempre
+    negativo. Os movimentos nunca ultrapassam UB.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        initial (iterable, optional): Pedidos (ids originais) da wave inicial;
+            por padrão a wave vazia.
+        sample_size (int, optional): Quantos vizinhos `actions` sorteia; None
+            enumera todos os movimentos (só para instâncias pequenas).
+        seed (int, optional): Semente do sorteio de vizinhos.
+    """
+
+    def __init__(self, csp, initial=(), sample_size=32, seed=None):
+        self.csp = csp
+        self.sample_size = sample_size
+        self.rng = random.Random(seed)
+        self.wave = WaveState(csp.instance)
+        self.units, self.fits = csp.summary.units, csp.summary.fits
+        # Pedidos da wave numa lista, para sortear remoções em O(1)
+        self.members = []
+        self.position = {}
+        for order in initial:
+            self._set(csp.index[order], True)
+        wave = self.wave
+        root = WaveMove(None, None,
+                        self._value(wave.total_units, wave.num_corridors, wave.num_violated),
+                        wave.total_units, wave.num_corridors)
+        self.cursor = root
+        super().__init__(root)
+
+    def _set(self, order, include):
+        if include:
+            self.wave.add(order)
+            self.position[order] = len(self.members)
+            self.members.append(order)
+        else:
+            self.wave.remove(order)
+            last = self.members.pop()
+            k = self.position.pop(order)
+            if last != order:
+                self.members[k] = last
+                self.position[last] = k
+
+    def _apply(self, move, reverse=False):
+        out, into = _split(move)
+        if reverse:
+            out, into = into, out
+        if out is not None:
+            self._set(out, False)
+        if into is not None:
+            self._set(into, True)
+
+    def _goto(self, state):
+        """Posiciona o WaveState em `state`, pelo ancestral comum com o estado atual."""
+        current = self.cursor
+        if current is state:
+            return
+        undo, redo = [], []
+        while current.depth > state.depth:
+            undo.append(current)
+            current = current.parent
+        target = state
+        while target.depth > current.depth:
+            redo.append(target)
+            target = target.parent
+        while current is not target:
+            undo.append(current)
+            current = current.parent
+            redo.append(target)
+            target = target.parent
+        for node in undo:
+            self._apply(node.move, reverse=True)
+        for node in reversed(redo):
+            self._apply(node.move)
+        self.cursor = state
+
+    def _value(self, units, corridors, violated):
+        shortfall = max(self.csp.LB - units, 0) + violated
+        if shortfall:
+            return -float(shortfall)
+        return units / corridors if corridors else 0.0
+
+    def _fits(self, out, into, slack):
+        released = self.units[out] if out is not None else 0
+        return self.fits[into] and self.units[into] - released <= slack
+
+    def actions(self, state):
+        self._goto(state)
+        slack = self.csp.UB - self.wave.total_units
+        if self.sample_size is None:
+            return self._all_moves(slack)
+        n_orders = len(self.units)
+        rng, members = self.rng, self.members
+        moves = []
+        for _ in range(self.sample_size):
+            kind = rng.randrange(3)
+            if kind == 1 and members:
+                moves.append(('drop', rng.choice(members)))
+                continue
+            into = rng.randrange(n_orders)
+            if self.wave.selected[into]:
+                continue
+            if kind == 2 and members:
+                out = rng.choice(members)
+                if self._fits(out, into, slack):
+                    moves.append(('swap', out, into))
+            elif self._fits(None, into, slack):
+                moves.append(('add', into))
+        return moves
+
+    def _all_moves(self, slack):
+        outside = [o for o in range(len(self.units)) if not self.wave.selected[o]]
+        moves = [('add', o) for o in outside if self._fits(None, o, slack)]
+        moves += [('drop', o) for o in self.members]
+        moves += [('swap', out, into) for out in self.members for into in outside
+                  if self._fits(out, into, slack)]
+        return moves
+
+    def result(self, state, action):
+        self._goto(state)
+        self.csp.stats.constraint_checks += 1
+        units, corridors, violated = self.wave.delta(*_split(action))
+        return WaveMove(state, action, self._value(units, corridors, violated), units, corridors)
+
+    def value(self, state):
+        return state.value
+
+    def orders(self, state):
+        """Ids originais dos pedidos da wave do estado."""
+        self._goto(state)
+        return self.csp.instance.order_ids[sorted(self.members)].tolist()
+
+    def solution(self, state, **info):
+        """WaveSolution do estado (objetivo pela cobertura mínima), ou None se inadmissível."""
+        if state.value < 0:
+            return None
+        self._goto(state)
+        return wave_solution(self.csp, wave=self.wave, **info)
+
+
+def local_search(csp, search=hill_climbing, initial=(), sample_size=32, seed=None, **options):
+    """
+    Roda uma busca local do search.py sobre um WaveProblem.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        search (callable): hill_climbing, simulated_annealing ou
+            simulated_annealing_full (neste caso vale o último estado).
+        initial (iterable, optional): Pedidos (ids originais) da wave inicial.
+        sample_size (int, optional): Vizinhos sorteados por passo.
+        seed (int, optional): Semente do sorteio (e do módulo random, usado pelo
+            simulated annealing).
+        **options: Argumentos extras da busca (p.ex. schedule).
+
+    Returns:
+        WaveSolution ou None: a wave final, se admissível.
+    """
+    if seed is not None:
+        random.seed(seed)
+    problem = WaveProblem(csp, initial=initial, sample_size=sample_size, seed=seed)
+    with csp.stats.phase(search.__name__):
+        state = search(problem, **options)
+    if isinstance(state, list):
+        state = state[-1]
+    return problem.solution(state)
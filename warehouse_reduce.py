@@ -0,0 +1,173 @@
+"""
+Redução de uma WarehouseInstance antes da busca.
+
+    - pedidos que não cabem em wave nenhuma saem: unidades acima de UB ou algum
+      item com demanda acima do estoque total dos corredores;
+    - pedidos idênticos (mesmos itens e quantidades) formam uma classe de m
+      cópias, que vira pedidos agregados de pesos 1, 2, 4, ... (como na mochila
+      limitada): qualquer número de cópias entre 0 e m é a soma de alguns deles,
+      de modo que o modelo 0/1 continua exato com O(log m) variáveis em vez de m.
+      Antes, m é limitado às cópias que cabem juntas em UB e no estoque;
+    - opcionalmente, pedidos dominados (mesmos itens, quantidades menores ou
+      iguais item a item que as de outro pedido) também saem.
+
+A remoção de dominados é heurística: a razão unidades / corredores premia o
+pedido maior, mas uma wave pode precisar do menor para caber em UB ou na
+capacidade. As demais reduções preservam todas as waves viáveis.
+
+InstanceReduction leva a solução da instância reduzida de volta aos ids originais.
+"""
+
+import dataclasses
+
+import numpy as np
+
+from warehouse_instance import WarehouseInstance, csr_gather
+from warehouse_summary import short_orders
+
+# Motivos de remoção de um pedido original
+ABOVE_UB = 'above_ub'
+SHORT_STOCK = 'short_stock'
+SURPLUS = 'surplus'
+DOMINATED = 'dominated'
+
+
+def binary_weights(m):
+    """Pesos 1, 2, 4, ... e o resto, cujas somas de subconjuntos cobrem 0..m."""
+    weights, w = [], 1
+    while m > 0:
+        weights.append(min(w, m))
+        m -= weights[-1]
+        w *= 2
+    return weights
+
+
+class InstanceReduction:
+    """
+    Resultado de reduce_instance.
+
+        instance        a instância reduzida (pedidos com ids 0..n-1)
+        members[k]      ids originais dos pedidos que o pedido reduzido k representa
+        weight[k]       quantas cópias de um pedido original o pedido k soma
+        removed         {id original: motivo} dos pedidos que não entram na busca
+    """
+
+    def __init__(self, instance, members, removed):
+        self.instance = instance
+        self.members = members
+        self.weight = np.fromiter((len(m) for m in members), dtype=np.int64, count=len(members))
+        self.removed = removed
+
+    def expand(self, orders):
+        """Ids originais correspondentes aos pedidos reduzidos dados."""
+        return [o for k in orders for o in self.members[k]]
+
+    def expand_solution(self, solution):
+        """WaveSolution da instância reduzida com os pedidos em ids originais."""
+        return dataclasses.replace(solution, orders=self.expand(solution.orders))
+
+    def counts(self):
+        """Quantos pedidos originais saíram por motivo."""
+        counts = dict.fromkeys((ABOVE_UB, SHORT_STOCK, SURPLUS, DOMINATED), 0)
+        for reason in self.removed.values():
+            counts[reason] += 1
+        return counts
+
+    def __repr__(self):
+        kept = int(self.weight.sum())
+        return (f'<InstanceReduction: {kept + len(self.removed)} -> {self.instance.n_orders} '
+                f'pedidos, removidos {self.counts()}>')
+
+
+def reduce_instance(instance, UB=None, drop_dominated=False):
+    """
+    Reduz a instância (ver o módulo).
+
+    Args:
+        instance (WarehouseInstance): A instância original.
+        UB (int, optional): Limite superior da wave; por padrão o da instância.
+        drop_dominated (bool): Também remove os pedidos dominados (heurístico).
+
+    Returns:
+        InstanceReduction: A instância reduzida e o mapeamento para os ids originais.
+    """
+    inst = instance
+    UB = inst.UB if UB is None else UB
+    ids = inst.order_ids.tolist()
+    removed = {}
+    over = inst.order_units > UB
+    short = short_orders(inst) & ~over
+    for o in np.flatnonzero(over).tolist():
+        removed[ids[o]] = ABOVE_UB
+    for o in np.flatnonzero(short).tolist():
+        removed[ids[o]] = SHORT_STOCK
+
+    # Entradas de cada pedido em ordem de item; cada linha vira uma chave de bytes
+    perm = np.lexsort((inst.order_item, inst.order_row))
+    item, qty, ptr = inst.order_item[perm], inst.order_qty[perm], inst.order_ptr
+    item_bytes, qty_bytes, bounds = item.tobytes(), qty.tobytes(), ptr.tolist()
+    isz, qsz = item.itemsize, qty.itemsize
+
+    def items_key(o):
+        return item_bytes[bounds[o] * isz:bounds[o + 1] * isz]
+
+    classes = {}
+    for o in np.flatnonzero(~(over | short)).tolist():
+        key = (items_key(o), qty_bytes[bounds[o] * qsz:bounds[o + 1] * qsz])
+        classes.setdefault(key, []).append(o)
+    classes = list(classes.values())
+
+    if drop_dominated:
+        by_items = {}
+        for k, orders in enumerate(classes):
+            by_items.setdefault(items_key(orders[0]), []).append(k)
+        dominated = set()
+        for group in by_items.values():
+            if len(group) < 2:
+                continue
+            rows = np.array([qty[ptr[classes[k][0]]:ptr[classes[k][0] + 1]] for k in group])
+            # Vetores distintos: b >= a item a item, com b != a, tem mais unidades
+            covers = (rows[None, :, :] >= rows[:, None, :]).all(axis=2)
+            np.fill_diagonal(covers, False)
+            dominated.update(k for k, d in zip(group, covers.any(axis=1).tolist()) if d)
+        for k in dominated:
+            for o in classes[k]:
+                removed[ids[o]] = DOMINATED
+        classes = [orders for k, orders in enumerate(classes) if k not in dominated]
+
+    # Cópias além das que cabem juntas em UB e no estoque nunca entram todas
+    reps = np.array([orders[0] for orders in classes], dtype=np.int64)
+    size = np.array([len(orders) for orders in classes], dtype=np.int64)
+    lengths = np.diff(ptr)[reps]
+    pos = csr_gather(ptr, reps)
+    by_stock = size.copy()
+    need = qty[pos]
+    copies = np.where(need > 0, inst.item_stock[item[pos]] // np.maximum(need, 1),
+                      size.max(initial=0))
+    np.minimum.at(by_stock, np.repeat(np.arange(len(reps)), lengths), copies)
+    units = inst.order_units[reps]
+    by_units = np.where(units > 0, UB // np.maximum(units, 1), size)
+    fit = np.minimum(size, np.minimum(by_units, by_stock)).tolist()
+
+    part_rep, part_weight, members = [], [], []
+    for k, orders in enumerate(classes):
+        for extra in orders[fit[k]:]:
+            removed[ids[extra]] = SURPLUS
+        start = 0
+        for w in binary_weights(fit[k]):
+            part_rep.append(reps[k])
+            part_weight.append(w)
+            members.append([ids[o] for o in orders[start:start + w]])
+            start += w
+
+    part_rep = np.array(part_rep, dtype=np.int64)
+    part_len = np.diff(ptr)[part_rep]
+    entries = csr_gather(ptr, part_rep)
+    order_ptr = np.zeros(len(part_rep) + 1, dtype=np.int64)
+    np.cumsum(part_len, out=order_ptr[1:])
+    reduced = WarehouseInstance(
+        order_ptr, item[entries], qty[entries] * np.repeat(part_weight, part_len),
+        inst.corridor_ptr, inst.corridor_item, inst.corridor_qty, inst.LB, UB,
+        n_items=inst.n_items, item_ptr=inst.item_ptr, item_corridor=inst.item_corridor,
+        item_ids=inst.item_ids, corridor_ids=inst.corridor_ids)
+    return InstanceReduction(reduced, members, removed)
@@ -0,0 +1,427 @@
+"""Busca otimizante sobre WarehouseCSP: maximiza unidades por corredor da wave."""
+
+import math
+import time
+from dataclasses import dataclass, field
+
+import numpy as np
+
+from warehouse_bound import lp_node_bound
+from warehouse_instance import row_sums
+
+
+@dataclass
+class WaveSolution:
+    """Uma wave encontrada pela busca, com ids originais de pedidos e corredores."""
+    orders: list
+    corridors: list
+    units: int
+    objective: float
+    elapsed: float = 0.0
+    optimal: bool = False
+    info: dict = field(default_factory=dict)
+
+    def assignment(self, csp):
+        """Atribuição completa {pedido: incluir} para csp.display/objective_function."""
+        selected = set(self.orders)
+        return {var: var in selected for var in csp.variables}
+
+
+def wave_solution(csp, elapsed=0.0, optimal=False, wave=None, **info):
+    """Fotografa a wave corrente de csp.wave (ou o WaveState dado) num WaveSolution."""
+    wave = csp.wave if wave is None else wave
+    inst = csp.instance
+    return WaveSolution(orders=inst.order_ids[wave.orders()].tolist(),
+                        corridors=inst.corridor_ids[csp.wave_corridors(wave)].tolist(),
+                        units=wave.total_units, objective=csp.wave_objective(wave),
+                        elapsed=elapsed, optimal=optimal, info=info)
+
+
+def order_sequence(csp, rng=None):
+    """
+    Pedidos que cabem sozinhos numa wave (summary.fits), agrupados por corredores.
+
+    O primeiro bloco traz os pedidos que um só corredor atende: o que libera mais
+    unidades (warehouse_greedy.CoverStock.gains). Cada bloco seguinte traz os que
+    passam a caber com mais um corredor, de modo que as primeiras descidas da
+    busca montam waves de cobertura pequena. Dentro de cada bloco os pedidos vêm
+    em ordem decrescente de unidades.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        rng (np.random.Generator, optional): Se dado, as unidades recebem ruído
+            multiplicativo dentro de cada bloco, p.ex. para diversificar a
+            ramificação entre processos.
+
+    Returns:
+        list: Índices internos dos pedidos.
+    """
+    from WarehouseCSP import WaveState
+    from warehouse_greedy import CoverStock
+
+    units = csp.summary.units
+    noisy = units if rng is None else units * rng.uniform(0.5, 1.5, len(units))
+    stock = CoverStock(csp, WaveState(csp.instance), ())
+    left = csp.summary.fits.copy()
+    seq = []
+    while left.any():
+        ready = np.flatnonzero(left & (stock.short == 0))
+        if len(ready):
+            seq.extend(ready[np.argsort(-noisy[ready], kind='stable')].tolist())
+            left[ready] = False
+            continue
+        rest = np.flatnonzero(left)
+        gain = stock.gains(rest, units)
+        corridor = int(np.argmax(gain))
+        if gain[corridor] > 0:
+            stock.open([corridor])
+        else:
+            # Nenhum corredor basta sozinho: os que cobrem o maior pedido restante
+            stock.open(stock.corridors_for(int(rest[np.argmax(noisy[rest])])))
+    return seq
+
+
+def subset_search(csp, value, bound, best=0.0, deadline=None, seq=None, refine=None):
+    """
+    Busca em profundidade sobre conjuntos de pedidos, com poda por limitante.
+
+    Cada nó é um conjunto de pedidos S (os demais fora da wave) e seus filhos
+    acrescentam um pedido posterior na sequência; a wave é mantida em csp.wave
+    por csp.assign/unassign, e nós que violam capacidade ou UB são podados. A
+    poda por capacidade é correta porque as violações só crescem ao incluir
+    pedidos: a associação item -> corredores da WarehouseInstance contém todo
+    corredor que estoca o item, de modo que abrir corredores nunca acrescenta
+    capacidade a um item já demandado. É disso que dependem `optimal` e o gap
+    de branch_and_bound, parametric_search e dinkelbach.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        value (callable): value(wave) a maximizar.
+        bound (callable): bound(wave, rest) limita value em qualquer descendente
+            do nó, sendo rest as unidades dos pedidos que ainda podem entrar.
+        best (float): Só aceita waves com valor estritamente maior que este.
+        deadline (float, optional): Instante (time.perf_counter) em que a busca para.
+        seq (list, optional): Ordem dos pedidos na ramificação.
+        refine (callable, optional): refine(wave, decided) é um limitante mais
+            caro (p.ex. warehouse_bound.lp_node_bound), consultado só nos nós que
+            bound não poda; decided são os pedidos da sequência já decididos
+            (os de fora da wave estão fixados fora). Pode devolver None para
+            não limitar o nó.
+
+    Yields:
+        tuple: (WaveSolution, valor) a cada wave estritamente melhor.
+
+    Returns:
+        float ou None: None se a busca terminou; senão o maior limitante entre os
+        nós ainda não explorados quando o prazo acabou.
+    """
+    wave, stats = csp.wave, csp.stats
+    seq = order_sequence(csp) if seq is None else seq
+    decided = np.asarray(seq, dtype=np.int64)
+    units = csp.summary.units[seq].tolist()
+    # Só os pedidos que cabem numa wave (summary.contribution) somam às unidades restantes
+    rest = csp.summary.contribution[seq]
+    suffix = np.concatenate((np.cumsum(rest[::-1])[::-1], [0])).tolist()
+
+    def limit_at(pos):
+        # pos: pedidos da sequência já decididos
+        limit = bound(wave, suffix[pos])
+        if refine is not None and limit > best:
+            tighter = refine(wave, decided[:pos])
+            if tighter is not None:
+                limit = min(limit, tighter)
+        return limit
+
+    assignment = {}
+    wave.track(assignment)
+    path, stack, bounds = [], [0], [limit_at(0)]
+    try:
+        while stack:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            pos = stack[-1]
+            if pos >= len(seq) or bounds[-1] <= best:
+                stack.pop()
+                bounds.pop()
+                if path:
+                    csp.unassign(path.pop(), assignment)
+                continue
+            stack[-1] = pos + 1
+            if units[pos] > csp.UB - wave.total_units:
+                continue
+
+            var = csp.variables[seq[pos]]
+            csp.assign(var, True, assignment)
+            path.append(var)
+            stats.constraint_checks += 1
+            if csp.wave_conflicts(wave):
+                csp.unassign(path.pop(), assignment)
+                continue
+
+            if wave.total_units >= csp.LB:
+                current = value(wave)
+                if current > best:
+                    best = current
+                    yield wave_solution(csp), best
+            limit = limit_at(pos + 1)
+            if limit <= best:
+                csp.unassign(path.pop(), assignment)
+                continue
+            stack.append(pos + 1)
+            bounds.append(limit)
+        return max(bounds) if stack else None
+    finally:
+        # Também se o consumidor fechar o gerador antes do fim
+        for var in reversed(path):
+            csp.unassign(var, assignment)
+
+
+def publish(shared, value):
+    """Atualiza a incumbente compartilhada (p.ex. multiprocessing.Value) se value a supera."""
+    if shared is not None:
+        with shared.get_lock():
+            if value > shared.value:
+                shared.value = value
+
+
+def run_search(search):
+    """Consome um gerador de subset_search; retorna (última wave, valor, limitante aberto)."""
+    found, best = None, None
+    while True:
+        try:
+            found, best = next(search)
+        except StopIteration as stop:
+            return found, best, stop.value
+
+
+def parametric_search(csp, lam, best=0.0, deadline=None, seq=None):
+    """
+    Maximiza unidades - lam * corredores sobre as waves que respeitam capacidade,
+    LB e UB, contando os corredores da cobertura mínima. Como a cobertura só
+    cresce ao incluir pedidos,
+    unidades(S) + min(UB - unidades(S), unidades restantes) - lam * cobertura(S)
+    limita qualquer descendente de S; no lugar de cobertura(S) vale qualquer
+    limitante inferior dela (cover_size).
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        lam (float): Preço de cada corredor.
+        best (float): Só aceita waves com valor estritamente maior que este.
+        deadline (float, optional): Instante (time.perf_counter) em que a busca para.
+        seq (list, optional): Ordem dos pedidos na ramificação.
+
+    Returns:
+        tuple: (WaveSolution ou None, valor, completa) em que completa indica que
+        a busca terminou antes do prazo.
+    """
+    def value(wave):
+        return wave.total_units - lam * csp.corridor_count(wave)
+
+    def bound(wave, rest):
+        reachable = wave.total_units + min(csp.UB - wave.total_units, rest)
+        return reachable - lam * cover_size(csp, wave)
+
+    found, value_found, upper = run_search(subset_search(csp, value, bound, best, deadline, seq))
+    if found is not None:
+        found.info['lam'] = lam
+    return found, best if found is None else value_found, upper is None
+
+
+def cover_size(csp, wave):
+    """
+    Limitante inferior da cobertura de qualquer wave que contenha esta: o tamanho
+    da sua cobertura mínima, se comprovadamente mínima (CorridorCover.wave_cover,
+    com cache), senão CorridorCover.lower_bound. Com ele um nó cuja demanda já
+    pede mais corredores do que a incumbente permite é podado na hora.
+    """
+    found = csp.cover.wave_cover(wave)
+    if found is not None and found[1]:
+        return len(found[0])
+    return csp.cover.lower_bound(wave)
+
+
+def ratio_bound(csp):
+    """
+    Limitante de unidades / corredores para os descendentes de um nó.
+
+    Com k >= max(1, cobertura(S)) corredores (estimada por baixo por
+    cover_size), a wave tem no máximo
+    unidades(S) + min(folga de UB, unidades restantes) unidades, e no máximo o
+    estoque somado dos k corredores mais abastecidos (a demanda cabe na
+    capacidade dos corredores abertos). As duas razões só diminuem com k.
+    """
+    stock = np.sort(row_sums(csp.instance.corridor_ptr, csp.instance.corridor_qty))[::-1]
+    top = np.concatenate(([0], np.cumsum(stock))).tolist()
+
+    def bound(wave, rest):
+        k = max(1, cover_size(csp, wave))
+        reachable = wave.total_units + min(csp.UB - wave.total_units, rest)
+        return min(reachable, top[min(k, len(top) - 1)]) / k
+
+    return bound
+
+
+def anytime_waves(csp, time_limit=None, initial=None, shared=None, seq=None, upper_bound=None,
+                  lp_depth=None, lp_time=None):
+    """
+    Branch-and-bound "anytime": entrega cada wave estritamente melhor assim que a
+    encontra, com elapsed (segundos desde o início) e info['stats'] (os contadores
+    de csp.stats naquele instante), e para ao fim de `time_limit` segundos.
+
+    Quem consome pode parar a qualquer momento e ficar com a última wave recebida.
+    Se a busca chegar ao fim (completa ou no prazo), essa wave (ou `initial`, se
+    nenhuma a superou) recebe info['upper_bound'] e info['gap'], e optimal=True se
+    a busca foi completa.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        time_limit (float, optional): Tempo máximo, em segundos.
+        initial (WaveSolution, optional): Wave conhecida para podar desde o início.
+        shared (multiprocessing.Value, optional): Melhor razão conhecida por outros
+            processos; poda também contra ela e a atualiza a cada melhora.
+        seq (list, optional): Ordem dos pedidos na ramificação.
+        upper_bound (float, optional): Limitante superior global já conhecido
+            (p.ex. warehouse_bound.lp_bound, da raiz), teto do limitante de cada
+            nó.
+        lp_depth (int, optional): Se dado, os nós com até tantos pedidos na
+            wave são limitados também pelo LP com as suas fixações
+            (warehouse_bound.lp_node_bound) e podados se ele não supera a incumbente.
+        lp_time (float, optional): Tempo total desses LPs, em segundos.
+
+    Yields:
+        WaveSolution: cada nova melhor wave.
+    """
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+    best_value = initial.objective if initial is not None else 0.0
+    bound = ratio_bound(csp)
+    if upper_bound is not None:
+        node_bound = bound
+
+        def bound(wave, rest):
+            return min(node_bound(wave, rest), upper_bound)
+
+    if shared is not None:
+        own_bound = bound
+
+        def bound(wave, rest):
+            value = own_bound(wave, rest)
+            return value if value > shared.value else -math.inf
+
+    refine = None
+    if lp_depth is not None:
+        refine = lp_node_bound(csp, lp_depth, lp_time)
+
+    found = upper = None
+    search = subset_search(csp, csp.wave_objective, bound, best_value, deadline, seq, refine)
+    try:
+        while True:
+            try:
+                found, value = next(search)
+            except StopIteration as stop:
+                upper = stop.value
+                break
+            publish(shared, value)
+            found.elapsed = time.perf_counter() - start
+            found.info['stats'] = csp.stats.as_dict()
+            yield found
+    finally:
+        # Se o consumidor parar antes, desfaz as atribuições da busca em csp.wave
+        search.close()
+
+    best = found if found is not None else initial
+    if best is not None:
+        # Com incumbente compartilhada, a poda só prova que o ótimo é a melhor das duas
+        known = best.objective if shared is None else max(best.objective, shared.value)
+        best.info['upper_bound'] = known if upper is None else max(upper, known)
+        best.info['gap'] = best.info['upper_bound'] - best.objective
+        best.optimal = upper is None and best.info['gap'] <= 0
+
+
+def branch_and_bound(csp, time_limit=None, initial=None, shared=None, seq=None,
+                     on_improvement=None, upper_bound=None, lp_depth=None, lp_time=None):
+    """
+    Busca a wave de maior unidades / corredores por branch-and-bound.
+
+    Mantém a melhor wave encontrada (incumbente) e poda todo nó cujo limitante
+    otimista (ratio_bound) não a supera. Se o prazo acabar, devolve a
+    incumbente com o maior limitante dos nós ainda abertos, o que dá um gap
+    comprovado. É anytime_waves consumido até o fim.
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        time_limit (float, optional): Tempo máximo, em segundos.
+        initial (WaveSolution, optional): Wave conhecida para podar desde o início.
+        shared (multiprocessing.Value, optional): Melhor razão conhecida por outros
+            processos; poda também contra ela e a atualiza a cada melhora.
+        seq (list, optional): Ordem dos pedidos na ramificação.
+        on_improvement (callable, optional): Chamado com cada nova melhor wave.
+        upper_bound (float, optional): Limitante superior global já conhecido
+            (p.ex. warehouse_bound.lp_bound, da raiz), teto do limitante de cada
+            nó: o gap informado no prazo nunca passa dele.
+        lp_depth (int, optional): Profundidade (pedidos na wave) até a qual os
+            nós são podados também pelo LP com as suas fixações.
+        lp_time (float, optional): Tempo total desses LPs, em segundos.
+
+    Returns:
+        WaveSolution ou None: a melhor wave (None se nenhuma supera `initial` ou
+        não há wave viável); info traz 'upper_bound' e 'gap'.
+    """
+    start = time.perf_counter()
+    best = initial
+    with csp.stats.phase('branch_and_bound'):
+        for best in anytime_waves(csp, time_limit, initial, shared, seq, upper_bound,
+                                  lp_depth, lp_time):
+            if on_improvement is not None:
+                on_improvement(best)
+    if best is not None:
+        best.elapsed = time.perf_counter() - start
+    return best
+
+
+def dinkelbach(csp, lam=0.0, tol=1e-9, max_iter=100, time_limit=None, shared=None):
+    """
+    Maximiza unidades / corredores pelo método de Dinkelbach.
+
+    A cada iteração resolve o subproblema paramétrico
+        F(lam) = max unidades(S) - lam * corredores(S)
+    e atualiza lam com a razão da wave obtida. F(lam) <= tol prova que lam é a
+    razão ótima (se nenhum subproblema foi interrompido pelo prazo).
+
+    Args:
+        csp (WarehouseCSP): O CSP do armazém.
+        lam (float): Razão inicial (p.ex. a de uma wave já conhecida).
+        tol (float): Tolerância de parada em F(lam).
+        max_iter (int): Número máximo de iterações.
+        time_limit (float, optional): Tempo máximo total, em segundos.
+        shared (multiprocessing.Value, optional): Melhor razão conhecida por outros
+            processos; a cada iteração lam sobe até ela, e cada wave encontrada a atualiza.
+
+    Returns:
+        WaveSolution ou None: a melhor wave; info['lambdas'] guarda a sequência de lam.
+    """
+    start = time.perf_counter()
+    deadline = None if time_limit is None else start + time_limit
+    seq = order_sequence(csp)
+    best, lambdas, proven = None, [lam], False
+    with csp.stats.phase('dinkelbach'):
+        for _ in range(max_iter):
+            if shared is not None and shared.value > lam:
+                lam = shared.value
+                lambdas.append(lam)
+            found, value, complete = parametric_search(csp, lam, best=tol, deadline=deadline,
+                                                       seq=seq)
+            if found is None:
+                proven = complete
+                break
+            best = found
+            lam = found.objective
+            lambdas.append(lam)
+            publish(shared, lam)
+            if not complete:
+                break
+    if best is not None:
+        best.elapsed = time.perf_counter() - start
+        best.optimal = proven and best.objective >= lam - tol
+        best.info['lambdas'] = lambdas
+    return best
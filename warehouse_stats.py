@@ -0,0 +1,104 @@
+"""Instrumentação do resolvedor de waves: contadores, cronômetros por fase e progresso."""
+
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+# Níveis de verbosidade
+QUIET = 0    # nada é impresso
+SUMMARY = 1  # apenas o resumo ao final da execução
+DEBUG = 2    # também cada wave consistente e cada avaliação de heurística
+
+
+class SearchTimeout(Exception):
+    """Levantada por SolverStats.tick quando o prazo da busca se esgota."""
+
+
+class SolverStats:
+    """
+    Estatísticas de uma execução do resolvedor.
+
+        constraint_checks   avaliações da restrição global da wave
+        objective_evals     avaliações da função objetivo
+        assignments         atribuições feitas (CSP.assign)
+        backtracks          atribuições desfeitas (CSP.unassign)
+        cache_hits          avaliações de wave respondidas pelo cache (warehouse_cache)
+        cache_misses        avaliações de wave calculadas e guardadas no cache
+        phases[name]        tempo de parede acumulado em cada fase
+
+    Os contadores são atributos simples, incrementados diretamente no caminho
+    crítico. `tick()` chama o callback de progresso, no máximo uma vez a cada
+    `progress_every` segundos, com o próprio objeto como argumento, e levanta
+    SearchTimeout depois de `deadline` (um instante de time.perf_counter), o que
+    permite interromper buscas que não aceitam prazo, como backtracking_search.
+    """
+
+    COUNTERS = ('constraint_checks', 'objective_evals', 'assignments', 'backtracks',
+                'cache_hits', 'cache_misses')
+
+    def __init__(self, progress=None, progress_every=1.0, deadline=None):
+        self.progress = progress
+        self.progress_every = progress_every
+        self.deadline = deadline
+        self.reset()
+
+    def reset(self):
+        """Zera contadores e cronômetros."""
+        for name in self.COUNTERS:
+            setattr(self, name, 0)
+        self.phases = defaultdict(float)
+        self.start = time.perf_counter()
+        self._next_progress = self.start + self.progress_every
+
+    def tick(self):
+        """Chama o callback de progresso se já passou o intervalo configurado."""
+        if self.progress is None and self.deadline is None:
+            return
+        now = time.perf_counter()
+        if self.deadline is not None and now > self.deadline:
+            raise SearchTimeout
+        if self.progress is not None:
+            if now >= self._next_progress:
+                self._next_progress = now + self.progress_every
+                self.progress(self)
+
+    @contextmanager
+    def phase(self, name):
+        """Cronometra um bloco e acumula o tempo na fase `name`."""
+        start = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.phases[name] += time.perf_counter() - start
+
+    @property
+    def elapsed(self):
+        return time.perf_counter() - self.start
+
+    @property
+    def cache_hit_rate(self):
+        """Fração das avaliações de wave respondidas pelo cache (None se não houve)."""
+        lookups = self.cache_hits + self.cache_misses
+        return self.cache_hits / lookups if lookups else None
+
+    def as_dict(self):
+        """Contadores e tempos num dicionário simples (p.ex. para JSON)."""
+        stats = {name: getattr(self, name) for name in self.COUNTERS}
+        stats['phases'] = dict(self.phases)
+        stats['elapsed'] = self.elapsed
+        stats['cache_hit_rate'] = self.cache_hit_rate
+        return stats
+
+    def report(self):
+        """Imprime o resumo da execução."""
+        elapsed = self.elapsed
+        print("Checagens de restrição:", self.constraint_checks,
+              f"({self.constraint_checks / elapsed:.0f}/s)" if elapsed > 0 else "")
+        print("Avaliações do objetivo:", self.objective_evals)
+        print("Atribuições:", self.assignments)
+        print("Retrocessos:", self.backtracks)
+        if self.cache_hit_rate is not None:
+            print(f"Cache de waves: {self.cache_hits} acertos, {self.cache_misses} faltas "
+                  f"({100 * self.cache_hit_rate:.1f}%)")
+        for name, seconds in self.phases.items():
+            print(f"Tempo em {name}: {seconds:.6f} segundos")
@@ -0,0 +1,64 @@
+"""Resumos por pedido de uma WarehouseInstance, calculados uma única vez."""
+
+import numpy as np
+
+from warehouse_bitset import BitsetIndex
+
+
+def short_orders(instance):
+    """Pedidos com algum item cuja quantidade passa do estoque total do item."""
+    short = instance.order_qty > instance.item_stock[instance.order_item]
+    return np.bincount(instance.order_row[short], minlength=instance.n_orders) > 0
+
+
+class OrderSummary:
+    """
+    Resumos fixos de cada pedido, montados por reduções NumPy sobre os arrays da
+    instância na construção do WarehouseCSP e guardados em vetores contíguos
+    (uma posição por pedido), para que avaliadores, limitantes e heurísticas não
+    percorram a demanda dos pedidos a cada chamada:
+
+        units[o]            total de unidades (instance.order_units)
+        corridors[o]        bitset dos corredores candidatos (união dos de seus itens)
+        fits[o]             se o pedido cabe sozinho numa wave: unidades <= UB e
+                            estoque total de cada item suficiente para a sua demanda
+        contribution[o]     máximo de unidades que o pedido pode somar a uma wave
+                            viável: units[o] se fits[o], senão 0 (as unidades
+                            restantes nos limitantes de subset_search)
+        items[o]            bitset dos itens demandados
+
+    Como a demanda de uma wave só cresce ao incluir pedidos, um pedido com
+    fits[o] falso não entra em nenhuma wave viável.
+    """
+
+    def __init__(self, instance, UB):
+        """
+        Args:
+            instance (WarehouseInstance): A instância.
+            UB (int): Limite superior do tamanho da wave (o do CSP, que pode
+                sobrescrever o da instância).
+        """
+        self.bitsets = BitsetIndex(instance)
+        self.units = instance.order_units
+        self.corridors = self.bitsets.order_corridors
+        self.restock(instance, UB)
+
+    def restock(self, instance, UB, pending=None):
+        """
+        Recalcula fits e contribution depois de o estoque da instância mudar.
+
+        Args:
+            instance (WarehouseInstance): A instância, com o estoque atual.
+            UB (int): Limite superior do tamanho da wave.
+            pending (np.ndarray, optional): Máscara dos pedidos que ainda podem
+                entrar numa wave; os demais passam a não caber.
+        """
+        self.fits = ~short_orders(instance) & (self.units <= UB)
+        if pending is not None:
+            self.fits &= pending
+        self.contribution = np.where(self.fits, self.units, 0)
+
+    @property
+    def items(self):
+        """Bitsets dos itens de cada pedido (BitsetIndex.order_items, montados no primeiro uso)."""
+        return self.bitsets.order_items
@@ -0,0 +1,65 @@
+"""
+Zonas do armazém: componentes conexos do grafo bipartido item x corredor.
+
+Dois itens estão na mesma zona se são ligados por uma cadeia de corredores que
+os estocam (ou a que estão associados). A demanda de uma zona só pode ser
+atendida pelos corredores dela, de modo que a capacidade e a cobertura mínima
+de corredores de uma wave se decompõem por zona: a cobertura da wave é a união
+das coberturas das zonas que ela toca, e uma mudança de pedido só precisa
+reavaliar as zonas dos itens dele.
+"""
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from warehouse_instance import csr_transpose
+
+
+class ZoneIndex:
+    """
+    Componentes conexos de uma WarehouseInstance, calculados uma vez:
+
+        n_zones                     número de zonas
+        item_zone[i]                zona do item i
+        corridor_zone[c]            zona do corredor c
+        zone_ptr, zone_item         itens de cada zona (CSR)
+        order_ptr, order_zone       zonas que cada pedido toca (CSR, sem repetição)
+
+    Itens isolados (sem corredor) formam zonas próprias.
+    """
+
+    def __init__(self, instance):
+        inst = instance
+        n_items = inst.n_items
+        # Arestas item -> n_items + corredor, do estoque e da associação
+        stock_items = inst.corridor_item
+        stock_corridors = np.repeat(np.arange(inst.n_corridors), np.diff(inst.corridor_ptr))
+        assoc_items = np.repeat(np.arange(n_items), np.diff(inst.item_ptr))
+        rows = np.concatenate((stock_items, assoc_items)).astype(np.int64)
+        cols = n_items + np.concatenate((stock_corridors, inst.item_corridor)).astype(np.int64)
+        n_nodes = n_items + inst.n_corridors
+        graph = coo_matrix((np.ones(len(rows), dtype=np.int8), (rows, cols)),
+                           shape=(n_nodes, n_nodes))
+        self.n_zones, labels = connected_components(graph, directed=False)
+        self.item_zone = labels[:n_items].astype(np.int64)
+        self.corridor_zone = labels[n_items:].astype(np.int64)
+
+        self.zone_ptr, self.zone_item = csr_transpose(
+            np.arange(n_items + 1), self.item_zone, self.n_zones)
+        self.zone_item = self.zone_item.astype(np.int64)
+        # Zonas distintas de cada pedido
+        zone = self.item_zone[inst.order_item]
+        pairs = np.unique(inst.order_row.astype(np.int64) * self.n_zones + zone)
+        self.order_zone = pairs % self.n_zones
+        self.order_ptr = np.zeros(inst.n_orders + 1, dtype=np.int64)
+        np.cumsum(np.bincount(pairs // self.n_zones, minlength=inst.n_orders),
+                  out=self.order_ptr[1:])
+
+    def zones_of(self, order):
+        """Zonas tocadas pelo pedido de índice order."""
+        return self.order_zone[self.order_ptr[order]:self.order_ptr[order + 1]]
+
+    def items_of(self, zone):
+        """Itens da zona."""
+        return self.zone_item[self.zone_ptr[zone]:self.zone_ptr[zone + 1]]